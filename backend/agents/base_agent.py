@@ -3,16 +3,51 @@ Base agent class for all AI agents in the system.
 Provides common functionality for message handling and tool execution.
 """
 
-from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Optional
+from abc import ABC
+from typing import Dict, Any, AsyncIterator, List, Optional
+import asyncio
+import datetime
 import json
+import logging
+import os
+import time
 import uuid
-from datetime import datetime
-from db.supabase_client import supabase_client
+from db.database import database
+from agents.context_window import ContextWindow, message_text
+from agents.response_cache import response_cache
+from agents.session_manager import SessionManager
+from agents.step_timings import step_timings
+from agents.summarizer import summary_queue
+from memory.summary_memory import summary_memory
+from tools.tool_memo import ToolMemo
+from tools.workspace_events import change_thread, workspace_events
+
+logger = logging.getLogger(__name__)
+
+# Thread used when a caller does not pass a thread_id in the context.
+DEFAULT_THREAD_ID = "default"
+
+SUMMARY_PROMPT = ("Summarize the conversation below in brief points. Focus on key actions taken "
+                  "and decisions made. Write it so that it can be used to recall context later.")
+# Longest transcript sent for summarization; older messages are cut first
+SUMMARY_MAX_CHARS = int(os.getenv("SUMMARY_MAX_CHARS", 24000))
+# Every LLM step and tool call is logged to the actions table unless disabled
+ACTION_LEDGER_ENABLED = os.getenv("ACTION_LEDGER_ENABLED", "true").lower() in ("1", "true", "yes")
+# Tool arguments kept in a ledger row; sizes are always recorded in full
+ACTION_LEDGER_ARGUMENT_CHARS = int(os.getenv("ACTION_LEDGER_ARGUMENT_CHARS", 500))
+
+
+class StepTimeout(asyncio.TimeoutError):
+    """An agent step ran past its step timeout or the request deadline."""
+
 
 class BaseAgent(ABC):
     """Abstract base class for all agents."""
 
+    # Subclasses set llm (an LLMClient) and tool_box (a ToolBox) in __init__.
+    model = "gpt-4-turbo"
+    temperature = 0.7
+
     def __init__(self, name: str, role: str, description: str, tools: List[str]):
         """
         Initialize base agent.
@@ -28,21 +63,320 @@ class BaseAgent(ABC):
         self.description = description
         self.tools = tools
         self.agent_id = str(uuid.uuid4())
-        self.curr_session = []
+        # One conversation per thread_id, rebuilt from the session store or the messages table on a miss.
+        self.sessions = SessionManager(self.initialize_context, self.load_thread_history, name=name)
+        self.history_limit = int(os.getenv("SESSION_HISTORY_LIMIT", 50))
+        # Limits for one request through the tool-calling loop
+        self.max_iterations = max(1, int(os.getenv("AGENT_MAX_ITERATIONS", 10)))
+        self.step_timeout = float(os.getenv("AGENT_STEP_TIMEOUT_SECONDS", 120))
+        self.deadline_seconds = float(os.getenv("AGENT_DEADLINE_SECONDS", 300))
+        # Idle and client-exit summaries run in the background summary queue
+        summary_queue.register(self)
+
+    async def warm_up(self):
+        """
+        Async setup, run once before the agent serves requests.
+
+        Uses the ID of this agent's row in the agents table, when there is
+        one, so summaries and actions are stored under it. Constructors must
+        not touch the database, so this is done here instead.
+        """
+        try:
+            record = await database.get_agent(self.name)
+        except Exception as e:
+            logger.warning(f"Could not look up agent {self.name}: {e}")
+            return
+        if record:
+            self.agent_id = record["id"]
 
-    @abstractmethod
     async def process_message(self, message: str, context: Optional[Dict[str, Any]] = None) -> str:
         """
         Process a message and return a response.
         
         Args:
             message: User message to process
-            context: Optional context information
+            context: Optional context information; "usage" is set on it
             
         Returns:
             Agent response
         """
-        pass
+        content = ""
+        async for event in self.stream_message(message, context):
+            if event["type"] == "done":
+                content = event["content"]
+                if context is not None:
+                    context["usage"] = event["usage"]
+            elif event["type"] == "error":
+                content = event["detail"]
+        return content
+
+    async def stream_message(self, message: str,
+                             context: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a message, yielding events as the response is produced.
+
+        This is the tool-calling loop shared by every agent. It runs at most
+        max_iterations LLM steps (the last one without tools, so the agent
+        has to answer), each bounded by step_timeout and all of them by
+        deadline_seconds. Every LLM and tool call is reported to
+        step_timings and logged to the actions table. Cancelling the
+        consuming task (e.g. when the client disconnects) stops the in-flight
+        completion. With the response cache enabled, a repeated message is
+        answered without calling the model. The session is saved to the
+        session store, and the answer cached, before the final event, so any
+        worker can take the next turn and consumers may stop reading there.
+
+        Events are dicts with a "type" of:
+            token: a chunk of assistant text ("content")
+            tool_start: a tool call is about to run ("id", "name", "arguments")
+            tool_end: a tool call finished ("id", "name", "status")
+            done: the final assistant message ("content", "usage", and "cached"
+                when it was served from the response cache)
+            error: processing failed ("detail")
+        """
+        thread_id = self.get_thread_id(context)
+        session = await self.sessions.get(thread_id, pending_message=message)
+        async with session.lock:
+            messages = session.messages
+            messages.begin_request()
+            messages.append({"role": "user", "content": message})
+            deadline = time.monotonic() + self.deadline_seconds
+            # For the response cache: what the answer depended on, and whether anything was written
+            workspace_version = workspace_events.version
+            paths: List[str] = []
+            workspace_wide = False
+            result: Dict[str, Any]
+            try:
+                schema_hash = self.tool_box.get_schema_hash()
+                cached = await response_cache.get(self.name, schema_hash, message)
+                if cached is not None:
+                    messages.append({"role": "assistant", "content": cached})
+                    yield {"type": "token", "content": cached}
+                    result = {"type": "done", "content": cached, "usage": dict(messages.usage), "cached": True}
+                else:
+                    result = {"type": "error",
+                              "detail": f"Sorry, I could not finish within {self.max_iterations} steps."}
+                # A cached answer skips the tool-calling loop
+                for step in range(self.max_iterations if cached is None else 0):
+                    parts: List[str] = []
+                    tool_calls: Dict[int, Dict[str, Any]] = {}
+                    final = step == self.max_iterations - 1
+                    llm_stream = self._llm_step(messages, thread_id, step, deadline, final)
+                    try:
+                        async for chunk in llm_stream:
+                            if not chunk.choices:
+                                continue
+                            delta = chunk.choices[0].delta
+                            if delta.content:
+                                parts.append(delta.content)
+                                yield {"type": "token", "content": delta.content}
+                            # Tool calls arrive as fragments keyed by their index in the turn
+                            for tc in delta.tool_calls or []:
+                                call = tool_calls.setdefault(tc.index, {"id": "", "name": "", "arguments": ""})
+                                call["id"] += tc.id or ""
+                                if tc.function:
+                                    call["name"] += tc.function.name or ""
+                                    call["arguments"] += tc.function.arguments or ""
+                    finally:
+                        await llm_stream.aclose()
+
+                    if tool_calls:
+                        calls = [tool_calls[i] for i in sorted(tool_calls)]
+                        for call in calls:
+                            yield {"type": "tool_start", "id": call["id"], "name": call["name"],
+                                   "arguments": call["arguments"]}
+                        workspace_wide |= self._tool_dependencies(calls, paths)
+                        results = await self._tool_step(calls, thread_id, step, deadline, session.tool_memo)
+                        messages.append({
+                            "role": "assistant",
+                            "content": "".join(parts) or None,
+                            "tool_calls": [
+                                {"id": call["id"], "type": "function",
+                                 "function": {"name": call["name"], "arguments": call["arguments"] or "{}"}}
+                                for call in calls
+                            ]
+                        })
+                        for call, tool_result in zip(calls, results):
+                            yield {"type": "tool_end", "id": call["id"], "name": call["name"],
+                                   "status": self._tool_status(tool_result)}
+                            messages.append({"role": "tool", "tool_call_id": call["id"],
+                                             "content": self._tool_content(call, tool_result,
+                                                                           session.tool_memo, messages)})
+                        continue
+
+                    content = "".join(parts)
+                    messages.append({"role": "assistant", "content": content})
+                    result = {"type": "done", "content": content, "usage": dict(messages.usage)}
+                    break
+            except StepTimeout as e:
+                result = {"type": "error", "detail": f"Sorry, the request timed out: {e}"}
+            except Exception as e:
+                logger.exception(f"stream_message failed: {e}")
+                result = {"type": "error", "detail": f"Sorry, I encountered an error: {e}"}
+            # Saved before the reply is final, so the next turn can go to any worker
+            await self.sessions.save(session)
+            # Cached before the final event too: consumers may stop reading once they have it.
+            # Answers that changed the workspace are not replayable.
+            if (result["type"] == "done" and not result.get("cached")
+                    and workspace_events.version == workspace_version):
+                await response_cache.put(self.name, schema_hash, message, result["content"],
+                                         paths, workspace_wide)
+            yield result
+
+    async def _llm_step(self, messages: ContextWindow, thread_id: str, step: int,
+                        deadline: float, final: bool) -> AsyncIterator[Any]:
+        """
+        Stream one completion, bounded by the step timeout and the request deadline.
+
+        The request runs in its own task and hands chunks over a queue, so a
+        timeout or cancellation can stop it at any point.
+        """
+        step_deadline = min(time.monotonic() + self.step_timeout, deadline)
+        queue: asyncio.Queue = asyncio.Queue()
+        event: Dict[str, Any] = {"kind": "llm", "agent": self.name, "thread_id": thread_id,
+                                 "name": self.model, "step": step, "status": "success",
+                                 "first_token_seconds": None, "usage": None,
+                                 "input_chars": 0, "output_chars": 0}
+        started = time.perf_counter()
+        error = None
+
+        async def produce():
+            try:
+                prompt = messages.fit()
+                event["input_chars"] = sum(len(message_text(message)) for message in prompt)
+                async for chunk in self.llm.stream_chat_completion(
+                    model=self.model,
+                    messages=prompt,
+                    temperature=self.temperature,
+                    tools=self.tool_box.get_openai_tools(),
+                    # On the last allowed step the model must answer instead of calling tools
+                    tool_choice="none" if final else "auto"
+                ):
+                    queue.put_nowait(chunk)
+                queue.put_nowait(None)
+            except Exception as e:
+                queue.put_nowait(e)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(queue.get(), step_deadline - time.monotonic())
+                except asyncio.TimeoutError:
+                    raise StepTimeout(f"model step {step + 1} took longer than "
+                                      f"{min(self.step_timeout, self.deadline_seconds):.0f}s")
+                if chunk is None:
+                    return
+                if isinstance(chunk, Exception):
+                    raise chunk
+                if event["first_token_seconds"] is None:
+                    event["first_token_seconds"] = time.perf_counter() - started
+                if chunk.usage is not None:
+                    messages.record_usage(chunk.usage)
+                    event["usage"] = {"prompt_tokens": chunk.usage.prompt_tokens,
+                                      "completion_tokens": chunk.usage.completion_tokens}
+                if chunk.choices:
+                    delta = chunk.choices[0].delta
+                    event["output_chars"] += len(delta.content or "") + sum(
+                        len(tc.function.arguments or "") for tc in delta.tool_calls or [] if tc.function)
+                yield chunk
+        except BaseException as e:
+            event["status"] = ("timeout" if isinstance(e, StepTimeout) else
+                               "cancelled" if isinstance(e, (asyncio.CancelledError, GeneratorExit)) else
+                               "error")
+            error = e
+            raise
+        finally:
+            producer.cancel()
+            event["seconds"] = time.perf_counter() - started
+            step_timings.record(event)
+            self._log_step(event, None, {"error": str(error)[:200]} if event["status"] == "error" else None)
+
+    async def _tool_step(self, calls: List[Dict[str, Any]], thread_id: str, step: int,
+                         deadline: float, memo: Optional[ToolMemo] = None) -> List[Any]:
+        """Run one turn's tool calls concurrently, bounded by the step timeout and the request deadline."""
+        def on_done(name: str, arguments: str, seconds: float, result: Any):
+            event = {"kind": "tool", "agent": self.name, "thread_id": thread_id,
+                     "name": name, "step": step, "seconds": seconds,
+                     "status": self._tool_status(result), "input_chars": len(arguments or ""),
+                     "output_chars": len(json.dumps(result, default=str))}
+            step_timings.record(event)
+            self._log_step(event, {"arguments": (arguments or "")[:ACTION_LEDGER_ARGUMENT_CHARS]},
+                           {"error": result["error"]} if event["status"] == "error" else None)
+
+        timeout = min(self.step_timeout, deadline - time.monotonic())
+        # Workspace changes made by these calls are attributed to this thread
+        token = change_thread.set(thread_id)
+        try:
+            return await asyncio.wait_for(
+                self.tool_box.run_tool_calls([(call["name"], call["arguments"]) for call in calls],
+                                             on_done=on_done, memo=memo),
+                max(timeout, 0)
+            )
+        except asyncio.TimeoutError:
+            raise StepTimeout(f"tool step {step + 1} took longer than {max(timeout, 0):.0f}s")
+        finally:
+            change_thread.reset(token)
+
+    def _log_step(self, event: Dict[str, Any], input_data: Optional[Dict[str, Any]],
+                  output_data: Optional[Dict[str, Any]]):
+        """Queue a ledger row for a step_timings event without waiting on the database."""
+        if not ACTION_LEDGER_ENABLED:
+            return
+        usage = event.get("usage") or {}
+        try:
+            database.queue_action(
+                self.agent_id, event["name"], input_data, output_data, event["status"],
+                agent_name=self.name, thread_id=event["thread_id"], kind=event["kind"],
+                step=event["step"], duration_ms=round(event["seconds"] * 1000, 3),
+                prompt_tokens=usage.get("prompt_tokens"), completion_tokens=usage.get("completion_tokens"),
+                input_chars=event.get("input_chars"), output_chars=event.get("output_chars")
+            )
+        except Exception as e:
+            logger.warning(f"Could not log {event['kind']} step to the action ledger: {e}")
+
+    @staticmethod
+    def _tool_content(call: Dict[str, Any], result: Any, memo: ToolMemo, messages: ContextWindow) -> str:
+        """
+        The tool message content for a result.
+
+        A memoized result whose earlier copy is still in the context is sent
+        as a short reference to that call instead of a second copy.
+        """
+        key = ToolMemo.key_for_call(call["name"], call["arguments"])
+        entry = memo.peek(key) if key is not None else None
+        if entry is None or entry.result is not result:
+            return json.dumps(result)
+        if entry.call_id and entry.call_id != call["id"] and messages.has_tool_output(entry.call_id):
+            return json.dumps({"same_result_as_tool_call": entry.call_id,
+                               "note": "Identical to that earlier result; the workspace has not changed since."})
+        entry.call_id = call["id"]
+        return json.dumps(result)
+
+    @staticmethod
+    def _tool_dependencies(calls: List[Dict[str, Any]], paths: List[str]) -> bool:
+        """
+        Add the workspace paths a turn's tool calls refer to to paths.
+
+        Returns:
+            True if a call had no path argument and may depend on the whole workspace
+        """
+        workspace = os.getenv("WORKSPACE_PATH", "./workspace")
+        workspace_wide = False
+        for call in calls:
+            try:
+                args = json.loads(call["arguments"] or "{}")
+            except ValueError:
+                continue
+            if isinstance(args, dict) and isinstance(args.get("path"), str):
+                paths.append(os.path.join(workspace, args["path"]))
+            else:
+                workspace_wide = True
+        return workspace_wide
+
+    @staticmethod
+    def _tool_status(result: Any) -> str:
+        return "error" if isinstance(result, dict) and "error" in result else "success"
 
     def can_use_tool(self, tool_name: str) -> bool:
         """Check if agent can use a specific tool."""
@@ -52,31 +386,75 @@ class BaseAgent(ABC):
         """Get list of available tools for this agent."""
         return self.tools.copy()
 
-    def log_action(self, tool_name: str, input_data: Dict[str, Any], 
-                  output_data: Dict[str, Any], status: str): # -> str
+    async def summarize_session(self, thread_id: str) -> Optional[str]:
         """
-        Log an action to the database.
-        
-        Args:
-            tool_name: Name of tool used
-            input_data: Input parameters
-            output_data: Output result
-            status: Action status (success, error, pending)
-            
-        Returns:
-            Action ID
+        Summarize a thread's conversation with a separate completion.
+
+        The live session is only read, so the summary request never shows up
+        in the conversation itself.
         """
-        # This will be implemented by the specific agent subclasses
-        # that have access to the database client
-        pass
+        session = self.sessions.peek(thread_id)
+        if session is None:
+            return None
+        # Wait for an in-flight request so the transcript is complete
+        async with session.lock:
+            messages = list(session.messages)[session.messages.pinned_count:]
+        lines = []
+        for m in messages:
+            if m.get("role") == "tool":
+                lines.append(f"[tool result] {(m.get('content') or '')[:500]}")
+                continue
+            for call in m.get("tool_calls") or []:
+                lines.append(f"[{m['role']} called {call['function']['name']}({call['function']['arguments'][:200]})]")
+            if m.get("content"):
+                lines.append(f"{m['role']}: {m['content']}")
+        transcript = "\n".join(lines)[-SUMMARY_MAX_CHARS:]
+        if not transcript:
+            return None
+        response = await self.llm.chat_completion(
+            model=self.model,
+            messages=[{"role": "system", "content": SUMMARY_PROMPT},
+                      {"role": "user", "content": transcript}],
+            temperature=0.3,
+        )
+        return response.choices[0].message.content
 
-    async def log_conversation(self):
+    async def log_conversation(self, thread_id: Optional[str] = None):
         """
-        Log the current conversation session to the database.
+        Summarize conversation sessions and store the summaries.
+
+        Called from the background summary queue; errors propagate so the job
+        can be retried.
+
+        Args:
+            thread_id: Thread to summarize; all live sessions when omitted
         """
-        # This will be implemented by the specific agent subclasses
-        # that have access to the database client
-        pass
+        sessions = self.sessions.sessions()
+        if thread_id is not None:
+            sessions = [s for s in sessions if s.thread_id == thread_id]
+        for session in sessions:
+            if not session.needs_summary:
+                continue
+            # Another worker continued this thread; it will summarize the newer version
+            if not await self.sessions.is_current(session):
+                self.sessions.drop(session.thread_id)
+                continue
+            last_used = session.last_used
+            # Every message the transcript can include was created before now
+            summarized_through = datetime.datetime.now(datetime.timezone.utc).isoformat()
+            summary = await self.summarize_session(session.thread_id)
+            if not summary:
+                continue
+            summary_id = str(uuid.uuid4())
+            refs = await summary_memory.add_many([(summary_id, self.agent_id, summary)])
+            await database.log_conversation(self.agent_id, summary, embedding_ref=refs[0],
+                                            summary_id=summary_id)
+            session.summarized_at = last_used
+            # Start the next conversation fresh (with this summary recalled and
+            # without the summarized messages) unless the thread was used again
+            # while summarizing.
+            if session.last_used == last_used:
+                await self.sessions.reset(session.thread_id, summarized_through)
 
     def get_system_prompt(self) -> str:
         """Get system prompt for this agent."""
@@ -97,6 +475,42 @@ class BaseAgent(ABC):
                 When you need to use tools, explain what you're doing and show the results.
                 Always be helpful and provide clear, actionable responses."""
 
-    def initialize_context(self):
-        """Reset current session with system prompt."""
-        pass
+    async def initialize_context(self, message: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Build the starting messages for a new session: system prompt plus relevant summaries.
+
+        Args:
+            message: The user message the session is being created for, if any
+        """
+        context = [{"role": "system", "content": self.get_system_prompt()}]
+        # The 5 stored summaries most similar to the opening message, as assistant messages
+        for summary in await summary_memory.recall(self.agent_id, message, limit=5):
+            context.append({"role": "assistant", "content": summary})
+        return context
+
+    @staticmethod
+    def get_thread_id(context: Optional[Dict[str, Any]]) -> str:
+        """Extract the thread ID from a process_message context."""
+        return (context or {}).get("thread_id") or DEFAULT_THREAD_ID
+
+    async def load_thread_history(self, thread_id: str, after: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Load this agent's past chat messages for a thread, oldest first.
+
+        Args:
+            thread_id: Conversation thread ID
+            after: ISO timestamp; only messages created after it (those not yet summarized)
+        """
+        if thread_id == DEFAULT_THREAD_ID:
+            return []
+        rows = await database.get_messages(thread_id, self.history_limit,
+                                           ("sender", "recipient", "role", "content", "created_at"))
+        if after is not None:
+            after_time = datetime.datetime.fromisoformat(after)
+            rows = [row for row in rows if datetime.datetime.fromisoformat(str(row["created_at"])) > after_time]
+        history = []
+        for row in reversed(rows):
+            if row["recipient"] == self.name and row["role"] == "user":
+                history.append({"role": "user", "content": row["content"]})
+            elif row["sender"] == self.name:
+                history.append({"role": "assistant", "content": row["content"]})
+        return history
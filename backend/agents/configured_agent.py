@@ -0,0 +1,49 @@
+"""
+Configured Agent - an agent defined entirely in agents.json.
+Lets new agents be added with a role, prompt and tool categories, without
+writing an agent class.
+"""
+
+import os
+from typing import List, Optional
+
+from agents.base_agent import BaseAgent
+from agents.llm_client import llm_client
+from tools.tool_box import ToolBox
+
+
+class ConfiguredAgent(BaseAgent):
+    """Agent whose role, prompt, model and tools come from configuration."""
+
+    def __init__(self, name: str, role: str, description: str,
+                 tool_categories: Optional[List[str]] = None,
+                 system_prompt: Optional[str] = None,
+                 model: Optional[str] = None,
+                 temperature: Optional[float] = None):
+        """
+        Initialize the agent from its config entry.
+
+        Args:
+            name: Agent name
+            role: Agent role (tester, documenter, etc.)
+            description: Agent description
+            tool_categories: Tool registry categories this agent may use
+            system_prompt: Replaces the default system prompt when set
+            model: Chat model; BaseAgent.model when omitted
+            temperature: Sampling temperature; BaseAgent.temperature when omitted
+        """
+        self.tool_box = ToolBox(tool_categories or ["general"])
+        super().__init__(name=name, role=role, description=description,
+                         tools=self.tool_box.get_tool_names())
+        self.llm = llm_client
+        self.system_prompt = system_prompt
+        if model:
+            self.model = model
+        if temperature is not None:
+            self.temperature = temperature
+        self.workspace_path = os.getenv("WORKSPACE_PATH", "./workspace")
+
+    def get_system_prompt(self) -> str:
+        if self.system_prompt:
+            return f"You are {self.name}, a {self.role} agent in a multi-agent development team.\n\n{self.system_prompt}"
+        return super().get_system_prompt()
@@ -0,0 +1,206 @@
+"""
+Token-budgeted context window for agent sessions.
+Counts tokens once per message as it is appended and trims old tool output
+when the conversation nears the budget. The pinned prefix (system prompt and
+the summaries from initialize_context) is never trimmed.
+"""
+
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken is optional; fall back to a character estimate
+    _encoding = None
+
+# Tokens the chat format adds around every message.
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens in a string (approximate when tiktoken is unavailable)."""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def message_text(message: Dict[str, Any]) -> str:
+    """All the text in a chat message that counts towards the prompt."""
+    text = message.get("content") or ""
+    function_call = message.get("function_call")
+    if function_call:
+        text += json.dumps(function_call, default=str)
+    tool_calls = message.get("tool_calls")
+    if tool_calls:
+        text += json.dumps(tool_calls, default=str)
+    return text
+
+
+class ContextWindow:
+    """A session's chat messages with cached per-message token counts."""
+
+    def __init__(self, pinned: List[Dict[str, Any]],
+                 history: Optional[List[Dict[str, Any]]] = None,
+                 budget: Optional[int] = None,
+                 tool_output_tokens: Optional[int] = None,
+                 keep_recent_tool_outputs: int = 1,
+                 truncated_calls: Optional[List[str]] = None):
+        """
+        Initialize the context window.
+
+        Args:
+            pinned: Messages that are always kept (system prompt, summaries)
+            history: Earlier conversation messages
+            budget: Prompt token budget (CONTEXT_TOKEN_BUDGET)
+            tool_output_tokens: Size old tool outputs are cut down to (CONTEXT_TOOL_OUTPUT_TOKENS)
+            keep_recent_tool_outputs: Number of latest tool outputs never truncated
+            truncated_calls: Tool calls in history whose output was already truncated
+        """
+        self.budget = budget or int(os.getenv("CONTEXT_TOKEN_BUDGET", 100000))
+        self.tool_output_tokens = tool_output_tokens or int(os.getenv("CONTEXT_TOOL_OUTPUT_TOKENS", 200))
+        self.keep_recent_tool_outputs = keep_recent_tool_outputs
+        self.pinned_count = len(pinned)
+        self._messages: List[Dict[str, Any]] = []
+        self._tokens: List[int] = []
+        self.total_tokens = 0
+        self.usage: Dict[str, int] = {}
+        # Tool results that were cut down by _truncate_tool_outputs
+        self._truncated_calls: Set[str] = set(truncated_calls or ())
+        for message in pinned + (history or []):
+            self.append(message)
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._messages)
+
+    def __getitem__(self, index):
+        return self._messages[index]
+
+    @property
+    def messages(self) -> List[Dict[str, Any]]:
+        """The message list to send to the model."""
+        return self._messages
+
+    def append(self, message: Dict[str, Any]):
+        tokens = count_tokens(message_text(message)) + MESSAGE_OVERHEAD_TOKENS
+        self._messages.append(message)
+        self._tokens.append(tokens)
+        self.total_tokens += tokens
+
+    def history(self) -> List[Dict[str, Any]]:
+        """The conversation after the pinned prefix."""
+        return self._messages[self.pinned_count:]
+
+    @property
+    def truncated_calls(self) -> List[str]:
+        return sorted(self._truncated_calls)
+
+    def has_tool_output(self, tool_call_id: str) -> bool:
+        """Whether the full result of a tool call is still in the context."""
+        if tool_call_id in self._truncated_calls:
+            return False
+        return any(m.get("role") == "tool" and m.get("tool_call_id") == tool_call_id
+                   for m in reversed(self._messages))
+
+    def begin_request(self):
+        """Reset the usage counters at the start of a user request."""
+        self.usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "llm_calls": 0}
+
+    def record_usage(self, usage: Any):
+        """Add the usage block of a completion response to this request's totals."""
+        if not self.usage:
+            self.begin_request()
+        self.usage["llm_calls"] += 1
+        if usage is None:
+            return
+        for key in ("prompt_tokens", "completion_tokens", "total_tokens"):
+            self.usage[key] += getattr(usage, key, 0) or 0
+
+    def fit(self) -> List[Dict[str, Any]]:
+        """Trim the context to the budget and return the messages to send."""
+        if self.total_tokens > self.budget:
+            self._truncate_tool_outputs(self.keep_recent_tool_outputs)
+        if self.total_tokens > self.budget:
+            self._drop_oldest()
+        if self.total_tokens > self.budget:
+            # Only the question and its latest tool calls are left; cut their output too
+            self._truncate_tool_outputs(0)
+        return self._messages
+
+    def _replace(self, index: int, message: Dict[str, Any]):
+        tokens = count_tokens(message_text(message)) + MESSAGE_OVERHEAD_TOKENS
+        self.total_tokens += tokens - self._tokens[index]
+        self._messages[index] = message
+        self._tokens[index] = tokens
+
+    def _truncate_tool_outputs(self, keep_recent: int):
+        """Cut tool results but the keep_recent latest down to a short head, oldest first."""
+        tool_indexes = [i for i in range(self.pinned_count, len(self._messages))
+                        if self._messages[i].get("role") in ("function", "tool")]
+        if keep_recent:
+            tool_indexes = tool_indexes[:-keep_recent]
+        for i in tool_indexes:
+            if self.total_tokens <= self.budget:
+                return
+            if self._tokens[i] <= self.tool_output_tokens + MESSAGE_OVERHEAD_TOKENS:
+                continue
+            content = self._messages[i].get("content") or ""
+            keep_chars = self.tool_output_tokens * 4
+            truncated = dict(self._messages[i])
+            truncated["content"] = (content[:keep_chars]
+                                    + f"\n... [truncated {len(content) - keep_chars} chars of tool output]")
+            self._replace(i, truncated)
+            if truncated.get("tool_call_id"):
+                self._truncated_calls.add(truncated["tool_call_id"])
+
+    def _turn_length(self, index: int) -> int:
+        """Number of messages in the turn starting at index: everything up to
+        the next user message."""
+        end = index + 1
+        while end < len(self._messages) and self._messages[end].get("role") != "user":
+            end += 1
+        return end - index
+
+    def _group_length(self, index: int) -> int:
+        """Number of messages in the group starting at index: an assistant
+        message with its tool results, or a single message."""
+        end = index + 1
+        if self._messages[index].get("tool_calls") or self._messages[index].get("function_call"):
+            while end < len(self._messages) and self._messages[end].get("role") in ("function", "tool"):
+                end += 1
+        return end - index
+
+    def _drop_oldest(self):
+        """Drop the oldest unpinned turns, keeping the latest one.
+
+        The latest turn holds the question being answered, so if it is still
+        too large only its older tool calls are dropped, never the question
+        itself. A tool call and its results are dropped together: the API
+        rejects a tool result without the call that produced it, and a call
+        without all of its results.
+        """
+        while self.total_tokens > self.budget:
+            length = self._turn_length(self.pinned_count)
+            if self.pinned_count + length >= len(self._messages):
+                break
+            for _ in range(length):
+                self._pop(self.pinned_count)
+        start = self.pinned_count
+        if start < len(self._messages) and self._messages[start].get("role") == "user":
+            start += 1
+        while self.total_tokens > self.budget:
+            length = self._group_length(start)
+            if start + length >= len(self._messages):
+                return
+            for _ in range(length):
+                self._pop(start)
+
+    def _pop(self, index: int):
+        self._messages.pop(index)
+        self.total_tokens -= self._tokens.pop(index)
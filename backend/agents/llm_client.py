@@ -0,0 +1,105 @@
+"""
+Shared async OpenAI client for all agents.
+Keeps one connection pool per process and caps how many completions run at once.
+"""
+
+import asyncio
+import importlib
+import os
+import time
+from typing import TYPE_CHECKING, Any, AsyncIterator, Optional
+
+from telemetry.metrics import llm_first_token_seconds, llm_request_seconds
+from telemetry.tracing import span
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+
+def _record_usage(current_span, usage: Any):
+    if usage is not None:
+        current_span.set(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+
+
+class LLMClient:
+    """Process-wide wrapper around AsyncOpenAI with a concurrency cap."""
+
+    def __init__(self, max_concurrency: Optional[int] = None):
+        """
+        Initialize the client wrapper.
+
+        Args:
+            max_concurrency: Maximum number of in-flight completions for this
+                process. Defaults to the LLM_MAX_CONCURRENCY env var (32).
+        """
+        self.max_concurrency = max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", 32))
+        self._client: Optional["AsyncOpenAI"] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def client(self) -> "AsyncOpenAI":
+        """Create the underlying AsyncOpenAI client on first use."""
+        if self._client is None:
+            # The SDK takes a few hundred ms to import, so it is loaded here
+            # (or by warm_up) rather than when this module is imported.
+            from openai import AsyncOpenAI
+            self._client = AsyncOpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                # OPENAI_BASE_URL lets us point at a local fake server for benchmarks.
+                base_url=os.getenv("OPENAI_BASE_URL") or None,
+                timeout=float(os.getenv("OPENAI_TIMEOUT", 120)),
+            )
+        return self._client
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def chat_completion(self, **kwargs: Any):
+        """Run chat.completions.create without blocking the event loop."""
+        async with self.semaphore:
+            with span("llm.chat_completion", llm_request_seconds, operation="chat", model=kwargs.get("model")) as s:
+                response = await self.client.chat.completions.create(**kwargs)
+                _record_usage(s, response.usage)
+                return response
+
+    async def stream_chat_completion(self, **kwargs: Any) -> AsyncIterator[Any]:
+        """Yield completion chunks as they arrive, holding a slot until the stream ends."""
+        model = kwargs.get("model")
+        async with self.semaphore:
+            with span("llm.stream_chat_completion", llm_request_seconds, operation="stream", model=model) as s:
+                started = time.perf_counter()
+                first = True
+                stream = await self.client.chat.completions.create(
+                    stream=True, stream_options={"include_usage": True}, **kwargs
+                )
+                async for chunk in stream:
+                    if first:
+                        first = False
+                        llm_first_token_seconds.observe(time.perf_counter() - started, model=model)
+                    if chunk.usage is not None:
+                        _record_usage(s, chunk.usage)
+                    yield chunk
+
+    async def embeddings(self, **kwargs: Any):
+        """Run embeddings.create, sharing the concurrency cap with completions."""
+        async with self.semaphore:
+            with span("llm.embeddings", llm_request_seconds, operation="embeddings", model=kwargs.get("model")):
+                return await self.client.embeddings.create(**kwargs)
+
+    async def warm_up(self):
+        """Import the OpenAI SDK off the event loop and create the client."""
+        await asyncio.to_thread(importlib.import_module, "openai")
+        _ = self.client
+
+    async def aclose(self):
+        """Close the shared HTTP connection pool."""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+# Global instance
+llm_client = LLMClient()
@@ -0,0 +1,152 @@
+"""
+Declarative agent registry.
+Agents are listed in agents/agents.json (or AGENTS_CONFIG) as a name, the
+class that implements them and optional constructor settings. Nothing is
+imported or constructed until an agent is first used or preloaded, so adding
+agents does not add to startup time or memory.
+"""
+
+import asyncio
+import importlib
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(__file__), "agents.json")
+
+
+class AgentSpec:
+    """How to build one agent."""
+
+    def __init__(self, name: str, factory: str, settings: Optional[Dict[str, Any]] = None,
+                 preload: bool = False):
+        """
+        Args:
+            name: Name used in requests (MessageRequest.agent_name)
+            factory: "module:Class" (or any callable) that builds the agent
+            settings: Keyword arguments passed to the factory
+            preload: Build this agent at startup instead of on first use
+        """
+        self.name = name
+        self.factory = factory
+        self.settings = settings or {}
+        self.preload = preload
+
+    @classmethod
+    def from_config(cls, entry: Dict[str, Any]) -> "AgentSpec":
+        entry = dict(entry)
+        name = entry.pop("name")
+        factory = entry.pop("class", "agents.configured_agent:ConfiguredAgent")
+        preload = bool(entry.pop("preload", False))
+        # Config-only agents also need their name passed to the constructor
+        if factory.endswith(":ConfiguredAgent"):
+            entry.setdefault("name", name)
+        return cls(name, factory, entry, preload)
+
+    def resolve(self) -> Callable[..., Any]:
+        if callable(self.factory):
+            return self.factory
+        module_name, _, attr = self.factory.partition(":")
+        return getattr(importlib.import_module(module_name), attr)
+
+    def build(self) -> Any:
+        return self.resolve()(**self.settings)
+
+
+class AgentRegistry:
+    """Name -> agent lookup with lazy, de-duplicated construction."""
+
+    def __init__(self, config_path: Optional[str] = None):
+        """
+        Initialize the registry from a JSON list of agent specs.
+
+        Args:
+            config_path: Agent config file (AGENTS_CONFIG, default agents/agents.json)
+        """
+        self.config_path = config_path or os.getenv("AGENTS_CONFIG") or DEFAULT_CONFIG_PATH
+        self._specs: Dict[str, AgentSpec] = {}
+        self._agents: Dict[str, Any] = {}
+        self._pending: Dict[str, asyncio.Future] = {}
+        self.load_config()
+
+    def load_config(self):
+        with open(self.config_path, "r", encoding="utf-8") as f:
+            for entry in json.load(f):
+                self.register(AgentSpec.from_config(entry))
+
+    def register(self, spec: AgentSpec):
+        """Add or replace an agent spec; a replaced agent is rebuilt on next use."""
+        self._specs[spec.name] = spec
+        self._agents.pop(spec.name, None)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._specs
+
+    def names(self) -> List[str]:
+        return list(self._specs)
+
+    def loaded(self) -> List[Any]:
+        """Agents that have been constructed so far."""
+        return list(self._agents.values())
+
+    async def get(self, name: str) -> Any:
+        """
+        Return the agent for name, constructing it on first use.
+
+        Raises:
+            KeyError: If no agent with that name is configured
+        """
+        agent = self._agents.get(name)
+        if agent is not None:
+            return agent
+        spec = self._specs[name]
+        task = self._pending.get(name)
+        if task is None:
+            task = asyncio.ensure_future(self._build(spec))
+            self._pending[name] = task
+            task.add_done_callback(lambda _: self._pending.pop(name, None))
+        agent = await asyncio.shield(task)
+        self._agents.setdefault(name, agent)
+        return self._agents[name]
+
+    @staticmethod
+    async def _build(spec: AgentSpec) -> Any:
+        # Constructors may do blocking setup, so build off the event loop;
+        # async setup such as database lookups runs in the agent's warm_up.
+        agent = await asyncio.to_thread(spec.build)
+        warm_up = getattr(agent, "warm_up", None)
+        if warm_up is not None:
+            await warm_up()
+        return agent
+
+    async def preload(self, names: Optional[List[str]] = None) -> Dict[str, str]:
+        """
+        Build agents in parallel (those marked preload, or AGENTS_PRELOAD=all|none|Name,...).
+
+        Returns:
+            Error message per agent that could not be built
+        """
+        if names is None:
+            setting = os.getenv("AGENTS_PRELOAD", "").strip()
+            if setting == "all":
+                names = self.names()
+            elif setting == "none":
+                names = []
+            elif setting:
+                names = [n.strip() for n in setting.split(",") if n.strip()]
+            else:
+                names = [spec.name for spec in self._specs.values() if spec.preload]
+        results = await asyncio.gather(*(self.get(name) for name in names), return_exceptions=True)
+        errors = {}
+        for name, result in zip(names, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Failed to preload agent {name}: {result}")
+                errors[name] = str(result)
+        return errors
+
+
+# Global instance
+agent_registry = AgentRegistry()
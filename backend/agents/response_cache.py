@@ -0,0 +1,179 @@
+"""
+Opt-in cache of final agent responses for repeated prompts.
+Entries are keyed on the agent, its tool-schema hash, the workspace
+generation and the normalized message. Lookups are exact, with an optional
+embedding-similarity fallback. Entries expire after a TTL, are evicted LRU,
+and are dropped when a tool writes a file they depend on: each entry remembers
+the workspace paths its tool calls touched (or that it looked at the whole
+workspace).
+"""
+
+import math
+import operator
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from memory.embeddings import Embedder, create_embedder
+from tools.workspace_events import workspace_events
+from tools.workspace_index import workspace_index
+
+Key = Tuple[str, str, int, str]
+
+
+def normalize_message(message: str) -> str:
+    """Case- and whitespace-insensitive form of a message, without trailing punctuation."""
+    return re.sub(r"\s+", " ", message).strip().rstrip("?!.").strip().lower()
+
+
+class _Entry:
+    __slots__ = ("response", "created", "paths", "workspace_wide", "vector")
+
+    def __init__(self, response: str, paths: Tuple[str, ...], workspace_wide: bool,
+                 vector: Optional[List[float]]):
+        self.response = response
+        self.created = time.monotonic()
+        self.paths = paths
+        self.workspace_wide = workspace_wide
+        self.vector = vector
+
+    def depends_on(self, path: str) -> bool:
+        return self.workspace_wide or any(
+            path == p or path.startswith(p.rstrip(os.sep) + os.sep) for p in self.paths
+        )
+
+
+class ResponseCache:
+    """LRU + TTL cache of agent responses with per-agent hit rates."""
+
+    def __init__(self, enabled: Optional[bool] = None, max_entries: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None, similarity: Optional[float] = None,
+                 embedder: Optional[Embedder] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            enabled: Use the cache at all (RESPONSE_CACHE_ENABLED, default false)
+            max_entries: Entries kept before LRU eviction (RESPONSE_CACHE_MAX_ENTRIES, default 500)
+            ttl_seconds: Entry lifetime (RESPONSE_CACHE_TTL_SECONDS, default 600)
+            similarity: Minimum cosine similarity for a near-match hit
+                (RESPONSE_CACHE_SIMILARITY, default 0 = exact matches only)
+            embedder: Embedder for near-match lookups (EMBEDDING_PROVIDER)
+        """
+        if enabled is None:
+            enabled = os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+        self.enabled = enabled
+        self.max_entries = max_entries or int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 500))
+        self.ttl_seconds = ttl_seconds or float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 600))
+        self.similarity = similarity if similarity is not None else float(os.getenv("RESPONSE_CACHE_SIMILARITY", 0))
+        self._embedder = embedder
+        self._entries: "OrderedDict[Key, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._subscribed = False
+        # agent -> [exact hits, similar hits, misses]
+        self._counts: Dict[str, List[int]] = {}
+        self.invalidations = 0
+
+    @property
+    def embedder(self) -> Embedder:
+        if self._embedder is None:
+            self._embedder = create_embedder()
+        return self._embedder
+
+    def _key(self, agent: str, schema_hash: str, message: str) -> Key:
+        # Edits made outside the tools bump the index generation, which retires every entry
+        return (agent, schema_hash, workspace_index.generation, normalize_message(message))
+
+    async def _vector(self, text: str) -> List[float]:
+        vector = (await self.embedder.embed([text]))[0]
+        norm = math.sqrt(sum(v * v for v in vector))
+        return [v / norm for v in vector] if norm else list(vector)
+
+    def _count(self, agent: str, slot: int):
+        self._counts.setdefault(agent, [0, 0, 0])[slot] += 1
+
+    async def get(self, agent: str, schema_hash: str, message: str) -> Optional[str]:
+        """Return a cached response for this message, or None."""
+        if not self.enabled:
+            return None
+        key = self._key(agent, schema_hash, message)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry.created > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._count(agent, 0)
+                return entry.response
+        if self.similarity > 0:
+            vector = await self._vector(key[3])
+            best, best_score = None, self.similarity
+            with self._lock:
+                for other, candidate in self._entries.items():
+                    if other[:3] != key[:3] or candidate.vector is None:
+                        continue
+                    if now - candidate.created > self.ttl_seconds:
+                        continue
+                    score = sum(map(operator.mul, vector, candidate.vector))
+                    if score >= best_score:
+                        best, best_score = other, score
+                if best is not None:
+                    self._entries.move_to_end(best)
+                    self._count(agent, 1)
+                    return self._entries[best].response
+        with self._lock:
+            self._count(agent, 2)
+        return None
+
+    async def put(self, agent: str, schema_hash: str, message: str, response: str,
+                  paths: Iterable[str] = (), workspace_wide: bool = False):
+        """
+        Store a response.
+
+        Args:
+            paths: Absolute workspace paths (files or directories) the response depended on
+            workspace_wide: The response depended on the workspace as a whole (e.g. a search)
+        """
+        if not self.enabled:
+            return
+        if not self._subscribed:
+            workspace_events.subscribe(self._on_change)
+            self._subscribed = True
+        key = self._key(agent, schema_hash, message)
+        vector = await self._vector(key[3]) if self.similarity > 0 else None
+        with self._lock:
+            self._entries[key] = _Entry(response, tuple(os.path.abspath(p) for p in paths),
+                                        workspace_wide, vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _on_change(self, path: str):
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry.depends_on(path)]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            agents = {}
+            for agent, (hits, similar, misses) in self._counts.items():
+                lookups = hits + similar + misses
+                agents[agent] = {"hits": hits, "similar_hits": similar, "misses": misses,
+                                 "hit_rate": round((hits + similar) / lookups, 4) if lookups else 0.0}
+            return {"enabled": self.enabled, "entries": len(self._entries),
+                    "invalidations": self.invalidations, "agents": agents}
+
+
+# Global instance
+response_cache = ResponseCache()
@@ -0,0 +1,251 @@
+"""
+Per-thread conversation sessions for agents.
+Each thread_id gets its own message list and lock so concurrent users of the
+same agent never share context. Idle sessions are evicted (LRU + TTL) and
+rebuilt on the next request, from the shared session store when one is
+configured (so any worker can serve any thread) or else from the messages table.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from agents.context_window import ContextWindow
+from agents.session_store import SessionStore, session_store
+from tools.tool_memo import ToolMemo
+
+logger = logging.getLogger(__name__)
+
+
+def _message_size(message: Dict[str, Any]) -> int:
+    """Rough byte size of a chat message, used for the memory cap."""
+    content = message.get("content")
+    size = len(content) if isinstance(content, str) else 0
+    for key in ("function_call", "tool_calls"):
+        if message.get(key) is not None:
+            size += len(str(message[key]))
+    return size + 64
+
+
+class AgentSession:
+    """Conversation state for a single thread."""
+
+    def __init__(self, thread_id: str, messages: ContextWindow):
+        self.thread_id = thread_id
+        self.messages = messages
+        self.lock = asyncio.Lock()
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        # last_used at the time of the latest stored summary
+        self.summarized_at = 0.0
+        # Idempotent tool results already produced in this conversation
+        self.tool_memo = ToolMemo()
+        # Version of this conversation in the session store when last loaded or saved
+        self.store_version = 0
+        # Messages created up to this ISO timestamp are covered by a stored summary
+        self.summarized_through: Optional[str] = None
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(_message_size(m) for m in self.messages)
+
+    @property
+    def needs_summary(self) -> bool:
+        """True if the user said something since the last summary."""
+        if self.last_used <= self.summarized_at:
+            return False
+        return any(m.get("role") == "user" for m in self.messages[self.messages.pinned_count:])
+
+    def touch(self):
+        self.last_used = time.monotonic()
+
+
+class SessionManager:
+    """LRU/TTL cache of AgentSession objects keyed by thread_id."""
+
+    def __init__(self,
+                 build_context: Callable[[Optional[str]], Awaitable[List[Dict[str, Any]]]],
+                 load_history: Optional[Callable[[str, Optional[str]], Awaitable[List[Dict[str, Any]]]]] = None,
+                 max_sessions: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None,
+                 max_bytes: Optional[int] = None,
+                 name: str = "",
+                 store: Optional[SessionStore] = None):
+        """
+        Initialize the session manager.
+
+        Args:
+            build_context: Async builder of the starting messages (system prompt, summaries),
+                called with the message that opened the session
+            load_history: Async loader for a thread's past chat messages, called with
+                the thread ID and the timestamp only later messages are wanted after (or None)
+            max_sessions: Max sessions kept in memory (SESSION_MAX_COUNT)
+            ttl_seconds: Idle time before a session is evicted (SESSION_TTL_SECONDS)
+            max_bytes: Approximate memory cap across sessions (SESSION_MAX_BYTES)
+            name: Agent name, the session store key along with thread_id
+            store: Session store (SESSION_STORE); the global one by default
+        """
+        self.build_context = build_context
+        self.load_history = load_history
+        self.max_sessions = max_sessions or int(os.getenv("SESSION_MAX_COUNT", 1000))
+        self.ttl_seconds = ttl_seconds or float(os.getenv("SESSION_TTL_SECONDS", 3600))
+        self.max_bytes = max_bytes or int(os.getenv("SESSION_MAX_BYTES", 64 * 1024 * 1024))
+        self.name = name
+        self.store = store or session_store
+        self._sessions: "OrderedDict[str, AgentSession]" = OrderedDict()
+        # In-flight rehydrations, so two requests for a new thread share one load.
+        self._pending: Dict[str, "asyncio.Task[AgentSession]"] = {}
+        # thread_id -> summarized_through of threads reset after a summary, most recent last
+        self._summarized_through: "OrderedDict[str, str]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, thread_id: str) -> bool:
+        return thread_id in self._sessions
+
+    async def get(self, thread_id: str, pending_message: Optional[str] = None) -> AgentSession:
+        """
+        Return the session for a thread, rehydrating it on a cache miss.
+
+        Args:
+            thread_id: Conversation thread ID
+            pending_message: The user message about to be processed. If the
+                stored history already ends with it (main.py saves it before
+                calling the agent), it is dropped to avoid a duplicate.
+        """
+        session = self._sessions.get(thread_id)
+        if self.store.shared:
+            # Picks up other workers' workspace changes, and drops our copy if
+            # another worker has continued this thread since we last saw it
+            version = await self._sync(thread_id)
+            if (session is not None and version is not None and version != session.store_version
+                    and not session.lock.locked()):
+                self._sessions.pop(thread_id, None)
+                session = None
+        if session is None:
+            task = self._pending.get(thread_id)
+            if task is None:
+                task = asyncio.ensure_future(self._create(thread_id, pending_message))
+                self._pending[thread_id] = task
+                task.add_done_callback(lambda _: self._pending.pop(thread_id, None))
+            session = await asyncio.shield(task)
+        self._sessions.move_to_end(thread_id)
+        session.touch()
+        self.evict(keep=thread_id)
+        return session
+
+    def sessions(self) -> List[AgentSession]:
+        return list(self._sessions.values())
+
+    def peek(self, thread_id: str) -> Optional[AgentSession]:
+        """The live session for a thread, without rehydrating or touching it."""
+        return self._sessions.get(thread_id)
+
+    def drop(self, thread_id: str) -> Optional[AgentSession]:
+        return self._sessions.pop(thread_id, None)
+
+    async def reset(self, thread_id: str, summarized_through: str):
+        """
+        Forget a thread's conversation once it has been summarized, here and in
+        the session store. Its next request starts with only the messages
+        created after summarized_through, so they are not summarized again.
+
+        Args:
+            thread_id: Conversation thread ID
+            summarized_through: ISO timestamp the summary covers messages up to
+        """
+        self.drop(thread_id)
+        self._summarized_through[thread_id] = summarized_through
+        self._summarized_through.move_to_end(thread_id)
+        while len(self._summarized_through) > self.max_sessions:
+            self._summarized_through.popitem(last=False)
+        if self.store.shared:
+            # Saved rather than deleted, so other workers drop their copy and keep the cursor
+            state = {"history": [], "truncated_calls": [], "summarized_through": summarized_through}
+            try:
+                await self.store.save(self.name, thread_id, state)
+            except Exception as e:
+                logger.error(f"Could not reset session {self.name}/{thread_id}: {e}")
+
+    async def save(self, session: AgentSession):
+        """Write a session to the shared store after a request (no-op for the in-process store)."""
+        if not self.store.shared:
+            return
+        state = {"history": session.messages.history(), "truncated_calls": session.messages.truncated_calls,
+                 "summarized_through": session.summarized_through}
+        try:
+            session.store_version = await self.store.save(self.name, session.thread_id, state)
+        except Exception as e:
+            logger.error(f"Could not save session {self.name}/{session.thread_id}: {e}")
+
+    async def is_current(self, session: AgentSession) -> bool:
+        """False if another worker has saved a newer version of this session."""
+        if not self.store.shared:
+            return True
+        version = await self._sync(session.thread_id)
+        return version is None or version == session.store_version
+
+    async def _sync(self, thread_id: str) -> Optional[int]:
+        try:
+            return await self.store.sync(self.name, thread_id)
+        except Exception as e:
+            logger.error(f"Session store sync failed for {self.name}/{thread_id}: {e}")
+            return None
+
+    def evict(self, keep: Optional[str] = None):
+        """Evict expired sessions, then least-recently-used ones over the caps."""
+        now = time.monotonic()
+        for thread_id, session in list(self._sessions.items()):
+            if now - session.last_used > self.ttl_seconds and not session.lock.locked():
+                del self._sessions[thread_id]
+
+        total_bytes = sum(s.size_bytes for s in self._sessions.values())
+        for thread_id, session in list(self._sessions.items()):
+            if len(self._sessions) <= self.max_sessions and total_bytes <= self.max_bytes:
+                break
+            # Never evict a session that is mid-request; it is re-added on its next use.
+            if thread_id == keep or session.lock.locked():
+                continue
+            total_bytes -= session.size_bytes
+            del self._sessions[thread_id]
+
+    async def _create(self, thread_id: str, pending_message: Optional[str]) -> AgentSession:
+        stored = None
+        if self.store.shared:
+            try:
+                stored = await self.store.load(self.name, thread_id)
+            except Exception as e:
+                logger.error(f"Session store load failed for {thread_id}: {e}")
+        if stored is not None:
+            version, state = stored
+            pinned = await self.build_context(pending_message)
+            session = AgentSession(thread_id, ContextWindow(pinned, state["history"],
+                                                            truncated_calls=state.get("truncated_calls")))
+            session.store_version = version
+            session.summarized_through = state.get("summarized_through")
+        else:
+            summarized_through = self._summarized_through.get(thread_id)
+            pinned, history = await self._rehydrate(thread_id, pending_message, summarized_through)
+            session = AgentSession(thread_id, ContextWindow(pinned, history))
+            session.summarized_through = summarized_through
+        self._sessions[thread_id] = session
+        return session
+
+    async def _rehydrate(self, thread_id: str, pending_message: Optional[str],
+                         summarized_through: Optional[str]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Return the pinned starting context and the thread's past messages not yet summarized."""
+        pinned = await self.build_context(pending_message)
+        if self.load_history is None:
+            return pinned, []
+        try:
+            history = await self.load_history(thread_id, summarized_through)
+        except Exception as e:
+            logger.error(f"Session rehydrate failed for {thread_id}: {e}")
+            history = []
+        if pending_message is not None and history and history[-1] == {"role": "user", "content": pending_message}:
+            history = history[:-1]
+        return pinned, history
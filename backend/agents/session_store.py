@@ -0,0 +1,249 @@
+"""
+Shared storage for agent sessions across server worker processes.
+SessionManager keeps live sessions in memory; with a shared store each turn
+is also saved here, so any worker can pick up any thread_id, and a worker
+whose copy is older than the stored one reloads it. The SQLite store also
+relays workspace changes between workers, so caches keyed on
+workspace_events (tool memo, response cache, workspace index) see edits
+made by other processes.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from tools.workspace_events import workspace_events
+
+logger = logging.getLogger(__name__)
+
+# (version, state) of a stored session
+StoredSession = Tuple[int, Dict[str, Any]]
+
+
+class SessionStore(ABC):
+    """Where sessions are kept besides the SessionManager of the worker using them."""
+
+    name = "store"
+    # Whether sessions are visible to other worker processes
+    shared = False
+
+    def start(self):
+        """Called once the event loop is running (app startup)."""
+
+    @abstractmethod
+    async def sync(self, agent: str, thread_id: str) -> int:
+        """Apply changes from other workers and return the stored version of a session (0 if none)."""
+
+    @abstractmethod
+    async def load(self, agent: str, thread_id: str) -> Optional[StoredSession]:
+        pass
+
+    @abstractmethod
+    async def save(self, agent: str, thread_id: str, state: Dict[str, Any]) -> int:
+        """Store a session's state and return its new version."""
+
+    @abstractmethod
+    async def delete(self, agent: str, thread_id: str):
+        pass
+
+    async def close(self):
+        pass
+
+
+class InProcessSessionStore(SessionStore):
+    """Sessions live only in their worker's memory; with several workers a
+    thread should be pinned to one of them."""
+
+    name = "memory"
+
+    async def sync(self, agent: str, thread_id: str) -> int:
+        return 0
+
+    async def load(self, agent: str, thread_id: str) -> Optional[StoredSession]:
+        return None
+
+    async def save(self, agent: str, thread_id: str, state: Dict[str, Any]) -> int:
+        return 0
+
+    async def delete(self, agent: str, thread_id: str):
+        pass
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    agent TEXT NOT NULL, thread_id TEXT NOT NULL, version INTEGER NOT NULL,
+    state TEXT NOT NULL, updated_at REAL NOT NULL,
+    PRIMARY KEY (agent, thread_id)
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_updated_at ON sessions(updated_at);
+CREATE TABLE IF NOT EXISTS workspace_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT, origin TEXT NOT NULL, path TEXT NOT NULL
+);
+"""
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions and workspace changes in a SQLite file shared by all workers on a host."""
+
+    name = "sqlite"
+    shared = True
+
+    def __init__(self, path: Optional[str] = None, ttl_seconds: Optional[float] = None,
+                 change_log_size: Optional[int] = None):
+        """
+        Initialize the store; the database is opened on first use.
+
+        Args:
+            path: Database file (SESSION_STORE_PATH)
+            ttl_seconds: Sessions unused this long are deleted (SESSION_STORE_TTL_SECONDS)
+            change_log_size: Workspace changes kept for workers to catch up on
+                (SESSION_STORE_CHANGE_LOG_SIZE)
+        """
+        self.path = path or os.getenv("SESSION_STORE_PATH", "./.sessions.db")
+        self.ttl_seconds = ttl_seconds or float(os.getenv("SESSION_STORE_TTL_SECONDS", 86400))
+        self.change_log_size = change_log_size or int(os.getenv("SESSION_STORE_CHANGE_LOG_SIZE", 10000))
+        # Identifies this process's own entries in the change log
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        # One connection, used only from this thread
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-store")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._last_change = 0
+        self._saves = 0
+        # Set while replaying another worker's change, so it is not logged again
+        self._replaying = threading.local()
+        self._started = False
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False,
+                                         isolation_level=None)
+            # WAL lets workers read while another one writes
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SQLITE_SCHEMA)
+        return self._conn
+
+    async def _run(self, func: Callable, *args) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args))
+
+    def start(self):
+        """Start relaying this worker's workspace changes; older changes are skipped."""
+        if self._started:
+            return
+        self._started = True
+        self._executor.submit(self._skip_old_changes).result()
+        workspace_events.subscribe(self._on_change)
+
+    def _skip_old_changes(self):
+        row = self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM workspace_changes").fetchone()
+        self._last_change = row[0]
+
+    def _on_change(self, path: str):
+        if getattr(self._replaying, "active", False):
+            return
+        # Runs on the publishing thread; the write happens on the store's thread.
+        self._executor.submit(self._log_change, path)
+
+    def _log_change(self, path: str):
+        try:
+            self.conn.execute("INSERT INTO workspace_changes (origin, path) VALUES (?, ?)", (self.origin, path))
+        except sqlite3.Error as e:
+            logger.warning(f"Could not share workspace change {path}: {e}")
+
+    def _sync(self, agent: str, thread_id: str) -> int:
+        changes = []
+        if self._started:
+            rows = self.conn.execute("SELECT seq, origin, path FROM workspace_changes WHERE seq > ? ORDER BY seq",
+                                     (self._last_change,)).fetchall()
+            if rows and rows[0][0] > self._last_change + 1:
+                # Older entries were pruned before this worker saw them
+                logger.warning("Missed workspace changes from other workers; treating the whole workspace as changed")
+                changes.append(os.path.abspath(os.getenv("WORKSPACE_PATH", "./workspace")))
+            for seq, origin, path in rows:
+                self._last_change = seq
+                if origin != self.origin:
+                    changes.append(path)
+        if changes:
+            self._replaying.active = True
+            try:
+                for path in dict.fromkeys(changes):
+                    workspace_events.publish(path)
+            finally:
+                self._replaying.active = False
+        row = self.conn.execute("SELECT version FROM sessions WHERE agent = ? AND thread_id = ?",
+                                (agent, thread_id)).fetchone()
+        return row[0] if row else 0
+
+    async def sync(self, agent: str, thread_id: str) -> int:
+        return await self._run(self._sync, agent, thread_id)
+
+    def _load(self, agent: str, thread_id: str) -> Optional[StoredSession]:
+        row = self.conn.execute("SELECT version, state FROM sessions WHERE agent = ? AND thread_id = ?",
+                                (agent, thread_id)).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    async def load(self, agent: str, thread_id: str) -> Optional[StoredSession]:
+        return await self._run(self._load, agent, thread_id)
+
+    def _save(self, agent: str, thread_id: str, state: Dict[str, Any]) -> int:
+        now = time.time()
+        row = self.conn.execute(
+            "INSERT INTO sessions (agent, thread_id, version, state, updated_at) VALUES (?, ?, 1, ?, ?) "
+            "ON CONFLICT (agent, thread_id) DO UPDATE SET version = version + 1, "
+            "state = excluded.state, updated_at = excluded.updated_at RETURNING version",
+            (agent, thread_id, json.dumps(state, default=str), now)
+        ).fetchone()
+        self._saves += 1
+        if self._saves % 500 == 0:
+            self._prune(now)
+        return row[0]
+
+    def _prune(self, now: float):
+        self.conn.execute("DELETE FROM sessions WHERE updated_at < ?", (now - self.ttl_seconds,))
+        self.conn.execute("DELETE FROM workspace_changes WHERE seq <= "
+                          "(SELECT MAX(seq) FROM workspace_changes) - ?", (self.change_log_size,))
+
+    async def save(self, agent: str, thread_id: str, state: Dict[str, Any]) -> int:
+        return await self._run(self._save, agent, thread_id, state)
+
+    def _delete(self, agent: str, thread_id: str):
+        self.conn.execute("DELETE FROM sessions WHERE agent = ? AND thread_id = ?", (agent, thread_id))
+
+    async def delete(self, agent: str, thread_id: str):
+        await self._run(self._delete, agent, thread_id)
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def close(self):
+        """Write out pending change-log entries and close the database."""
+        workspace_events.unsubscribe(self._on_change)
+        self._started = False
+        await self._run(self._close)
+
+
+def create_session_store(name: Optional[str] = None) -> SessionStore:
+    """Build the store selected by SESSION_STORE (memory or sqlite)."""
+    name = (name or os.getenv("SESSION_STORE", "memory")).lower()
+    if name == "memory":
+        return InProcessSessionStore()
+    if name == "sqlite":
+        return SQLiteSessionStore()
+    raise ValueError(f"Unknown SESSION_STORE: {name}")
+
+
+# Global instance
+session_store = create_session_store()
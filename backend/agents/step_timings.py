@@ -0,0 +1,63 @@
+"""
+Timing hooks for agent steps.
+The agent engine reports every LLM call and tool call here. Running totals
+are kept per (agent, kind, name), and any registered hook receives each
+event as it happens, e.g. to export metrics.
+"""
+
+import logging
+from typing import Any, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+StepHook = Callable[[Dict[str, Any]], None]
+
+
+class StepTimings:
+    """Collects LLM and tool call timings and fans them out to hooks."""
+
+    def __init__(self):
+        self._hooks: List[StepHook] = []
+        # (agent, kind, name) -> [count, errors, total seconds, max seconds]
+        self._totals: Dict[Tuple[str, str, str], List[float]] = {}
+
+    def add_hook(self, hook: StepHook):
+        """
+        Call hook(event) for every recorded step.
+
+        Events have "kind" ("llm" or "tool"), "agent", "thread_id", "name"
+        (model or tool name), "step", "seconds" and "status" ("success",
+        "error", "timeout" or "cancelled"). LLM events also carry
+        "first_token_seconds" and "usage". Hooks run on the event loop and
+        must not block.
+        """
+        if hook not in self._hooks:
+            self._hooks.append(hook)
+
+    def remove_hook(self, hook: StepHook):
+        if hook in self._hooks:
+            self._hooks.remove(hook)
+
+    def record(self, event: Dict[str, Any]):
+        key = (event["agent"], event["kind"], event["name"])
+        totals = self._totals.setdefault(key, [0, 0, 0.0, 0.0])
+        totals[0] += 1
+        totals[1] += event["status"] != "success"
+        totals[2] += event["seconds"]
+        totals[3] = max(totals[3], event["seconds"])
+        for hook in self._hooks:
+            try:
+                hook(event)
+            except Exception as e:
+                logger.warning(f"Step timing hook failed: {e}")
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [
+            {"agent": agent, "kind": kind, "name": name, "count": int(count), "errors": int(errors),
+             "avg_seconds": round(total / count, 4), "max_seconds": round(peak, 4)}
+            for (agent, kind, name), (count, errors, total, peak) in sorted(self._totals.items())
+        ]
+
+
+# Global instance
+step_timings = StepTimings()
@@ -0,0 +1,182 @@
+"""
+Background summarization of conversation sessions.
+Summaries are produced by a small pool of worker tasks fed by a queue, never
+on the request path. Jobs are deduplicated per (agent, thread), retried with
+exponential backoff, and queued either explicitly (client exit) or when a
+session has been idle for a while.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+JobKey = Tuple[str, str]
+
+
+class SummaryQueue:
+    """Deduplicating job queue that runs agent.log_conversation(thread_id) in the background."""
+
+    def __init__(self, workers: Optional[int] = None, max_retries: Optional[int] = None,
+                 retry_backoff: Optional[float] = None, idle_seconds: Optional[float] = None,
+                 max_size: Optional[int] = None):
+        """
+        Initialize the queue. Workers start with start().
+
+        Args:
+            workers: Concurrent summarizations (SUMMARY_WORKERS, default 2)
+            max_retries: Attempts after the first failure (SUMMARY_MAX_RETRIES, default 3)
+            retry_backoff: First retry delay in seconds, doubled each time (SUMMARY_RETRY_BACKOFF, default 2)
+            idle_seconds: Idle time after which a session is summarized (SUMMARY_IDLE_SECONDS, default 600; 0 disables)
+            max_size: Max queued jobs; further jobs are dropped (SUMMARY_QUEUE_SIZE, default 1000)
+        """
+        self.workers = workers or int(os.getenv("SUMMARY_WORKERS", 2))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("SUMMARY_MAX_RETRIES", 3))
+        self.retry_backoff = retry_backoff or float(os.getenv("SUMMARY_RETRY_BACKOFF", 2))
+        self.idle_seconds = idle_seconds if idle_seconds is not None else float(os.getenv("SUMMARY_IDLE_SECONDS", 600))
+        self.max_size = max_size or int(os.getenv("SUMMARY_QUEUE_SIZE", 1000))
+        self._agents: Dict[str, Any] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._queued: Set[JobKey] = set()
+        self._running: Set[JobKey] = set()
+        # Jobs submitted again while running; re-queued when the run finishes
+        self._rerun: Set[JobKey] = set()
+        self._tasks: List[asyncio.Task] = []
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self.dropped = 0
+
+    def register(self, agent: Any):
+        """Make an agent's sessions eligible for idle and client-exit summarization."""
+        self._agents[agent.name] = agent
+
+    @property
+    def queue(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+        return self._queue
+
+    def start(self):
+        """Start the workers and the idle monitor on the running event loop."""
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        if self.idle_seconds > 0:
+            self._tasks.append(asyncio.create_task(self._idle_monitor()))
+
+    async def stop(self, timeout: float = 0):
+        """Stop the workers, first waiting up to timeout seconds for queued jobs."""
+        if timeout and self._tasks and self._queue is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"{self._queue.qsize()} summary jobs not finished before shutdown")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, agent_name: str, thread_id: str) -> bool:
+        """Queue a summary of one session; returns False if it was a duplicate or dropped."""
+        key = (agent_name, thread_id)
+        if key in self._queued:
+            return False
+        if key in self._running:
+            self._rerun.add(key)
+            return False
+        try:
+            self.queue.put_nowait((key, 0))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning(f"Summary queue full, dropping summary of {agent_name}/{thread_id}")
+            return False
+        self._queued.add(key)
+        return True
+
+    def submit_pending(self, thread_id: Optional[str] = None, idle_for: float = 0) -> int:
+        """
+        Queue every session with activity that has not been summarized yet.
+
+        Args:
+            thread_id: Only this thread (for every agent)
+            idle_for: Only sessions unused for at least this many seconds
+        """
+        now = time.monotonic()
+        submitted = 0
+        for agent in self._agents.values():
+            for session in agent.sessions.sessions():
+                if thread_id is not None and session.thread_id != thread_id:
+                    continue
+                if not session.needs_summary or now - session.last_used < idle_for:
+                    continue
+                submitted += self.submit(agent.name, session.thread_id)
+        return submitted
+
+    async def _worker(self):
+        while True:
+            key, attempt = await self.queue.get()
+            self._queued.discard(key)
+            self._running.add(key)
+            try:
+                await self._run(key, attempt)
+            finally:
+                self._running.discard(key)
+                if key in self._rerun:
+                    self._rerun.discard(key)
+                    self.submit(*key)
+                self.queue.task_done()
+
+    async def _run(self, key: JobKey, attempt: int):
+        agent_name, thread_id = key
+        agent = self._agents.get(agent_name)
+        if agent is None:
+            return
+        try:
+            await agent.log_conversation(thread_id)
+            self.completed += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if attempt >= self.max_retries:
+                self.failed += 1
+                logger.error(f"Giving up on summary of {agent_name}/{thread_id} after {attempt + 1} attempts: {e}")
+                return
+            self.retried += 1
+            # Exponential backoff with jitter; the retry is scheduled so this worker is freed now
+            delay = self.retry_backoff * (2 ** attempt) * random.uniform(0.8, 1.2)
+            logger.warning(f"Summary of {agent_name}/{thread_id} failed ({e}); retrying in {delay:.1f}s")
+            self._queued.add(key)
+            asyncio.get_running_loop().call_later(delay, self._requeue, key, attempt + 1)
+
+    def _requeue(self, key: JobKey, attempt: int):
+        try:
+            self.queue.put_nowait((key, attempt))
+        except asyncio.QueueFull:
+            self._queued.discard(key)
+            self.dropped += 1
+
+    async def _idle_monitor(self):
+        interval = max(1.0, min(60.0, self.idle_seconds / 4))
+        while True:
+            await asyncio.sleep(interval)
+            self.submit_pending(idle_for=self.idle_seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queued": len(self._queued),
+            "running": len(self._running),
+            "completed": self.completed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "dropped": self.dropped,
+        }
+
+
+# Global instance
+summary_queue = SummaryQueue()
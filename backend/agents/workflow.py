@@ -0,0 +1,141 @@
+"""
+Server-side review workflow: Developer writes, Critic reviews, Developer revises.
+The Critic is sent unified diffs of the files the Developer changed in this
+workflow's thread (not whole files, and not other threads' changes), every
+changed file is reviewed concurrently in its own review thread, and the loop
+stops as soon as all files are approved.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from agents.registry import agent_registry
+from db.database import database
+from tools.change_set import ChangeSet
+
+REVIEW_PROMPT = """Review this change to {path}. The unified diff is below; read the file if you need more context.
+
+Start your reply with a line that is exactly APPROVED if the change is correct and ready to keep,
+or CHANGES REQUESTED followed by the specific problems and how to fix them.
+
+```diff
+{diff}```"""
+
+REVISE_PROMPT = """The reviewer requested changes. Fix the issues below by updating the files, then briefly say what you changed.
+
+{feedback}"""
+
+
+def is_approved(review: str) -> bool:
+    """Whether a review's verdict line approves the change."""
+    for line in review.splitlines():
+        verdict = line.strip().strip("*#:. ").upper()
+        if verdict:
+            return verdict.startswith("APPROVE")
+    return False
+
+
+def _add_usage(total: Dict[str, int], context: Dict[str, Any]):
+    for key, value in (context.get("usage") or {}).items():
+        total[key] = total.get(key, 0) + value
+
+
+class ReviewWorkflow:
+    """Runs the Developer -> Critic -> Developer loop for one task."""
+
+    def __init__(self, developer: str = "Developer", critic: str = "Critic",
+                 max_rounds: Optional[int] = None, review_concurrency: Optional[int] = None,
+                 max_diff_chars: Optional[int] = None):
+        """
+        Args:
+            developer: Registry name of the agent that writes and revises
+            critic: Registry name of the reviewing agent
+            max_rounds: Review rounds before giving up (WORKFLOW_MAX_ROUNDS, default 2)
+            review_concurrency: Files reviewed at once (WORKFLOW_REVIEW_CONCURRENCY, default 4)
+            max_diff_chars: Per-file diff size sent to the reviewer (WORKFLOW_MAX_DIFF_CHARS, default 20000)
+        """
+        self.developer = developer
+        self.critic = critic
+        self.max_rounds = max(1, max_rounds or int(os.getenv("WORKFLOW_MAX_ROUNDS", 2)))
+        self.review_concurrency = review_concurrency or int(os.getenv("WORKFLOW_REVIEW_CONCURRENCY", 4))
+        self.max_diff_chars = max_diff_chars or int(os.getenv("WORKFLOW_MAX_DIFF_CHARS", 20000))
+
+    async def run(self, task: str, thread_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Run the workflow and return its outcome.
+
+        Returns:
+            Dict with "thread_id", "status" ("approved", "changes_requested" or
+            "no_changes"), the last "developer_reply", per-round "reviews",
+            the overall "diffs", summed "usage" and "seconds"
+        """
+        started = time.perf_counter()
+        thread_id = thread_id or str(uuid.uuid4())
+        developer, critic = await asyncio.gather(agent_registry.get(self.developer),
+                                                 agent_registry.get(self.critic))
+        usage: Dict[str, int] = {}
+        rounds: List[Dict[str, Any]] = []
+        status = "no_changes"
+
+        await self._save(thread_id, "user", self.developer, task, "user")
+        with ChangeSet(thread_id=thread_id) as changes:
+            context = {"thread_id": thread_id}
+            reply = await developer.process_message(task, context)
+            _add_usage(usage, context)
+            await self._save(thread_id, self.developer, "user", reply, "assistant")
+
+            for round_number in range(1, self.max_rounds + 1):
+                # Only what changed since the previous review is sent again
+                diffs = changes.diffs(since_review=True, max_chars=self.max_diff_chars)
+                if not diffs:
+                    break
+                changes.mark_reviewed()
+                reviews = await self._review(critic, thread_id, diffs, usage)
+                rounds.append({"round": round_number, "reviews": reviews})
+                rejected = {path: r["review"] for path, r in reviews.items() if not r["approved"]}
+                if not rejected:
+                    status = "approved"
+                    break
+                status = "changes_requested"
+                if round_number == self.max_rounds:
+                    break
+                feedback = "\n\n".join(f"### {path}\n{review}" for path, review in rejected.items())
+                context = {"thread_id": thread_id}
+                reply = await developer.process_message(REVISE_PROMPT.format(feedback=feedback), context)
+                _add_usage(usage, context)
+                await self._save(thread_id, self.developer, "user", reply, "assistant")
+
+            diffs = changes.diffs(max_chars=self.max_diff_chars)
+
+        return {
+            "thread_id": thread_id,
+            "status": status,
+            "developer_reply": reply,
+            "reviews": rounds,
+            "diffs": diffs,
+            "usage": usage,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+
+    async def _review(self, critic: Any, thread_id: str, diffs: Dict[str, str],
+                      usage: Dict[str, int]) -> Dict[str, Dict[str, Any]]:
+        """Review each file's diff concurrently, one Critic thread per file."""
+        semaphore = asyncio.Semaphore(self.review_concurrency)
+
+        async def review(path: str, diff: str) -> Dict[str, Any]:
+            context = {"thread_id": f"{thread_id}:review:{path}"}
+            async with semaphore:
+                text = await critic.process_message(REVIEW_PROMPT.format(path=path, diff=diff), context)
+            _add_usage(usage, context)
+            await self._save(thread_id, self.critic, self.developer, f"Review of {path}:\n\n{text}", "assistant")
+            return {"approved": is_approved(text), "review": text}
+
+        results = await asyncio.gather(*(review(path, diff) for path, diff in diffs.items()))
+        return dict(zip(diffs, results))
+
+    async def _save(self, thread_id: str, sender: str, recipient: str, content: str, role: str):
+        await database.save_message(thread_id=thread_id, sender=sender, recipient=recipient,
+                                    content=content, role=role)
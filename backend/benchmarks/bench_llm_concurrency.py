@@ -0,0 +1,56 @@
+"""
+Compare blocking vs async completions against the fake OpenAI server.
+
+Start benchmarks/fake_openai_server.py first, then run:
+    python benchmarks/bench_llm_concurrency.py [conversations]
+"""
+
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("OPENAI_BASE_URL", "http://localhost:8100/v1")
+os.environ.setdefault("OPENAI_API_KEY", "fake")
+
+from openai import OpenAI  # noqa: E402
+from agents.llm_client import LLMClient  # noqa: E402
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+async def run_blocking(n: int) -> float:
+    """Old path: sync client called from inside coroutines."""
+    client = OpenAI()
+
+    async def one():
+        client.chat.completions.create(model="fake", messages=MESSAGES)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(n)))
+    return time.perf_counter() - start
+
+
+async def run_async(n: int) -> float:
+    """New path: shared AsyncOpenAI client behind a semaphore."""
+    llm = LLMClient()
+    start = time.perf_counter()
+    await asyncio.gather(*(llm.chat_completion(model="fake", messages=MESSAGES) for _ in range(n)))
+    elapsed = time.perf_counter() - start
+    await llm.aclose()
+    return elapsed
+
+
+async def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    blocking = await run_blocking(n)
+    concurrent = await run_async(n)
+    print(f"{n} conversations")
+    print(f"  blocking client: {blocking:.2f}s")
+    print(f"  async client:    {concurrent:.2f}s ({blocking / concurrent:.1f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,57 @@
+"""
+Compare per-row awaited inserts with the write-behind queue, offline.
+
+Uses the SQLite backend (in memory by default), so no Supabase project is needed:
+    python benchmarks/bench_persistence.py [rows] [sqlite path]
+"""
+
+import asyncio
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db.backends import SQLiteBackend  # noqa: E402
+from db.database import Database  # noqa: E402
+
+
+def _row(i: int) -> dict:
+    return {"id": str(uuid.uuid4()), "thread_id": "bench", "sender": "user", "recipient": "Developer",
+            "content": f"message {i}", "role": "user", "metadata": {}}
+
+
+async def per_row(n: int, path: str) -> float:
+    backend = SQLiteBackend(path)
+    start = time.perf_counter()
+    for i in range(n):
+        await backend.insert_many("messages", [_row(i)])
+    elapsed = time.perf_counter() - start
+    await backend.close()
+    return elapsed
+
+
+async def write_behind(n: int, path: str) -> float:
+    db = Database(SQLiteBackend(path))
+    start = time.perf_counter()
+    await asyncio.gather(*(db.save_message("bench", "user", "Developer", f"message {i}", "user")
+                           for i in range(n)))
+    await db.flush()
+    elapsed = time.perf_counter() - start
+    await db.close()
+    return elapsed
+
+
+async def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    path = sys.argv[2] if len(sys.argv) > 2 else ":memory:"
+    direct = await per_row(n, path)
+    queued = await write_behind(n, path)
+    print(f"{n} message inserts ({path})")
+    print(f"  per-row:      {n / direct:,.0f} rows/s")
+    print(f"  write-behind: {n / queued:,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,71 @@
+"""
+Measure cold start: import time of main and time until /health and /ready answer.
+
+Each run starts a fresh uvicorn process against the in-memory database (start
+benchmarks/fake_openai_server.py first if agents are preloaded), then run:
+    python benchmarks/bench_startup.py [runs]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+PORT = int(os.getenv("BENCH_PORT", 8123))
+ENV = {
+    **os.environ,
+    "DB_BACKEND": os.getenv("DB_BACKEND", "memory"),
+    "OPENAI_BASE_URL": os.getenv("OPENAI_BASE_URL", "http://localhost:8100/v1"),
+    "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "fake"),
+    "EMBEDDING_PROVIDER": os.getenv("EMBEDDING_PROVIDER", "hash"),
+    "LOG_LEVEL": "WARNING",
+}
+
+
+def import_seconds() -> float:
+    code = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND, env=ENV,
+                         capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def wait_for(path: str, started: float, timeout: float = 30) -> float:
+    while time.perf_counter() - started < timeout:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{PORT}{path}", timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter() - started
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"{path} did not answer within {timeout}s")
+
+
+def serve_seconds() -> tuple:
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(PORT)],
+                              cwd=BACKEND, env=ENV, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        return wait_for("/health", started), wait_for("/ready", started)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    imports = [import_seconds() for _ in range(n)]
+    health, ready = zip(*(serve_seconds() for _ in range(n)))
+    print(f"{n} cold starts, median seconds")
+    print(f"  import main:     {statistics.median(imports):.3f}s")
+    print(f"  /health answers: {statistics.median(health):.3f}s")
+    print(f"  /ready answers:  {statistics.median(ready):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Measure time-to-first-token for streamed vs non-streamed completions.
+
+Start benchmarks/fake_openai_server.py first, then run:
+    python benchmarks/bench_ttft.py [requests]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("OPENAI_BASE_URL", "http://localhost:8100/v1")
+os.environ.setdefault("OPENAI_API_KEY", "fake")
+
+from agents.llm_client import LLMClient  # noqa: E402
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+async def full_response(llm: LLMClient) -> float:
+    start = time.perf_counter()
+    await llm.chat_completion(model="fake", messages=MESSAGES)
+    return time.perf_counter() - start
+
+
+async def first_token(llm: LLMClient) -> float:
+    start = time.perf_counter()
+    ttft = None
+    async for chunk in llm.stream_chat_completion(model="fake", messages=MESSAGES):
+        if ttft is None and chunk.choices and chunk.choices[0].delta.content:
+            ttft = time.perf_counter() - start
+    return ttft if ttft is not None else time.perf_counter() - start
+
+
+async def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    llm = LLMClient()
+    blocking = await asyncio.gather(*(full_response(llm) for _ in range(n)))
+    streamed = await asyncio.gather(*(first_token(llm) for _ in range(n)))
+    await llm.aclose()
+    print(f"{n} requests, median seconds until the first text is available")
+    print(f"  non-streamed: {statistics.median(blocking):.3f}s")
+    print(f"  streamed:     {statistics.median(streamed):.3f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
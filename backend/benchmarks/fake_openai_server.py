@@ -0,0 +1,118 @@
+"""
+Minimal fake OpenAI server for local benchmarks.
+Answers /v1/chat/completions after sleeping FAKE_LLM_LATENCY seconds. Streamed
+requests send the reply word by word, FAKE_LLM_TOKEN_DELAY seconds apart.
+A user message of the form "read: a.py b.py" is answered with one parallel
+read_file tool call per path, to exercise the tool loop.
+
+Run with:
+    python benchmarks/fake_openai_server.py
+then point the backend at it with OPENAI_BASE_URL=http://localhost:8100/v1
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+app = FastAPI(title="Fake OpenAI")
+
+LATENCY = float(os.getenv("FAKE_LLM_LATENCY", 1.0))
+TOKEN_DELAY = float(os.getenv("FAKE_LLM_TOKEN_DELAY", 0.05))
+
+
+def _completion(model: str, content: str) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+    }
+
+
+def _tool_calls(body: dict) -> list:
+    last = body["messages"][-1]
+    content = last.get("content") or ""
+    if last.get("role") != "user" or not content.startswith("read:") or not body.get("tools"):
+        return []
+    return [
+        {"id": f"call_{uuid.uuid4().hex[:12]}", "type": "function",
+         "function": {"name": "read_file", "arguments": json.dumps({"path": path})}}
+        for path in content[len("read:"):].split()
+    ]
+
+
+def _tool_completion(model: str, tool_calls: list) -> dict:
+    completion = _completion(model, "")
+    completion["choices"][0]["message"] = {"role": "assistant", "content": None, "tool_calls": tool_calls}
+    completion["choices"][0]["finish_reason"] = "tool_calls"
+    return completion
+
+
+async def _stream_tool_calls(model: str, tool_calls: list):
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    await asyncio.sleep(LATENCY)
+    for index, call in enumerate(tool_calls):
+        yield _chunk(completion_id, model, {"tool_calls": [{"index": index, **call}]})
+    yield _chunk(completion_id, model, {}, finish_reason="tool_calls")
+    yield "data: [DONE]\n\n"
+
+
+def _chunk(completion_id: str, model: str, delta: dict, finish_reason=None, usage=None) -> str:
+    chunk = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if usage is None else [],
+        "usage": usage,
+    }
+    return f"data: {json.dumps(chunk)}\n\n"
+
+
+async def _stream(model: str, content: str):
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    # Time to first token is the per-request latency; the rest trickles in.
+    await asyncio.sleep(LATENCY)
+    yield _chunk(completion_id, model, {"role": "assistant", "content": ""})
+    words = content.split(" ")
+    for i, word in enumerate(words):
+        yield _chunk(completion_id, model, {"content": word if i == 0 else f" {word}"})
+        await asyncio.sleep(TOKEN_DELAY)
+    yield _chunk(completion_id, model, {}, finish_reason="stop")
+    yield _chunk(completion_id, model, {}, usage={"prompt_tokens": 10, "completion_tokens": len(words),
+                                                 "total_tokens": 10 + len(words)})
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    last = body["messages"][-1].get("content") or ""
+    reply = f"echo: {last} " + " ".join(["lorem"] * int(os.getenv("FAKE_LLM_REPLY_WORDS", 40)))
+    model = body.get("model", "fake")
+    tool_calls = _tool_calls(body)
+    if tool_calls:
+        if body.get("stream"):
+            return StreamingResponse(_stream_tool_calls(model, tool_calls), media_type="text/event-stream")
+        await asyncio.sleep(LATENCY)
+        return _tool_completion(model, tool_calls)
+    if body.get("stream"):
+        return StreamingResponse(_stream(model, reply), media_type="text/event-stream")
+    await asyncio.sleep(LATENCY + TOKEN_DELAY * len(reply.split(" ")))
+    return _completion(model, reply)
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="localhost", port=int(os.getenv("FAKE_LLM_PORT", 8100)), log_level="warning")
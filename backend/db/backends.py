@@ -0,0 +1,394 @@
+"""
+Storage backends for the async data-access layer.
+Each backend exposes the same async methods so the Database facade can run
+against Supabase in production or a local SQLite file/in-memory database
+for tests and offline benchmarks.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# (created_at, id) position in the messages table, see db/message_pages.py
+Cursor = Tuple[str, str]
+
+
+def _group_by_columns(rows: Iterable[Dict[str, Any]]) -> Dict[Tuple[str, ...], List[Dict[str, Any]]]:
+    """Rows with the same keys, in order: one bulk statement can only take one column list."""
+    groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+    for row in rows:
+        groups.setdefault(tuple(row.keys()), []).append(row)
+    return groups
+
+
+class DatabaseBackend(ABC):
+    """Async interface implemented by every storage backend."""
+
+    name = "backend"
+
+    def __init__(self, pool_size: int):
+        # Blocking clients run on a dedicated, bounded pool instead of the
+        # default executor, so database calls can't starve tool workers.
+        self.pool_size = pool_size
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix=f"db-{self.name}")
+
+    async def _run(self, func: Callable, *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    @abstractmethod
+    async def insert_many(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        """Insert rows into a table in a single round-trip."""
+
+    @abstractmethod
+    async def upsert_many(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        """Insert rows, replacing any existing rows with the same id."""
+
+    @abstractmethod
+    async def delete_many(self, table: str, ids: List[str]) -> None:
+        """Delete rows by id."""
+
+    @abstractmethod
+    async def get_messages(self, thread_id: Optional[str], limit: int,
+                           columns: Optional[Sequence[str]] = None, before: Optional[Cursor] = None,
+                           after: Optional[Cursor] = None) -> List[Dict[str, Any]]:
+        """
+        Messages ordered on (created_at, id), optionally for one thread.
+
+        Most recent first, older than before if given; with after, the oldest
+        messages newer than it come first.
+        """
+
+    @abstractmethod
+    async def get_actions(self, since: Optional[str], agent_name: Optional[str],
+                          columns: Sequence[str], limit: int) -> List[Dict[str, Any]]:
+        """Most recent actions first, optionally since a timestamp and for one agent."""
+
+    @abstractmethod
+    async def get_agent(self, agent_name: str) -> Optional[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    async def get_agents(self) -> List[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    async def get_project(self, project_name: str) -> Optional[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    async def get_recent_summaries(self, agent_id: str, limit: int) -> List[str]:
+        pass
+
+    async def close(self):
+        self._executor.shutdown(wait=True)
+
+
+class SupabaseBackend(DatabaseBackend):
+    """Supabase (PostgREST) backend.
+
+    The supabase client keeps one HTTP connection pool, shared by the worker
+    threads of this backend.
+    """
+
+    name = "supabase"
+
+    def __init__(self, pool_size: int):
+        super().__init__(pool_size)
+        from db.supabase_client import supabase_client
+        self.client = supabase_client.client
+
+    def _insert(self, table: str, rows: List[Dict[str, Any]]):
+        for group in _group_by_columns(rows).values():
+            self.client.table(table).insert(group).execute()
+
+    async def insert_many(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        await self._run(self._insert, table, rows)
+
+    def _upsert(self, table: str, rows: List[Dict[str, Any]]):
+        for group in _group_by_columns(rows).values():
+            self.client.table(table).upsert(group).execute()
+
+    async def upsert_many(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        await self._run(self._upsert, table, rows)
+
+    def _delete(self, table: str, ids: List[str]):
+        self.client.table(table).delete().in_("id", ids).execute()
+
+    async def delete_many(self, table: str, ids: List[str]) -> None:
+        await self._run(self._delete, table, ids)
+
+    @staticmethod
+    def _keyset_filter(op: str, cursor: Cursor) -> str:
+        # PostgREST has no row-value comparison: created_at op c OR (created_at = c AND id op i)
+        created_at, message_id = cursor
+        return f'created_at.{op}."{created_at}",and(created_at.eq."{created_at}",id.{op}.{message_id})'
+
+    def _get_messages(self, thread_id: Optional[str], limit: int, columns: Optional[Sequence[str]],
+                      before: Optional[Cursor], after: Optional[Cursor]) -> List[Dict[str, Any]]:
+        query = self.client.table("messages").select(",".join(columns) if columns else "*")
+        if thread_id:
+            query = query.eq("thread_id", thread_id)
+        if before:
+            query = query.or_(self._keyset_filter("lt", before))
+        if after:
+            query = query.or_(self._keyset_filter("gt", after))
+        desc = after is None
+        result = query.order("created_at", desc=desc).order("id", desc=desc).limit(limit).execute()
+        return result.data or []
+
+    async def get_messages(self, thread_id: Optional[str], limit: int,
+                           columns: Optional[Sequence[str]] = None, before: Optional[Cursor] = None,
+                           after: Optional[Cursor] = None) -> List[Dict[str, Any]]:
+        return await self._run(self._get_messages, thread_id, limit, columns, before, after)
+
+    def _get_actions(self, since: Optional[str], agent_name: Optional[str],
+                     columns: Sequence[str], limit: int) -> List[Dict[str, Any]]:
+        query = self.client.table("actions").select(",".join(columns))
+        if since:
+            query = query.gte("created_at", since)
+        if agent_name:
+            query = query.eq("agent_name", agent_name)
+        result = query.order("created_at", desc=True).limit(limit).execute()
+        return result.data or []
+
+    async def get_actions(self, since: Optional[str], agent_name: Optional[str],
+                          columns: Sequence[str], limit: int) -> List[Dict[str, Any]]:
+        return await self._run(self._get_actions, since, agent_name, columns, limit)
+
+    def _select_one(self, table: str, column: str, value: str) -> Optional[Dict[str, Any]]:
+        result = self.client.table(table).select("*").eq(column, value).execute()
+        return result.data[0] if result.data else None
+
+    async def get_agent(self, agent_name: str) -> Optional[Dict[str, Any]]:
+        return await self._run(self._select_one, "agents", "name", agent_name)
+
+    def _get_agents(self) -> List[Dict[str, Any]]:
+        return self.client.table("agents").select("*").execute().data or []
+
+    async def get_agents(self) -> List[Dict[str, Any]]:
+        return await self._run(self._get_agents)
+
+    async def get_project(self, project_name: str) -> Optional[Dict[str, Any]]:
+        return await self._run(self._select_one, "projects", "name", project_name)
+
+    def _get_recent_summaries(self, agent_id: str, limit: int) -> List[str]:
+        result = self.client.table("memory_summaries").select("summary")\
+            .eq("agent_id", agent_id)\
+            .order("created_at", desc=True).limit(limit).execute()
+        return [r["summary"] for r in result.data] if result.data else []
+
+    async def get_recent_summaries(self, agent_id: str, limit: int) -> List[str]:
+        return await self._run(self._get_recent_summaries, agent_id, limit)
+
+
+# Mirrors db/migrations/001_initial_schema.sql; JSONB columns are stored as text.
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id TEXT PRIMARY KEY, thread_id TEXT, sender TEXT NOT NULL, recipient TEXT NOT NULL,
+    content TEXT NOT NULL, role TEXT NOT NULL, metadata TEXT, created_at TEXT
+);
+CREATE TABLE IF NOT EXISTS agents (
+    id TEXT PRIMARY KEY, name TEXT NOT NULL, role TEXT NOT NULL, description TEXT,
+    tools TEXT, memory_id TEXT, created_at TEXT, updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS projects (
+    id TEXT PRIMARY KEY, name TEXT NOT NULL, repo_url TEXT, branch TEXT DEFAULT 'main',
+    settings TEXT, created_at TEXT, updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS memory_summaries (
+    id TEXT PRIMARY KEY, agent_id TEXT, project_id TEXT, summary TEXT NOT NULL,
+    embedding_ref TEXT, created_at TEXT
+);
+CREATE TABLE IF NOT EXISTS actions (
+    id TEXT PRIMARY KEY, agent_id TEXT, tool_name TEXT NOT NULL, input TEXT, output TEXT,
+    status TEXT NOT NULL, created_at TEXT, agent_name TEXT, thread_id TEXT, kind TEXT,
+    step INTEGER, duration_ms REAL, prompt_tokens INTEGER, completion_tokens INTEGER,
+    input_chars INTEGER, output_chars INTEGER
+);
+CREATE TABLE IF NOT EXISTS rag_documents (
+    id TEXT PRIMARY KEY, project_id TEXT, file_path TEXT NOT NULL, title TEXT,
+    metadata TEXT, embedding_ref TEXT, last_updated TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_messages_thread ON messages(thread_id);
+CREATE INDEX IF NOT EXISTS idx_messages_created_at ON messages(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_actions_agent ON actions(agent_id);
+CREATE INDEX IF NOT EXISTS idx_memory_agent ON memory_summaries(agent_id);
+"""
+
+# Columns added to existing tables after their first release (see db/migrations)
+SQLITE_ADDED_COLUMNS = {
+    "actions": {"agent_name": "TEXT", "thread_id": "TEXT", "kind": "TEXT", "step": "INTEGER",
+                "duration_ms": "REAL", "prompt_tokens": "INTEGER", "completion_tokens": "INTEGER",
+                "input_chars": "INTEGER", "output_chars": "INTEGER"},
+}
+SQLITE_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_actions_created_at ON actions(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_messages_thread_keyset ON messages(thread_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_messages_keyset ON messages(created_at, id);
+"""
+
+JSON_COLUMNS = {"metadata", "tools", "settings", "input", "output"}
+
+
+class SQLiteBackend(DatabaseBackend):
+    """Local SQLite backend; use ":memory:" for a throwaway in-memory database."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str = ":memory:"):
+        # sqlite3 connections are not safe to share across threads, so all
+        # access goes through a single worker thread.
+        super().__init__(pool_size=1)
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            if self.path != ":memory:":
+                # Several server workers may share the file; WAL lets them read while one writes
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SQLITE_SCHEMA)
+            self._migrate()
+            self._seed()
+        return self._conn
+
+    def _migrate(self):
+        """Add columns missing from a database file created by an older version."""
+        for table, columns in SQLITE_ADDED_COLUMNS.items():
+            existing = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            for column, kind in columns.items():
+                if column not in existing:
+                    self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+        self._conn.executescript(SQLITE_INDEXES)
+
+    def _seed(self):
+        """Insert the same starting rows as the Supabase migration."""
+        if self._conn.execute("SELECT 1 FROM agents LIMIT 1").fetchone():
+            return
+        self._insert("agents", [{
+            "id": str(uuid.uuid4()), "name": "Developer", "role": "developer",
+            "description": "A coding agent that can write, read, and modify files. "
+                           "Specializes in software development tasks.",
+            "tools": ["read_file", "write_file", "list_directory"],
+        }])
+        self._insert("projects", [{
+            "id": str(uuid.uuid4()), "name": "Agent Team Workspace", "branch": "main",
+            "settings": {"workspace_path": "./workspace",
+                         "allowed_tools": ["read_file", "write_file", "list_directory"]},
+        }])
+
+    @staticmethod
+    def _encode(row: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: json.dumps(v) if k in JSON_COLUMNS and v is not None else v for k, v in row.items()}
+
+    @staticmethod
+    def _decode(row: sqlite3.Row) -> Dict[str, Any]:
+        return {k: json.loads(row[k]) if k in JSON_COLUMNS and row[k] is not None else row[k]
+                for k in row.keys()}
+
+    def _insert(self, table: str, rows: List[Dict[str, Any]], upsert: bool = False):
+        with self.conn:
+            for columns, group in _group_by_columns(map(self._encode, rows)).items():
+                placeholders = ", ".join(f":{c}" for c in columns)
+                sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+                if upsert:
+                    updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c != "id")
+                    sql += f" ON CONFLICT(id) DO UPDATE SET {updates}"
+                self.conn.executemany(sql, group)
+
+    async def insert_many(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        await self._run(self._insert, table, rows)
+
+    async def upsert_many(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        await self._run(self._insert, table, rows, upsert=True)
+
+    def _delete(self, table: str, ids: List[str]):
+        with self.conn:
+            self.conn.executemany(f"DELETE FROM {table} WHERE id = ?", [(i,) for i in ids])
+
+    async def delete_many(self, table: str, ids: List[str]) -> None:
+        await self._run(self._delete, table, ids)
+
+    def _select(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        return [self._decode(row) for row in self.conn.execute(sql, params).fetchall()]
+
+    async def get_messages(self, thread_id: Optional[str], limit: int,
+                           columns: Optional[Sequence[str]] = None, before: Optional[Cursor] = None,
+                           after: Optional[Cursor] = None) -> List[Dict[str, Any]]:
+        sql = f"SELECT {', '.join(columns) if columns else '*'} FROM messages WHERE 1 = 1"
+        params: List[Any] = []
+        if thread_id:
+            sql += " AND thread_id = ?"
+            params.append(thread_id)
+        if before:
+            sql += " AND (created_at, id) < (?, ?)"
+            params.extend(before)
+        if after:
+            sql += " AND (created_at, id) > (?, ?)"
+            params.extend(after)
+        order = "ASC" if after else "DESC"
+        sql += f" ORDER BY created_at {order}, id {order} LIMIT ?"
+        params.append(limit)
+        return await self._run(self._select, sql, tuple(params))
+
+    async def get_actions(self, since: Optional[str], agent_name: Optional[str],
+                          columns: Sequence[str], limit: int) -> List[Dict[str, Any]]:
+        sql = f"SELECT {', '.join(columns)} FROM actions WHERE 1 = 1"
+        params: List[Any] = []
+        if since:
+            sql += " AND created_at >= ?"
+            params.append(since)
+        if agent_name:
+            sql += " AND agent_name = ?"
+            params.append(agent_name)
+        sql += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        return await self._run(self._select, sql, tuple(params))
+
+    async def get_agent(self, agent_name: str) -> Optional[Dict[str, Any]]:
+        rows = await self._run(self._select, "SELECT * FROM agents WHERE name = ?", (agent_name,))
+        return rows[0] if rows else None
+
+    async def get_agents(self) -> List[Dict[str, Any]]:
+        return await self._run(self._select, "SELECT * FROM agents")
+
+    async def get_project(self, project_name: str) -> Optional[Dict[str, Any]]:
+        rows = await self._run(self._select, "SELECT * FROM projects WHERE name = ?", (project_name,))
+        return rows[0] if rows else None
+
+    async def get_recent_summaries(self, agent_id: str, limit: int) -> List[str]:
+        rows = await self._run(self._select,
+                               "SELECT summary FROM memory_summaries WHERE agent_id = ? "
+                               "ORDER BY created_at DESC LIMIT ?", (agent_id, limit))
+        return [r["summary"] for r in rows]
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def close(self):
+        await self._run(self._close)
+        await super().close()
+
+
+def create_backend(name: Optional[str] = None) -> DatabaseBackend:
+    """Build the backend selected by DB_BACKEND (supabase, sqlite or memory)."""
+    name = (name or os.getenv("DB_BACKEND", "supabase")).lower()
+    if name == "supabase":
+        return SupabaseBackend(pool_size=int(os.getenv("DB_POOL_SIZE", 8)))
+    if name == "sqlite":
+        return SQLiteBackend(os.getenv("SQLITE_PATH", "agent_team.db"))
+    if name == "memory":
+        return SQLiteBackend(":memory:")
+    raise ValueError(f"Unknown DB_BACKEND: {name}")
@@ -0,0 +1,306 @@
+"""
+Async data-access layer for the Agent Team application.
+Reads go straight to the configured backend; inserts into messages, actions
+and memory_summaries are queued and written in bulk in the background.
+"""
+
+import asyncio
+import datetime
+import logging
+import math
+import os
+import uuid
+from typing import Any, Dict, List, Optional, Sequence
+
+from db.backends import DatabaseBackend, create_backend
+from db.message_pages import (MESSAGES_MAX_PAGE_SIZE, MESSAGES_POLL_OVERLAP_SECONDS, MessagePage, decode_cursor,
+                              encode_cursor, message_page_cache, poll_window)
+from db.write_queue import WriteBehindQueue
+from telemetry.metrics import db_call_seconds
+from telemetry.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROJECT_ID = "15b194ff-b44b-4913-9d81-29d0777b5174"
+
+
+# Extra actions columns written by the per-step ledger (migration 002)
+ACTION_LEDGER_COLUMNS = ("agent_name", "thread_id", "kind", "step", "duration_ms",
+                         "prompt_tokens", "completion_tokens", "input_chars", "output_chars")
+ACTION_STATS_COLUMNS = ("agent_id", "tool_name", "status") + ACTION_LEDGER_COLUMNS
+# Most recent actions read per stats query
+ACTION_STATS_MAX_ROWS = int(os.getenv("ACTION_STATS_MAX_ROWS", 50000))
+
+
+def _now() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending, non-empty list."""
+    index = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+class Database:
+    """Async facade over a DatabaseBackend with a write-behind queue."""
+
+    def __init__(self, backend: Optional[DatabaseBackend] = None):
+        """
+        Initialize the database facade.
+
+        Args:
+            backend: Storage backend; defaults to the one selected by DB_BACKEND,
+                created on first use
+        """
+        self._backend = backend
+        self._writer: Optional[WriteBehindQueue] = None
+
+    @property
+    def backend(self) -> DatabaseBackend:
+        if self._backend is None:
+            self._backend = create_backend()
+        return self._backend
+
+    @property
+    def writer(self) -> WriteBehindQueue:
+        if self._writer is None:
+            self._writer = WriteBehindQueue(self.backend)
+        return self._writer
+
+    async def warm_up(self):
+        """Create the backend (and its client) off the event loop."""
+        if self._backend is None:
+            backend = await asyncio.to_thread(create_backend)
+            if self._backend is None:
+                self._backend = backend
+
+    async def _insert(self, table: str, row: Dict[str, Any]) -> str:
+        # IDs and timestamps are assigned here so callers get them back
+        # without waiting for the write.
+        row.setdefault("id", str(uuid.uuid4()))
+        row.setdefault("created_at", _now())
+        await self.writer.put(table, row)
+        return row["id"]
+
+    @traced("db.save_message", db_call_seconds, operation="db.save_message")
+    async def save_message(self, thread_id: str, sender: str, recipient: str,
+                           content: str, role: str, metadata: Optional[Dict[str, Any]] = None) -> str:
+        """Queue a message for saving and return its ID."""
+        message_page_cache.invalidate(thread_id)
+        return await self._insert("messages", {
+            "thread_id": thread_id,
+            "sender": sender,
+            "recipient": recipient,
+            "content": content,
+            "role": role,
+            "metadata": metadata or {}
+        })
+
+    @traced("db.get_messages", db_call_seconds, operation="db.get_messages")
+    async def get_messages(self, thread_id: Optional[str] = None, limit: int = 50,
+                           columns: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Retrieve the most recent messages, optionally filtered by thread_id and projected to columns."""
+        # Read-your-writes: make sure queued messages are visible first.
+        await self.writer.flush()
+        return await self.backend.get_messages(thread_id, limit, columns)
+
+    @traced("db.get_message_page", db_call_seconds, operation="db.get_message_page")
+    async def get_message_page(self, thread_id: Optional[str], limit: int, columns: Sequence[str],
+                               before: Optional[str] = None, after: Optional[str] = None) -> MessagePage:
+        """
+        One page of message history, served from the page cache when possible.
+
+        Args:
+            thread_id: Only messages of this thread
+            limit: Messages per page
+            columns: Columns to return; must include id and created_at
+            before: Cursor; newest messages older than it, newest first (default: from the latest)
+            after: Cursor; oldest messages newer than it, oldest first (polling for new messages),
+                preceded by those up to MESSAGES_POLL_OVERLAP_SECONDS older than it
+
+        Raises:
+            ValueError: If a cursor is malformed
+        """
+        if before and after:
+            raise ValueError("Use either before or after, not both")
+        key = (thread_id, limit, tuple(columns), before, after)
+        page = message_page_cache.get(key)
+        if page is not None:
+            return page
+        generation = message_page_cache.generation(thread_id)
+        before_key = decode_cursor(before) if before else None
+        after_key = decode_cursor(after) if after else None
+        await self.writer.flush()
+        # One extra row tells whether another page follows
+        rows = await self.backend.get_messages(thread_id, limit + 1, columns, before_key, after_key)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if after:
+            # Polling continues from the newest message seen so far
+            next_cursor = encode_cursor(rows[-1]) if rows else after
+            if MESSAGES_POLL_OVERLAP_SECONDS > 0:
+                # Another worker may flush a message older than the cursor after this
+                # client polled past it, so re-send the window just behind the cursor.
+                window = poll_window(after_key, MESSAGES_POLL_OVERLAP_SECONDS)
+                rows = await self.backend.get_messages(
+                    thread_id, MESSAGES_MAX_PAGE_SIZE, columns, after_key, window) + rows
+        else:
+            next_cursor = encode_cursor(rows[-1]) if has_more else None
+        latest_cursor = encode_cursor(rows[0]) if rows and not before and not after else None
+        page = MessagePage(rows, has_more, next_cursor, latest_cursor)
+        message_page_cache.put(key, page, generation)
+        return page
+
+    @traced("db.get_agent", db_call_seconds, operation="db.get_agent")
+    async def get_agent(self, agent_name: str) -> Optional[Dict[str, Any]]:
+        """Get agent configuration by name."""
+        return await self.backend.get_agent(agent_name)
+
+    @traced("db.get_agents", db_call_seconds, operation="db.get_agents")
+    async def get_agents(self) -> List[Dict[str, Any]]:
+        """Get all available agents."""
+        return await self.backend.get_agents()
+
+    @staticmethod
+    def _action_row(agent_id: Optional[str], tool_name: str, input_data: Optional[Dict[str, Any]],
+                    output_data: Optional[Dict[str, Any]], status: str, **ledger: Any) -> Dict[str, Any]:
+        row = {
+            "agent_id": agent_id,
+            "tool_name": tool_name,
+            "input": input_data,
+            "output": output_data,
+            "status": status
+        }
+        row.update({k: v for k, v in ledger.items() if k in ACTION_LEDGER_COLUMNS})
+        row.setdefault("id", str(uuid.uuid4()))
+        row.setdefault("created_at", _now())
+        return row
+
+    @traced("db.log_action", db_call_seconds, operation="db.log_action")
+    async def log_action(self, agent_id: str, tool_name: str, input_data: Dict[str, Any],
+                         output_data: Dict[str, Any], status: str, **ledger: Any) -> str:
+        """
+        Queue an agent action for logging and return its ID.
+
+        Args:
+            ledger: Optional ledger columns (agent_name, thread_id, kind, step,
+                duration_ms, prompt_tokens, completion_tokens, input_chars, output_chars)
+        """
+        return await self._insert("actions", self._action_row(
+            agent_id, tool_name, input_data, output_data, status, **ledger))
+
+    def queue_action(self, agent_id: Optional[str], tool_name: str, input_data: Optional[Dict[str, Any]],
+                     output_data: Optional[Dict[str, Any]], status: str, **ledger: Any) -> Optional[str]:
+        """
+        Like log_action, but never waits: for recording steps from the agent
+        loop. Must be called on the event loop.
+
+        Returns:
+            The action ID, or None if the write queue was full and the row was dropped
+        """
+        row = self._action_row(agent_id, tool_name, input_data, output_data, status, **ledger)
+        return row["id"] if self.writer.put_nowait("actions", row) else None
+
+    @traced("db.get_action_stats", db_call_seconds, operation="db.get_action_stats")
+    async def get_action_stats(self, group_by: str = "tool", since: Optional[str] = None,
+                               agent_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Latency, token and size aggregates over logged actions.
+
+        Args:
+            group_by: "tool" (kind and tool/model name) or "agent" (agent and kind)
+            since: Only actions created at or after this ISO timestamp
+            agent_name: Only actions of this agent
+
+        Returns:
+            One row per group with count, errors, p50/p95/max duration in ms,
+            token totals and average input/output sizes, slowest p95 first
+        """
+        if group_by not in ("tool", "agent"):
+            raise ValueError(f"Unknown group_by: {group_by}")
+        await self.writer.flush()
+        rows = await self.backend.get_actions(since, agent_name, ACTION_STATS_COLUMNS, ACTION_STATS_MAX_ROWS)
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for row in rows:
+            if row.get("duration_ms") is None:
+                continue
+            key = ((row.get("kind") or "tool", row["tool_name"]) if group_by == "tool"
+                   else (row.get("agent_name") or row.get("agent_id") or "", row.get("kind") or "tool"))
+            groups.setdefault(key, []).append(row)
+        stats = []
+        for key, group in groups.items():
+            durations = sorted(r["duration_ms"] for r in group)
+            stats.append({
+                **(dict(zip(("kind", "name"), key)) if group_by == "tool" else dict(zip(("agent", "kind"), key))),
+                "count": len(group),
+                "errors": sum(r["status"] != "success" for r in group),
+                "p50_ms": round(_percentile(durations, 50), 3),
+                "p95_ms": round(_percentile(durations, 95), 3),
+                "max_ms": round(durations[-1], 3),
+                "total_seconds": round(sum(durations) / 1000, 3),
+                "prompt_tokens": sum(r.get("prompt_tokens") or 0 for r in group),
+                "completion_tokens": sum(r.get("completion_tokens") or 0 for r in group),
+                "avg_input_chars": round(sum(r.get("input_chars") or 0 for r in group) / len(group)),
+                "avg_output_chars": round(sum(r.get("output_chars") or 0 for r in group) / len(group)),
+            })
+        return sorted(stats, key=lambda s: s["p95_ms"], reverse=True)
+
+    @traced("db.log_conversation", db_call_seconds, operation="db.log_conversation")
+    async def log_conversation(self, agent_id: str, session: str, embedding_ref: str = "",
+                               summary_id: Optional[str] = None) -> str:
+        """Queue a conversation summary for saving and return its ID."""
+        row = {
+            "agent_id": agent_id,
+            "project_id": DEFAULT_PROJECT_ID,
+            "summary": session,
+            "embedding_ref": embedding_ref
+        }
+        if summary_id:
+            row["id"] = summary_id
+        return await self._insert("memory_summaries", row)
+
+    @traced("db.upsert_rag_documents", db_call_seconds, operation="db.upsert_rag_documents")
+    async def upsert_rag_documents(self, rows: List[Dict[str, Any]]):
+        """Insert or update rag_documents rows (matched on id)."""
+        if rows:
+            await self.backend.upsert_many("rag_documents", rows)
+
+    @traced("db.delete_rag_documents", db_call_seconds, operation="db.delete_rag_documents")
+    async def delete_rag_documents(self, ids: List[str]):
+        """Delete rag_documents rows by id."""
+        if ids:
+            await self.backend.delete_many("rag_documents", ids)
+
+    @traced("db.get_project", db_call_seconds, operation="db.get_project")
+    async def get_project(self, project_name: str = "Agent Team Workspace") -> Optional[Dict[str, Any]]:
+        """Get project configuration by name."""
+        return await self.backend.get_project(project_name)
+
+    @traced("db.get_recent_summaries", db_call_seconds, operation="db.get_recent_summaries")
+    async def get_recent_summaries(self, agent_id: str, limit: int = 5) -> List[str]:
+        """Get recent memory summaries for an agent."""
+        try:
+            await self.writer.flush()
+            return await self.backend.get_recent_summaries(agent_id, limit)
+        except Exception as e:
+            logger.error(f"get_recent_summaries failed: {e}")
+            return []
+
+    async def flush(self):
+        """Wait for all queued writes."""
+        if self._writer is not None:
+            await self._writer.flush()
+
+    async def close(self):
+        """Flush queued writes and release backend resources."""
+        if self._writer is not None:
+            await self._writer.close()
+            self._writer = None
+        if self._backend is not None:
+            await self._backend.close()
+            self._backend = None
+
+
+# Global instance
+database = Database()
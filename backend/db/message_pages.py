@@ -0,0 +1,220 @@
+"""
+Keyset pagination of message history and a short-lived cache of pages.
+Pages are ordered on (created_at, id) and continued from an opaque cursor
+that encodes the last row seen, so deep pages cost the same as the first
+and new messages never shift a page. Each page is serialized once; its
+ETag is a hash of that body. The cache is per process and is invalidated
+by Database.save_message; with several server workers its TTL bounds how
+stale another worker's cached page can be.
+
+Timestamps are assigned when a message is queued, not when its write lands,
+so with several workers a message can become visible after a poll already
+moved past its created_at. Polls with after= therefore also return the
+messages up to MESSAGES_POLL_OVERLAP_SECONDS older than the cursor; clients
+drop the ones they already have by id.
+"""
+
+import base64
+import binascii
+import datetime
+import hashlib
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Columns of the messages table, in response order
+MESSAGE_COLUMNS = ("id", "thread_id", "sender", "recipient", "content", "role", "metadata", "created_at")
+# Always selected: cursors are built from them
+CURSOR_COLUMNS = ("id", "created_at")
+MESSAGES_MAX_PAGE_SIZE = int(os.getenv("MESSAGES_MAX_PAGE_SIZE", 200))
+# How far behind its cursor a poll looks for late writes; 0 disables the overlap
+MESSAGES_POLL_OVERLAP_SECONDS = float(os.getenv("MESSAGES_POLL_OVERLAP_SECONDS", 5))
+# Sorts before every message id, so a window key includes all messages at its timestamp
+_MIN_ID = "00000000-0000-0000-0000-000000000000"
+
+# (created_at, id) of the last message seen
+Cursor = Tuple[str, str]
+PageKey = Tuple[Optional[str], int, Tuple[str, ...], Optional[str], Optional[str]]
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    raw = json.dumps([str(row["created_at"]), str(row["id"])], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """Parse a cursor from encode_cursor; raises ValueError if it is malformed."""
+    try:
+        created_at, message_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        # Both values end up in queries, so only accept what encode_cursor produces
+        datetime.datetime.fromisoformat(created_at)
+        uuid.UUID(message_id)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    return created_at, message_id
+
+
+def poll_window(cursor: Cursor, seconds: float) -> Cursor:
+    """Key just before the messages created up to seconds earlier than cursor."""
+    created_at = datetime.datetime.fromisoformat(cursor[0]) - datetime.timedelta(seconds=seconds)
+    return created_at.isoformat(timespec="microseconds"), _MIN_ID
+
+
+def project_columns(fields: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    """
+    Columns to select for the requested fields, in table order.
+
+    Args:
+        fields: Field names, or None for every column; id and created_at are always included
+    """
+    if fields is None:
+        return MESSAGE_COLUMNS
+    wanted = {f.strip() for f in fields if f.strip()}
+    unknown = wanted.difference(MESSAGE_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown message fields: {', '.join(sorted(unknown))}")
+    wanted.update(CURSOR_COLUMNS)
+    return tuple(c for c in MESSAGE_COLUMNS if c in wanted)
+
+
+class MessagePage:
+    """One page of messages with its serialized body, ETag and continuation cursors."""
+
+    __slots__ = ("rows", "has_more", "next_cursor", "latest_cursor", "_body", "_etag")
+
+    def __init__(self, rows: List[Dict[str, Any]], has_more: bool, next_cursor: Optional[str],
+                 latest_cursor: Optional[str]):
+        """
+        Args:
+            rows: Messages in response order
+            has_more: Whether more messages follow in the same direction
+            next_cursor: Value for the same before/after parameter to get the following page
+            latest_cursor: Cursor of the newest message on a first page, to poll with after=
+        """
+        self.rows = rows
+        self.has_more = has_more
+        self.next_cursor = next_cursor
+        self.latest_cursor = latest_cursor
+        self._body: Optional[bytes] = None
+        self._etag: Optional[str] = None
+
+    @property
+    def body(self) -> bytes:
+        if self._body is None:
+            self._body = json.dumps(self.rows, default=str, separators=(",", ":")).encode()
+        return self._body
+
+    @property
+    def etag(self) -> str:
+        if self._etag is None:
+            self._etag = f'"{hashlib.blake2b(self.body, digest_size=16).hexdigest()}"'
+        return self._etag
+
+    def headers(self) -> Dict[str, str]:
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache", "X-Has-More": str(self.has_more).lower()}
+        if self.next_cursor:
+            headers["X-Next-Cursor"] = self.next_cursor
+        if self.latest_cursor:
+            headers["X-Latest-Cursor"] = self.latest_cursor
+        return headers
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value matches an ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in (t[2:] if t.startswith("W/") else t for t in tags)
+
+
+class MessagePageCache:
+    """TTL + LRU cache of message pages, dropped per thread when a message is saved."""
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Pages kept before LRU eviction (MESSAGE_PAGE_CACHE_MAX_ENTRIES, default 256)
+            ttl_seconds: Page lifetime; 0 disables the cache (MESSAGE_PAGE_CACHE_TTL_SECONDS, default 2)
+        """
+        self.max_entries = max_entries or int(os.getenv("MESSAGE_PAGE_CACHE_MAX_ENTRIES", 256))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None \
+            else float(os.getenv("MESSAGE_PAGE_CACHE_TTL_SECONDS", 2))
+        self._entries: "OrderedDict[PageKey, Tuple[float, MessagePage]]" = OrderedDict()
+        # Bumped on every save, so a page read before a save is not cached after it.
+        # Per-thread counters are reset (and the epoch bumped) once there are too many.
+        self._thread_generations: Dict[str, int] = {}
+        self._generation = 0
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def generation(self, thread_id: Optional[str]) -> Tuple[int, int]:
+        """Change counter for one thread, or for all messages when thread_id is None."""
+        if thread_id is None:
+            return self._epoch, self._generation
+        return self._epoch, self._thread_generations.get(thread_id, 0)
+
+    def get(self, key: PageKey) -> Optional[MessagePage]:
+        if not self.enabled:
+            return None
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: PageKey, page: MessagePage, generation: Tuple[int, int]):
+        """Cache a page unless its thread changed since generation was read."""
+        if not self.enabled or generation != self.generation(key[0]):
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, page)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, thread_id: Optional[str]):
+        """Drop pages of a thread and pages listing all threads."""
+        self._generation += 1
+        if thread_id is not None:
+            if len(self._thread_generations) >= 100 * self.max_entries:
+                self._thread_generations.clear()
+                self._epoch += 1
+            self._thread_generations[thread_id] = self._thread_generations.get(thread_id, 0) + 1
+        stale = [key for key in self._entries if key[0] is None or key[0] == thread_id]
+        for key in stale:
+            del self._entries[key]
+        self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Global instance
+message_page_cache = MessagePageCache()
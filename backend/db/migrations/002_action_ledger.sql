@@ -0,0 +1,25 @@
+-- Per-step cost and latency ledger in the actions table
+-- Every LLM step and tool call made by an agent is logged as one row.
+
+ALTER TABLE actions
+    ADD COLUMN agent_name TEXT,
+    ADD COLUMN thread_id TEXT,
+    ADD COLUMN kind TEXT CHECK (kind IN ('llm', 'tool')),
+    ADD COLUMN step INTEGER,
+    ADD COLUMN duration_ms DOUBLE PRECISION,
+    ADD COLUMN prompt_tokens INTEGER,
+    ADD COLUMN completion_tokens INTEGER,
+    ADD COLUMN input_chars INTEGER,
+    ADD COLUMN output_chars INTEGER;
+
+-- Steps can also time out or be cancelled when the client disconnects
+ALTER TABLE actions DROP CONSTRAINT IF EXISTS actions_status_check;
+ALTER TABLE actions ADD CONSTRAINT actions_status_check
+    CHECK (status IN ('success', 'error', 'pending', 'timeout', 'cancelled'));
+
+-- Agents defined in agents.json have no row in the agents table; agent_name
+-- identifies them, so agent_id no longer has to reference agents(id)
+ALTER TABLE actions DROP CONSTRAINT IF EXISTS actions_agent_id_fkey;
+
+CREATE INDEX idx_actions_created_at ON actions(created_at DESC);
+CREATE INDEX idx_actions_agent_name ON actions(agent_name, created_at DESC);
@@ -0,0 +1,5 @@
+-- Keyset pagination of message history on (created_at, id)
+-- GET /api/messages pages with WHERE (created_at, id) < cursor ORDER BY created_at, id.
+
+CREATE INDEX IF NOT EXISTS idx_messages_thread_keyset ON messages(thread_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_messages_keyset ON messages(created_at DESC, id DESC);
@@ -0,0 +1,131 @@
+"""
+Write-behind queue for database inserts.
+Callers enqueue rows and return immediately; a background task coalesces
+queued rows into one bulk insert per table. A full queue makes callers wait
+(back-pressure) instead of growing without bound.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from db.backends import DatabaseBackend
+from telemetry.metrics import db_call_seconds
+from telemetry.tracing import detach_span, span
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue:
+    """Batches inserts for a DatabaseBackend."""
+
+    def __init__(self, backend: DatabaseBackend,
+                 max_size: Optional[int] = None,
+                 batch_size: Optional[int] = None,
+                 flush_interval: Optional[float] = None):
+        """
+        Initialize the queue.
+
+        Args:
+            backend: Backend the batches are written to
+            max_size: Queued rows before enqueue blocks (DB_WRITE_QUEUE_SIZE)
+            batch_size: Max rows per bulk write (DB_WRITE_BATCH_SIZE)
+            flush_interval: Seconds to wait for more rows before writing (DB_WRITE_FLUSH_INTERVAL)
+        """
+        self.backend = backend
+        self.max_size = max_size or int(os.getenv("DB_WRITE_QUEUE_SIZE", 10000))
+        self.batch_size = batch_size or int(os.getenv("DB_WRITE_BATCH_SIZE", 500))
+        self.flush_interval = flush_interval if flush_interval is not None \
+            else float(os.getenv("DB_WRITE_FLUSH_INTERVAL", 0.05))
+        self._queue: Optional["asyncio.Queue[Tuple[str, Dict[str, Any]]]"] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.rows_written = 0
+        self.batches_written = 0
+        self.failed_rows = 0
+        self.dropped_rows = 0
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _start(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def put(self, table: str, row: Dict[str, Any]):
+        """Queue a row for insertion, waiting if the queue is full."""
+        self._start()
+        await self._queue.put((table, row))
+
+    def put_nowait(self, table: str, row: Dict[str, Any]) -> bool:
+        """
+        Queue a row without waiting, for callers that must never block.
+
+        Returns:
+            False if the queue was full and the row was dropped
+        """
+        self._start()
+        try:
+            self._queue.put_nowait((table, row))
+            return True
+        except asyncio.QueueFull:
+            self.dropped_rows += 1
+            return False
+
+    async def flush(self):
+        """Wait until every queued row has been written."""
+        if self._queue is not None and self._worker is not None and not self._worker.done():
+            await self._queue.join()
+
+    async def close(self):
+        """Flush pending rows and stop the background writer."""
+        await self.flush()
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def _next_batch(self) -> List[Tuple[str, Dict[str, Any]]]:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        detach_span()
+        while True:
+            batch = await self._next_batch()
+            by_table: Dict[str, List[Dict[str, Any]]] = {}
+            for table, row in batch:
+                by_table.setdefault(table, []).append(row)
+            try:
+                for table, rows in by_table.items():
+                    try:
+                        with span("db.insert_many", db_call_seconds, operation="db.insert_many",
+                                  table=table, rows=len(rows)):
+                            await self.backend.insert_many(table, rows)
+                        self.rows_written += len(rows)
+                        self.batches_written += 1
+                    except Exception as e:
+                        self.failed_rows += len(rows)
+                        logger.error(f"Bulk insert into {table} failed ({len(rows)} rows): {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
@@ -3,30 +3,124 @@ FastAPI backend for Agent Team Multi-Agent Coding Environment.
 Provides REST API endpoints for messaging and agent interaction.
 """
 
+import time
+# Import time of the app is reported by /ready; keep heavy SDK imports lazy.
+_import_started = time.perf_counter()
+
+import asyncio
+import json
+import logging
 import os
 import uuid
-from datetime import datetime
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Any, Optional
 from fastapi import FastAPI, HTTPException
-from fastapi import Request
+from fastapi import Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
-from db.supabase_client import supabase_client
-from agents.developer_agent import DeveloperAgent
-from agents.critic_agent import CriticAgent
+from db.database import database
+from db.message_pages import MESSAGES_MAX_PAGE_SIZE, etag_matches, message_page_cache, project_columns
+from agents.registry import agent_registry
+from agents.llm_client import llm_client
+from agents.response_cache import response_cache
+from agents.session_store import session_store
+from agents.step_timings import step_timings
+from agents.summarizer import summary_queue
+from agents.workflow import ReviewWorkflow
+from tools.executor import tool_executor
+from tools.file_cache import file_cache
+from tools.workspace_index import workspace_index
+from memory.rag_pipeline import rag_pipeline
+from telemetry.metrics import metrics, record_agent_step
+from telemetry.middleware import RequestTimingMiddleware
+from telemetry.tracing import trace_exporter
+
+logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(),
+                    format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+# One line per OpenAI request is too noisy; latency is in /metrics instead
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+# Readiness: set by the background warm-up started in lifespan()
+startup_state: Dict[str, Any] = {
+    "import_seconds": round(time.perf_counter() - _import_started, 3),
+    "ready": False,
+    "warm_up_seconds": None,
+    "errors": {},
+}
+
+async def warm_up():
+    """Create the OpenAI and database clients and build preloaded agents, concurrently."""
+    started = time.perf_counter()
+    llm_result, database_result, agent_errors = await asyncio.gather(
+        llm_client.warm_up(), database.warm_up(), agent_registry.preload(), return_exceptions=True)
+    errors = {}
+    for component, result in (("llm", llm_result), ("database", database_result), ("agents", agent_errors)):
+        if isinstance(result, BaseException):
+            logger.error(f"Warm-up of {component} failed: {result}")
+            errors[component] = str(result)
+    if isinstance(agent_errors, dict):
+        errors.update({f"agent:{name}": error for name, error in agent_errors.items()})
+    startup_state["errors"] = errors
+    startup_state["warm_up_seconds"] = round(time.perf_counter() - started, 3)
+    startup_state["ready"] = not errors
+    logger.info(f"Imported in {startup_state['import_seconds']}s, warmed up in "
+                f"{startup_state['warm_up_seconds']}s" + (f" with errors: {errors}" if errors else ""))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start background work (workspace indexing, session summaries, warm-up)
+    without holding up startup, and on shutdown flush queued database writes
+    and release shared connection pools.
+    """
+    workspace_index.start()
+    summary_queue.start()
+    session_store.start()
+    if int(os.getenv("SERVER_WORKERS", 1)) > 1:
+        if not session_store.shared:
+            logger.warning("Several workers with SESSION_STORE=memory: each thread_id must stay on one worker")
+        if os.getenv("DB_BACKEND", "supabase").lower() == "memory":
+            logger.warning("Several workers with DB_BACKEND=memory: each worker has its own database")
+    # Requests that arrive during warm-up simply wait for the same construction.
+    warm_up_task = asyncio.create_task(warm_up())
+    try:
+        yield
+    finally:
+        # The server has stopped accepting requests and drained in-flight ones
+        startup_state["ready"] = False
+        warm_up_task.cancel()
+        await asyncio.gather(warm_up_task, return_exceptions=True)
+        await summary_queue.stop(timeout=float(os.getenv("SUMMARY_SHUTDOWN_TIMEOUT", 10)))
+        await database.close()
+        await session_store.close()
+        await llm_client.aclose()
+        tool_executor.shutdown()
+        workspace_index.stop()
+        trace_exporter.shutdown()
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Agent Team API",
     description="Multi-Agent Coding Environment API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# How often a non-streaming request checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = float(os.getenv("DISCONNECT_POLL_SECONDS", 1))
+
+# Per-agent step and token counters for /metrics
+step_timings.add_hook(record_agent_step)
+app.add_middleware(RequestTimingMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -34,11 +128,32 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Pagination and caching headers of GET /api/messages
+    expose_headers=["ETag", "X-Next-Cursor", "X-Latest-Cursor", "X-Has-More"],
 )
 
-# Initialize agents
-developer_agent = DeveloperAgent()
-critic_agent = CriticAgent()
+def check_agent(agent_name: str):
+    """Fail with 400 for names that are not in the agent registry."""
+    if agent_name not in agent_registry:
+        raise HTTPException(status_code=400, detail=f"Unknown agent: {agent_name}")
+
+async def get_agent(agent_name: str):
+    """Look up an agent by name, constructing it on first use."""
+    check_agent(agent_name)
+    return await agent_registry.get(agent_name)
+
+async def cancel_on_disconnect(http_request: Request, coro):
+    """Await coro, cancelling it (and any in-flight LLM call) if the client goes away."""
+    task = asyncio.create_task(coro)
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+        if done:
+            return task.result()
+        if await http_request.is_disconnected():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            raise HTTPException(status_code=499, detail="Client disconnected")
+
 # Pydantic models
 class MessageRequest(BaseModel):
     content: str
@@ -54,6 +169,13 @@ class MessageResponse(BaseModel):
     created_at: str
     metadata: Optional[Dict[str, Any]] = None
 
+class WorkflowRequest(BaseModel):
+    content: str
+    thread_id: Optional[str] = None
+    developer: str = "Developer"
+    critic: str = "Critic"
+    max_rounds: Optional[int] = None
+
 class AgentInfo(BaseModel):
     id: str
     name: str
@@ -71,19 +193,36 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "messages": "/api/messages",
+            "stream": "/api/messages/stream",
             "agents": "/api/agents",
-            "health": "/health"
+            "health": "/health",
+            "ready": "/ready"
         }
     }
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint."""
+    """Liveness: the process is up and serving, whether or not warm-up has finished."""
     return {"status": "healthy", "service": "agent-team-api"}
 
+@app.get("/ready")
+async def ready_check():
+    """Readiness: 200 once clients and preloaded agents are warmed up, 503 until then or if warm-up failed."""
+    if startup_state["ready"]:
+        status = "ready"
+    elif startup_state["warm_up_seconds"] is None:
+        status = "starting"
+    else:
+        status = "failed"
+    return JSONResponse(
+        {"status": status, **startup_state, "agents_loaded": [agent.name for agent in agent_registry.loaded()]},
+        status_code=200 if status == "ready" else 503
+    )
+
 
 class ClientExitEvent(BaseModel):
     session_id: Optional[str] = None
+    thread_id: Optional[str] = None  # summarize only this thread
     page: Optional[str] = None
     reason: Optional[str] = None  # e.g., pagehide, beforeunload, visibilitychange
     timestamp: Optional[str] = None
@@ -93,7 +232,7 @@ class ClientExitEvent(BaseModel):
 async def get_agents():
     """Get all available agents."""
     try:
-        agents_data = supabase_client.get_agents()
+        agents_data = await database.get_agents()
         return [
             AgentInfo(
                 id=agent["id"],
@@ -108,34 +247,41 @@ async def get_agents():
         raise HTTPException(status_code=500, detail=f"Failed to get agents: {str(e)}")
 
 @app.get("/api/messages", response_model=List[MessageResponse])
-async def get_messages(thread_id: Optional[str] = None, limit: int = 50):
-    """Get message history."""
+async def get_messages(request: Request, thread_id: Optional[str] = None, limit: int = 50,
+                       before: Optional[str] = None, after: Optional[str] = None,
+                       fields: Optional[str] = None):
+    """
+    Get message history, newest first, one page at a time.
+
+    Pass X-Next-Cursor back as before= for older messages. To poll for new
+    messages, pass X-Latest-Cursor (first page) and then each X-Next-Cursor
+    as after=; those pages are oldest first. fields= is a comma-separated
+    projection (id and created_at are always included). Responses carry an
+    ETag and answer If-None-Match with 304.
+    """
+    if not 1 <= limit <= MESSAGES_MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MESSAGES_MAX_PAGE_SIZE}")
     try:
-        messages_data = supabase_client.get_messages(thread_id, limit)
-        return [
-            MessageResponse(
-                id=msg["id"],
-                content=msg["content"],
-                sender=msg["sender"],
-                recipient=msg["recipient"],
-                role=msg["role"],
-                created_at=msg["created_at"],
-                metadata=msg.get("metadata")
-            )
-            for msg in messages_data
-        ]
+        columns = project_columns(fields.split(",") if fields else None)
+        page = await database.get_message_page(thread_id, limit, columns, before, after)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get messages: {str(e)}")
+    # Rows go out as stored: the page body is serialized once and shared by cache hits
+    if etag_matches(request.headers.get("if-none-match"), page.etag):
+        return Response(status_code=304, headers=page.headers())
+    return Response(page.body, media_type="application/json", headers=page.headers())
 
 @app.post("/api/messages", response_model=MessageResponse)
-async def send_message(request: MessageRequest):
+async def send_message(request: MessageRequest, http_request: Request):
     """Send a message to an agent and get response."""
     try:
         # Generate thread ID if not provided
         thread_id = request.thread_id or str(uuid.uuid4())
 
         # Save user message
-        user_message_id = supabase_client.save_message(
+        user_message_id = await database.save_message(
             thread_id=thread_id,
             sender="user",
             recipient=request.agent_name,
@@ -144,15 +290,14 @@ async def send_message(request: MessageRequest):
         )
 
         # Get agent response
-        if request.agent_name == "Developer":
-            agent_response = await developer_agent.process_message(request.content)
-        elif request.agent_name == "Critic":
-            agent_response = await critic_agent.process_message(request.content)
-        else:
-            raise HTTPException(status_code=400, detail=f"Unknown agent: {request.agent_name}")
+        agent_context = {"thread_id": thread_id}
+        agent = await get_agent(request.agent_name)
+        agent_response = await cancel_on_disconnect(
+            http_request, agent.process_message(request.content, agent_context)
+        )
 
         # Save agent response
-        agent_message_id = supabase_client.save_message(
+        agent_message_id = await database.save_message(
             thread_id=thread_id,
             sender=request.agent_name,
             recipient="user",
@@ -168,17 +313,187 @@ async def send_message(request: MessageRequest):
             recipient="user",
             role="assistant",
             created_at=datetime.now().isoformat(),  # Set current timestamp
-            metadata={"thread_id": thread_id}
+            metadata={"thread_id": thread_id, "usage": agent_context.get("usage")}
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to process message: {str(e)}")
 
+async def stream_agent_events(request: MessageRequest):
+    """Run an agent on a message, yielding its events and persisting the result."""
+    agent = await get_agent(request.agent_name)
+    thread_id = request.thread_id or str(uuid.uuid4())
+    await database.save_message(
+        thread_id=thread_id,
+        sender="user",
+        recipient=request.agent_name,
+        content=request.content,
+        role="user"
+    )
+    yield {"type": "start", "thread_id": thread_id, "agent": request.agent_name}
+
+    events = agent.stream_message(request.content, {"thread_id": thread_id})
+    try:
+        async for event in events:
+            if event["type"] == "error":
+                yield event
+                event = {"type": "done", "content": event["detail"], "usage": None}
+            if event["type"] != "done":
+                yield event
+                continue
+
+            # Persist the final message once the stream completes
+            agent_message_id = await database.save_message(
+                thread_id=thread_id,
+                sender=request.agent_name,
+                recipient="user",
+                content=event["content"],
+                role="assistant"
+            )
+            yield {
+                "type": "message",
+                "message": MessageResponse(
+                    id=agent_message_id,
+                    content=event["content"],
+                    sender=request.agent_name,
+                    recipient="user",
+                    role="assistant",
+                    created_at=datetime.now().isoformat(),
+                    metadata={"thread_id": thread_id, "usage": event["usage"]}
+                ).model_dump()
+            }
+            return
+    finally:
+        # Returning after "done" leaves the agent stream suspended; close it so its
+        # session lock is released now rather than when it is garbage collected
+        await events.aclose()
+
+@app.post("/api/messages/stream")
+async def stream_message(request: MessageRequest):
+    """Send a message to an agent and stream the response as server-sent events."""
+    check_agent(request.agent_name)  # fail with 400 before the stream starts
+
+    async def sse():
+        try:
+            async for event in stream_agent_events(request):
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        except Exception as e:
+            error = {"type": "error", "detail": f"Failed to process message: {str(e)}"}
+            yield f"event: error\ndata: {json.dumps(error)}\n\n"
+
+    return StreamingResponse(sse(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.websocket("/ws/messages")
+async def message_socket(websocket: WebSocket):
+    """Streaming chat over a WebSocket: send MessageRequest JSON, receive events."""
+    await websocket.accept()
+    try:
+        while True:
+            request = MessageRequest(**await websocket.receive_json())
+            events = stream_agent_events(request)
+            try:
+                async for event in events:
+                    await websocket.send_json(event)
+            except WebSocketDisconnect:
+                raise
+            except HTTPException as e:
+                await websocket.send_json({"type": "error", "detail": e.detail})
+            except Exception as e:
+                await websocket.send_json({"type": "error", "detail": f"Failed to process message: {str(e)}"})
+            finally:
+                # Stops the agent (and releases its session) if the socket closed mid-reply
+                await events.aclose()
+    except WebSocketDisconnect:
+        pass
+
+@app.post("/api/workflows/review")
+async def run_review_workflow(request: WorkflowRequest, http_request: Request):
+    """Have the Developer make a change and revise it until the Critic approves (or rounds run out)."""
+    check_agent(request.developer)
+    check_agent(request.critic)
+    workflow = ReviewWorkflow(request.developer, request.critic, max_rounds=request.max_rounds)
+    try:
+        return await cancel_on_disconnect(http_request, workflow.run(request.content, request.thread_id))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Workflow failed: {str(e)}")
+
+@app.get("/metrics")
+async def get_metrics():
+    """LLM, tool, database and HTTP latency histograms and token counters (Prometheus text format)."""
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/api/tools/pools")
+async def get_tool_pools():
+    """Queue depth and latency of the tool worker pools."""
+    return tool_executor.stats()
+
+@app.get("/api/agents/timings")
+async def get_agent_timings():
+    """Call counts and latency of LLM and tool steps, per agent."""
+    return step_timings.stats()
+
+@app.get("/api/actions/stats")
+async def get_action_stats(group_by: str = "tool", since_minutes: Optional[float] = None,
+                           agent: Optional[str] = None):
+    """p50/p95 latency, tokens and sizes of logged LLM and tool steps, per tool or per agent."""
+    if group_by not in ("tool", "agent"):
+        raise HTTPException(status_code=400, detail="group_by must be 'tool' or 'agent'")
+    since = None
+    if since_minutes is not None:
+        since = (datetime.now(timezone.utc) - timedelta(minutes=since_minutes)).isoformat()
+    try:
+        return await database.get_action_stats(group_by, since, agent)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get action stats: {str(e)}")
+
+@app.get("/api/agents/response-cache")
+async def get_response_cache_stats():
+    """Response cache size, invalidations and hit rate per agent."""
+    return response_cache.stats()
+
+@app.get("/api/messages/page-cache")
+async def get_message_page_cache_stats():
+    """Hit rate and size of the message history page cache."""
+    return message_page_cache.stats()
+
+@app.get("/api/tools/file-cache")
+async def get_file_cache_stats():
+    """Hit/miss/eviction counters of the workspace file cache."""
+    return file_cache.stats()
+
+@app.post("/api/rag/ingest")
+async def ingest_workspace(path: str = ""):
+    """Incrementally ingest workspace files into rag_documents and the chunk index."""
+    try:
+        return await rag_pipeline.ingest(path)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/rag/stats")
+async def get_rag_stats():
+    """Indexed file/chunk counts and the result of the last ingest."""
+    return await asyncio.to_thread(rag_pipeline.stats)
+
+@app.get("/api/summaries/queue")
+async def get_summary_queue_stats():
+    """Background summarization queue depth and outcome counters."""
+    return summary_queue.stats()
+
+@app.get("/api/tools/workspace-index")
+async def get_workspace_index_stats():
+    """Size and freshness of the workspace symbol/token index."""
+    return workspace_index.stats()
+
 @app.get("/api/projects")
 async def get_projects():
     """Get project information."""
     try:
-        project = supabase_client.get_project()
+        project = await database.get_project()
         if project:
             return {
                 "id": project["id"],
@@ -220,28 +535,18 @@ async def client_exit(request: Request, event: Optional[ClientExitEvent] = None)
         if client_host:
             payload.setdefault("client_ip", client_host)
 
-        # For now, just log to stdout. Optionally, this can be persisted later.
-        print("[client-exit]", payload)
-        # Summarize current conversation sessions.
-        try:
-            await developer_agent.log_conversation()
-        except Exception as e:
-            print(f">>> Failed to log developer conversation: {e}")
+        # For now, just log it. Optionally, this can be persisted later.
+        logger.info(f"Client exit: {payload}")
+        # Summaries are written in the background so the beacon returns immediately.
+        queued = summary_queue.submit_pending(thread_id=payload.get("thread_id"))
+        logger.info(f"Client exit: queued {queued} session summaries")
 
         # Return 204 No Content, which is fine for beacon calls
-        from fastapi import Response
         return Response(status_code=204)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to record client exit: {str(e)}")
 
 if __name__ == "__main__":
-    import uvicorn
-    host = os.getenv("HOST", "localhost")
-    port = int(os.getenv("PORT", 8000))
-    uvicorn.run(
-        "main:app",
-        host=host,
-        port=port,
-        reload=True
-    )
+    from serve import run_server
+    run_server()
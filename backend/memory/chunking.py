@@ -0,0 +1,130 @@
+"""
+Code-aware chunking of workspace files for retrieval.
+Chunks start at natural boundaries (Python top-level definitions via ast,
+Markdown headings, or unindented lines after a blank line in other files),
+small neighbours are merged up to a size limit and oversized blocks are
+split at blank lines, so a chunk is usually one coherent unit of code.
+"""
+
+import ast
+import os
+from typing import Dict, List, Optional
+
+RAG_CHUNK_MAX_LINES = int(os.getenv("RAG_CHUNK_MAX_LINES", 80))
+RAG_CHUNK_MAX_CHARS = int(os.getenv("RAG_CHUNK_MAX_CHARS", 4000))
+
+MARKDOWN_EXTENSIONS = {".md", ".markdown", ".rst", ".txt"}
+
+
+class Chunk:
+    """A contiguous range of lines from one file."""
+
+    __slots__ = ("text", "start_line", "end_line", "symbol")
+
+    def __init__(self, text: str, start_line: int, end_line: int, symbol: Optional[str] = None):
+        self.text = text
+        self.start_line = start_line
+        self.end_line = end_line
+        self.symbol = symbol
+
+
+def _python_boundaries(text: str, max_lines: int) -> Optional[Dict[int, str]]:
+    """Start line -> symbol name for top-level definitions (and methods of big classes)."""
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return None
+    boundaries: Dict[int, str] = {}
+    for node in tree.body:
+        # Decorators belong with the definition they decorate
+        start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            boundaries[start] = node.name
+            end = getattr(node, "end_lineno", None) or start
+            if isinstance(node, ast.ClassDef) and end - start + 1 > max_lines:
+                for child in node.body:
+                    if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                        child_start = min([child.lineno] + [d.lineno for d in child.decorator_list])
+                        boundaries[child_start] = f"{node.name}.{child.name}"
+        else:
+            boundaries.setdefault(start, "")
+    return boundaries
+
+
+def _heuristic_boundaries(lines: List[str], markdown: bool) -> Dict[int, str]:
+    boundaries: Dict[int, str] = {}
+    for i, line in enumerate(lines):
+        if markdown:
+            if line.startswith("#"):
+                boundaries[i + 1] = line.lstrip("#").strip()
+        elif line[:1] not in ("", " ", "\t", "}", ")", "]") and i > 0 and not lines[i - 1].strip():
+            boundaries[i + 1] = ""
+    return boundaries
+
+
+def chunk_text(path: str, text: str, max_lines: Optional[int] = None,
+               max_chars: Optional[int] = None) -> List[Chunk]:
+    """
+    Split a file's text into retrieval chunks.
+
+    Args:
+        path: File path; the extension picks the boundary strategy
+        text: File contents
+        max_lines: Largest chunk in lines (RAG_CHUNK_MAX_LINES)
+        max_chars: Largest chunk in characters (RAG_CHUNK_MAX_CHARS)
+    """
+    max_lines = max_lines or RAG_CHUNK_MAX_LINES
+    max_chars = max_chars or RAG_CHUNK_MAX_CHARS
+    lines = text.splitlines(keepends=True)
+    if not lines:
+        return []
+    extension = os.path.splitext(path)[1].lower()
+    boundaries = _python_boundaries(text, max_lines) if extension == ".py" else None
+    if boundaries is None:
+        boundaries = _heuristic_boundaries(lines, extension in MARKDOWN_EXTENSIONS)
+    boundaries.setdefault(1, "")
+
+    # Segments between consecutive boundaries, as (start, end, symbol) 1-based inclusive
+    starts = sorted(b for b in boundaries if b <= len(lines))
+    segments = []
+    for i, start in enumerate(starts):
+        end = starts[i + 1] - 1 if i + 1 < len(starts) else len(lines)
+        segments.extend(_split(lines, start, end, boundaries[start], max_lines, max_chars))
+
+    # Merge small neighbours so chunks are not dominated by one-line segments
+    chunks: List[Chunk] = []
+    cur_start, cur_end, cur_symbol, cur_chars = None, 0, None, 0
+    for start, end, symbol in segments:
+        chars = sum(len(line) for line in lines[start - 1:end])
+        if cur_start is not None and (end - cur_start + 1 > max_lines or cur_chars + chars > max_chars):
+            chunks.append(Chunk("".join(lines[cur_start - 1:cur_end]), cur_start, cur_end, cur_symbol))
+            cur_start = None
+        if cur_start is None:
+            cur_start, cur_symbol, cur_chars = start, symbol or None, 0
+        elif not cur_symbol and symbol:
+            cur_symbol = symbol
+        cur_end = end
+        cur_chars += chars
+    if cur_start is not None:
+        chunks.append(Chunk("".join(lines[cur_start - 1:cur_end]), cur_start, cur_end, cur_symbol))
+    return [chunk for chunk in chunks if chunk.text.strip()]
+
+
+def _split(lines: List[str], start: int, end: int, symbol: str, max_lines: int, max_chars: int):
+    """Break an oversized segment at blank lines, or hard at the size limit."""
+    pieces = []
+    while start <= end:
+        stop = start
+        chars = 0
+        last_blank = None
+        while stop <= end and stop - start < max_lines and chars + len(lines[stop - 1]) <= max_chars:
+            chars += len(lines[stop - 1])
+            if not lines[stop - 1].strip():
+                last_blank = stop
+            stop += 1
+        if stop <= end and last_blank is not None and last_blank > start:
+            stop = last_blank + 1
+        stop = max(stop, start + 1)  # always make progress, even on one huge line
+        pieces.append((start, stop - 1, symbol))
+        start = stop
+    return pieces
@@ -0,0 +1,141 @@
+"""
+Text embeddings for memory recall.
+OpenAIEmbedder calls the embeddings API in batches; HashEmbedder is a local,
+dependency-free fallback (feature hashing of tokens) used when no API key is
+configured. CachedEmbedder wraps either one with a cache keyed by content
+hash, so a text is only ever embedded once per model.
+"""
+
+import hashlib
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+from agents.llm_client import llm_client
+
+Vector = List[float]
+
+_WORD_RE = re.compile(r"[a-z0-9_]+")
+
+
+class Embedder:
+    """Turns a batch of texts into fixed-size vectors."""
+
+    model: str = ""
+    dimensions: int = 0
+
+    async def embed(self, texts: List[str]) -> List[Vector]:
+        raise NotImplementedError
+
+
+class HashEmbedder(Embedder):
+    """Bag-of-words feature hashing; no network, deterministic, L2-normalized."""
+
+    def __init__(self, dimensions: int = 256):
+        self.dimensions = dimensions
+        self.model = f"hash-{dimensions}"
+
+    def _embed_one(self, text: str) -> Vector:
+        vector = [0.0] * self.dimensions
+        words = _WORD_RE.findall(text.lower())
+        # Unigrams plus bigrams so word order carries a little weight
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector))
+        return [v / norm for v in vector] if norm else vector
+
+    async def embed(self, texts: List[str]) -> List[Vector]:
+        return [self._embed_one(text) for text in texts]
+
+
+class OpenAIEmbedder(Embedder):
+    """Embeddings API client that sends texts in batches."""
+
+    def __init__(self, model: Optional[str] = None, dimensions: Optional[int] = None,
+                 batch_size: Optional[int] = None):
+        """
+        Initialize the embedder.
+
+        Args:
+            model: Embedding model (EMBEDDING_MODEL, default text-embedding-3-small)
+            dimensions: Vector size requested from the API (EMBEDDING_DIMENSIONS, default 512)
+            batch_size: Texts per API request (EMBEDDING_BATCH_SIZE, default 64)
+        """
+        self.model = model or os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+        self.dimensions = dimensions or int(os.getenv("EMBEDDING_DIMENSIONS", 512))
+        self.batch_size = batch_size or int(os.getenv("EMBEDDING_BATCH_SIZE", 64))
+
+    async def embed(self, texts: List[str]) -> List[Vector]:
+        vectors: List[Vector] = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start:start + self.batch_size]
+            response = await llm_client.embeddings(model=self.model, input=batch, dimensions=self.dimensions)
+            vectors.extend(item.embedding for item in sorted(response.data, key=lambda d: d.index))
+        return vectors
+
+
+class CachedEmbedder(Embedder):
+    """LRU cache in front of an embedder, keyed by sha256 of model and text."""
+
+    def __init__(self, embedder: Embedder, max_entries: Optional[int] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            embedder: Embedder used on cache misses
+            max_entries: Cached vectors kept in memory (EMBEDDING_CACHE_SIZE, default 10000)
+        """
+        self.embedder = embedder
+        self.model = embedder.model
+        self.dimensions = embedder.dimensions
+        self.max_entries = max_entries or int(os.getenv("EMBEDDING_CACHE_SIZE", 10000))
+        self._cache: "OrderedDict[str, Vector]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\0{text}".encode("utf-8")).hexdigest()
+
+    async def embed(self, texts: List[str]) -> List[Vector]:
+        keys = [self._key(text) for text in texts]
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._cache.get(key)
+                if vector is not None:
+                    self._cache.move_to_end(key)
+                    found[key] = vector
+        # One API batch for all misses; duplicates within the batch are sent once
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            vectors = await self.embedder.embed(list(missing.values()))
+            with self._lock:
+                for key, vector in zip(missing, vectors):
+                    found[key] = vector
+                    self._cache[key] = vector
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+        return [found[key] for key in keys]
+
+
+def create_embedder(provider: Optional[str] = None) -> Embedder:
+    """
+    Build the embedder selected by EMBEDDING_PROVIDER ("openai" or "hash").
+
+    Defaults to OpenAI when OPENAI_API_KEY is set and the local hash
+    embedder otherwise.
+    """
+    provider = provider or os.getenv("EMBEDDING_PROVIDER") or ("openai" if os.getenv("OPENAI_API_KEY") else "hash")
+    if provider == "openai":
+        return CachedEmbedder(OpenAIEmbedder())
+    if provider == "hash":
+        return CachedEmbedder(HashEmbedder(int(os.getenv("EMBEDDING_DIMENSIONS", 256))))
+    raise ValueError(f"Unknown EMBEDDING_PROVIDER: {provider}")
@@ -0,0 +1,350 @@
+"""
+Streaming ingestion of workspace files into the RAG store.
+Stages: walk the workspace -> read and hash -> chunk -> batch-embed -> store
+vectors in the local index and upsert metadata into rag_documents. Stages are
+connected by a bounded queue, so memory stays flat on large workspaces.
+Re-ingestion is incremental: files whose mtime/size or content hash match the
+last run are skipped, and unchanged chunks of a changed file keep their vectors.
+Everything that touches the disk or the index (file locks, appends, scoring)
+runs in worker threads, never on the event loop.
+"""
+
+import asyncio
+import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from db.database import DEFAULT_PROJECT_ID, database
+from memory.chunking import Chunk, chunk_text
+from memory.embeddings import Embedder, create_embedder
+from memory.vector_index import VectorIndex
+from tools.file_tools import _workspace_path
+from tools.search_tools import walk_workspace
+from tools.workspace_events import workspace_events
+
+INDEX_NAME = "rag_chunks"
+RAG_MAX_FILE_BYTES = int(os.getenv("RAG_MAX_FILE_BYTES", 512 * 1024))
+# Files read and chunked concurrently, and files buffered between stages
+RAG_READ_WORKERS = int(os.getenv("RAG_READ_WORKERS", 4))
+RAG_QUEUE_SIZE = int(os.getenv("RAG_QUEUE_SIZE", 64))
+# Chunks collected before an embedding call
+RAG_EMBED_BATCH = int(os.getenv("RAG_EMBED_BATCH", 256))
+# search_documents re-ingests at most this often unless a tool wrote a file
+RAG_REFRESH_SECONDS = float(os.getenv("RAG_REFRESH_SECONDS", 60))
+
+
+class FileUpdate:
+    """Output of the read stage for one file."""
+
+    __slots__ = ("rel_path", "version", "sha256", "size", "chunks", "deleted")
+
+    def __init__(self, rel_path: str, version: Optional[List[int]] = None, sha256: str = "",
+                 size: int = 0, chunks: Optional[List[Chunk]] = None, deleted: bool = False):
+        self.rel_path = rel_path
+        self.version = version
+        self.sha256 = sha256
+        self.size = size
+        # None when the content hash is unchanged and nothing needs embedding
+        self.chunks = chunks
+        self.deleted = deleted
+
+
+class RagPipeline:
+    """Keeps the rag_documents table and the chunk index in sync with the workspace."""
+
+    def __init__(self, embedder: Optional[Embedder] = None, index: Optional[VectorIndex] = None,
+                 project_id: str = DEFAULT_PROJECT_ID):
+        """
+        Initialize the pipeline. The embedder, index and manifest load on first use.
+
+        Args:
+            embedder: Embedder for chunks and queries (EMBEDDING_PROVIDER)
+            index: Vector index for chunks
+            project_id: rag_documents.project_id for ingested files
+        """
+        self._embedder = embedder
+        self._index = index
+        self.project_id = project_id
+        # rel_path -> {"document_id", "sha256", "version", "chunks": [chunk ids]}
+        self._manifest: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = asyncio.Lock()
+        # The index and manifest are loaded in worker threads; load them only once
+        self._load_lock = threading.Lock()
+        self.ingested_version: Optional[int] = None
+        self.ingested_at = 0.0
+        self.last_stats: Dict[str, Any] = {}
+
+    @property
+    def embedder(self) -> Embedder:
+        if self._embedder is None:
+            self._embedder = create_embedder()
+        return self._embedder
+
+    @property
+    def index(self) -> VectorIndex:
+        with self._load_lock:
+            if self._index is None:
+                self._index = VectorIndex(INDEX_NAME, self.embedder.model, self.embedder.dimensions,
+                                          partition_key="project_id")
+            return self._index
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.index.directory, f"{INDEX_NAME}.manifest.json")
+
+    @property
+    def manifest(self) -> Dict[str, Dict[str, Any]]:
+        if self._manifest is None:
+            manifest = self._load_manifest()
+            with self._load_lock:
+                if self._manifest is None:
+                    self._manifest = manifest
+        return self._manifest
+
+    def _load_manifest(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        # Entries whose chunks are gone (e.g. the index was rebuilt for a new
+        # model) must be ingested again; chunks no entry points at are orphans
+        # from an interrupted run.
+        index = self.index
+        manifest = {path: entry for path, entry in manifest.items()
+                    if all(chunk_id in index for chunk_id in entry["chunks"])}
+        known = {chunk_id for entry in manifest.values() for chunk_id in entry["chunks"]}
+        index.remove([chunk_id for chunk_id in index.ids() if chunk_id not in known])
+        return manifest
+
+    def _save_manifest(self):
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, separators=(",", ":"))
+        os.replace(tmp_path, self.manifest_path)
+
+    def document_id(self, rel_path: str) -> str:
+        """Stable rag_documents id for a workspace file, so re-ingestion upserts."""
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{self.project_id}/{rel_path}"))
+
+    # --- stages ---
+
+    def _scan(self, path: str) -> Tuple[List[Tuple[str, str, List[int]]], List[str], int]:
+        """Files that may have changed, manifest paths that no longer exist, unchanged count."""
+        manifest = self.manifest
+        prefix = path.strip("/")
+        candidates = []
+        seen = set()
+        unchanged = 0
+        for rel_path, entry in walk_workspace(path):
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            st = entry.stat(follow_symlinks=False)
+            if st.st_size > RAG_MAX_FILE_BYTES:
+                continue
+            seen.add(rel_path)
+            version = [st.st_mtime_ns, st.st_size]
+            known = manifest.get(rel_path)
+            if known is not None and known["version"] == version:
+                unchanged += 1
+            else:
+                candidates.append((rel_path, entry.path, version))
+        removed = [p for p in manifest if p not in seen and (not prefix or p.startswith(prefix + "/"))]
+        return candidates, removed, unchanged
+
+    def _read(self, rel_path: str, full_path: str, version: List[int]) -> FileUpdate:
+        """Read, hash and (if the content changed) chunk one file."""
+        try:
+            with open(full_path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return FileUpdate(rel_path, deleted=True)
+        if b"\0" in data[:8192]:
+            return FileUpdate(rel_path, deleted=True)  # binary files are not indexed
+        sha256 = hashlib.sha256(data).hexdigest()
+        known = self.manifest.get(rel_path)
+        if known is not None and known["sha256"] == sha256:
+            return FileUpdate(rel_path, version, sha256, len(data))  # touched, not changed
+        chunks = chunk_text(rel_path, data.decode("utf-8", errors="replace"))
+        return FileUpdate(rel_path, version, sha256, len(data), chunks)
+
+    async def _produce(self, path: str, queue: "asyncio.Queue[Optional[FileUpdate]]", stats: Dict[str, Any]):
+        try:
+            candidates, removed, unchanged = await asyncio.to_thread(self._scan, path)
+            stats["files_unchanged"] += unchanged
+            for rel_path in removed:
+                await queue.put(FileUpdate(rel_path, deleted=True))
+            for start in range(0, len(candidates), RAG_READ_WORKERS):
+                window = candidates[start:start + RAG_READ_WORKERS]
+                for update in await asyncio.gather(*[asyncio.to_thread(self._read, *c) for c in window]):
+                    await queue.put(update)
+        except Exception:
+            await queue.put(None)  # let the consumer finish; ingest() re-raises
+            raise
+        await queue.put(None)
+
+    async def _consume(self, queue: "asyncio.Queue[Optional[FileUpdate]]", stats: Dict[str, Any]):
+        pending: List[FileUpdate] = []
+        pending_chunks = 0
+        while True:
+            update = await queue.get()
+            if update is None:
+                break
+            if update.deleted:
+                await self._delete(update.rel_path, stats)
+            elif update.chunks is None:
+                self.manifest[update.rel_path]["version"] = update.version
+                stats["files_unchanged"] += 1
+            else:
+                pending.append(update)
+                pending_chunks += len(update.chunks)
+                if pending_chunks >= RAG_EMBED_BATCH:
+                    await self._store(pending, stats)
+                    pending, pending_chunks = [], 0
+        if pending:
+            await self._store(pending, stats)
+
+    async def _delete(self, rel_path: str, stats: Dict[str, Any]):
+        entry = self.manifest.pop(rel_path, None)
+        if entry is None:
+            return
+        await asyncio.to_thread(self.index.remove, entry["chunks"])
+        await database.delete_rag_documents([entry["document_id"]])
+        stats["files_removed"] += 1
+
+    def _stored_vectors(self, updates: List[FileUpdate]) -> Dict[str, List[float]]:
+        """Vectors of the current chunks of these files, by chunk hash."""
+        reusable: Dict[str, List[float]] = {}
+        for update in updates:
+            for chunk_id in self.manifest.get(update.rel_path, {}).get("chunks", []):
+                stored = self.index.get(chunk_id)
+                if stored is not None:
+                    reusable[stored[1]["hash"]] = stored[0]
+        return reusable
+
+    def _swap_chunks(self, swaps: List[Tuple[List[str], List[Tuple[List[float], Dict[str, Any]]]]]):
+        """Replace each file's old chunk ids with its new (vector, record) items."""
+        for old_chunks, items in swaps:
+            if old_chunks:
+                self.index.remove(old_chunks)
+            self.index.add(items)
+
+    async def _store(self, updates: List[FileUpdate], stats: Dict[str, Any]):
+        """Embed the new chunks of a batch of files, then swap them into the index and table."""
+        # Vectors of chunks that survived an edit unchanged are reused as-is
+        reusable = await asyncio.to_thread(self._stored_vectors, updates)
+        hashes = [[hashlib.sha256(chunk.text.encode("utf-8")).hexdigest() for chunk in update.chunks]
+                  for update in updates]
+        texts = {h: chunk.text for update, file_hashes in zip(updates, hashes)
+                 for chunk, h in zip(update.chunks, file_hashes) if h not in reusable}
+        vectors = dict(zip(texts, await self.embedder.embed(list(texts.values())))) if texts else {}
+        vectors.update(reusable)
+        stats["chunks_embedded"] += len(texts)
+
+        now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        rows = []
+        swaps = []
+        for update, file_hashes in zip(updates, hashes):
+            document_id = self.document_id(update.rel_path)
+            items = []
+            for chunk, chunk_hash in zip(update.chunks, file_hashes):
+                items.append((vectors[chunk_hash], {
+                    "id": str(uuid.uuid4()),
+                    "project_id": self.project_id,
+                    "document_id": document_id,
+                    "path": update.rel_path,
+                    "start_line": chunk.start_line,
+                    "end_line": chunk.end_line,
+                    "symbol": chunk.symbol,
+                    "hash": chunk_hash,
+                    "text": chunk.text,
+                }))
+            old = self.manifest.get(update.rel_path)
+            swaps.append((old["chunks"] if old is not None else [], items))
+            self.manifest[update.rel_path] = {
+                "document_id": document_id,
+                "sha256": update.sha256,
+                "version": update.version,
+                "chunks": [record["id"] for _, record in items],
+            }
+            symbols = [chunk.symbol for chunk in update.chunks if chunk.symbol]
+            rows.append({
+                "id": document_id,
+                "project_id": self.project_id,
+                "file_path": update.rel_path,
+                "title": os.path.basename(update.rel_path),
+                "metadata": {"sha256": update.sha256, "size": update.size, "chunks": len(items),
+                             "symbols": symbols[:50]},
+                "embedding_ref": f"{INDEX_NAME}:{document_id}",
+                "last_updated": now,
+            })
+        await asyncio.to_thread(self._swap_chunks, swaps)
+        await database.upsert_rag_documents(rows)
+        stats["files_ingested"] += len(updates)
+        stats["chunks_stored"] += sum(len(update.chunks) for update in updates)
+
+    # --- entry points ---
+
+    async def ingest(self, path: str = "") -> Dict[str, Any]:
+        """
+        Bring the index and rag_documents up to date with the workspace.
+
+        Args:
+            path: Only ingest files under this workspace-relative directory
+
+        Returns:
+            Counters for this run (files ingested/unchanged/removed, chunks embedded/stored)
+        """
+        async with self._lock:
+            started = time.perf_counter()
+            events_version = workspace_events.version
+            stats: Dict[str, Any] = {"files_ingested": 0, "files_unchanged": 0, "files_removed": 0,
+                                     "chunks_embedded": 0, "chunks_stored": 0}
+            queue: "asyncio.Queue[Optional[FileUpdate]]" = asyncio.Queue(maxsize=RAG_QUEUE_SIZE)
+            producer = asyncio.create_task(self._produce(path, queue, stats))
+            try:
+                await self._consume(queue, stats)
+                await producer
+            finally:
+                if not producer.done():
+                    producer.cancel()
+                await asyncio.to_thread(self._save_manifest)
+            await asyncio.to_thread(self.index.compact)
+            if not path:
+                self.ingested_version = events_version
+                self.ingested_at = time.monotonic()
+            stats["seconds"] = round(time.perf_counter() - started, 3)
+            self.last_stats = stats
+            return stats
+
+    async def refresh(self):
+        """Re-ingest if a tool wrote a file or the last full ingest is getting old."""
+        if (self.ingested_version != workspace_events.version
+                or time.monotonic() - self.ingested_at > RAG_REFRESH_SECONDS):
+            await self.ingest()
+
+    async def search(self, query: str, limit: int = 5) -> List[Tuple[float, Dict[str, Any]]]:
+        """Chunks most similar to query as (score, record), best first."""
+        vector = (await self.embedder.embed([query]))[0]
+        return await asyncio.to_thread(self._search, vector, limit)
+
+    def _search(self, vector: List[float], limit: int) -> List[Tuple[float, Dict[str, Any]]]:
+        return self.index.search(vector, limit=limit, partition=self.project_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Index size and last ingest counters; loads the index, so call it from a worker thread."""
+        return {
+            "files": len(self.manifest),
+            "chunks": self.index.count(self.project_id),
+            "workspace": os.path.abspath(_workspace_path("")),
+            "last_ingest": self.last_stats,
+        }
+
+
+# Global instance
+rag_pipeline = RagPipeline()
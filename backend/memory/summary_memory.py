@@ -0,0 +1,110 @@
+"""
+Similarity-based recall of memory_summaries.
+Summaries are embedded when they are logged and stored in a local vector
+index; a new session recalls the ones most similar to its first message
+instead of simply the most recent. Index reads and writes take file locks
+and (without NumPy) scan in pure Python, so they run in worker threads.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from db.database import database
+from memory.embeddings import Embedder, create_embedder
+from memory.vector_index import VectorIndex
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = "memory_summaries"
+
+
+class SummaryMemory:
+    """Embeds conversation summaries and retrieves them by similarity."""
+
+    def __init__(self, embedder: Optional[Embedder] = None, index: Optional[VectorIndex] = None,
+                 min_score: Optional[float] = None):
+        """
+        Initialize the memory. The embedder and index are created on first use.
+
+        Args:
+            embedder: Embedder for summaries and queries (EMBEDDING_PROVIDER)
+            index: Vector index holding the summaries
+            min_score: Recalled summaries must be at least this similar (MEMORY_MIN_SCORE, default 0.2)
+        """
+        self._embedder = embedder
+        self._index = index
+        # The index is loaded from disk in a worker thread; build it only once
+        self._index_lock = threading.Lock()
+        self.min_score = min_score if min_score is not None else float(os.getenv("MEMORY_MIN_SCORE", 0.2))
+
+    @property
+    def embedder(self) -> Embedder:
+        if self._embedder is None:
+            self._embedder = create_embedder()
+        return self._embedder
+
+    @property
+    def index(self) -> VectorIndex:
+        with self._index_lock:
+            if self._index is None:
+                self._index = VectorIndex(INDEX_NAME, self.embedder.model, self.embedder.dimensions)
+            return self._index
+
+    def _add(self, items: List[Tuple[List[float], Dict[str, Any]]]):
+        self.index.add(items)
+
+    def _search(self, agent_id: str, vector: List[float], limit: int) -> List[Tuple[float, Dict[str, Any]]]:
+        return self.index.search(vector, limit=limit, partition=agent_id)
+
+    def _count(self, agent_id: str) -> int:
+        return self.index.count(agent_id)
+
+    def embedding_ref(self, summary_id: str) -> str:
+        """Value stored in memory_summaries.embedding_ref for an indexed summary."""
+        return f"{INDEX_NAME}:{summary_id}"
+
+    async def add_many(self, summaries: List[Tuple[str, str, str]]) -> List[str]:
+        """
+        Embed and index summaries in one batch.
+
+        Args:
+            summaries: (summary_id, agent_id, summary) tuples
+
+        Returns:
+            The embedding_ref of each summary, or "" where embedding failed
+        """
+        if not summaries:
+            return []
+        try:
+            vectors = await self.embedder.embed([text for _, _, text in summaries])
+            await asyncio.to_thread(self._add, [
+                (vector, {"id": summary_id, "agent_id": agent_id, "summary": text})
+                for (summary_id, agent_id, text), vector in zip(summaries, vectors)
+            ])
+        except Exception as e:
+            logger.error(f"Embedding summaries failed: {e}")
+            return ["" for _ in summaries]
+        return [self.embedding_ref(summary_id) for summary_id, _, _ in summaries]
+
+    async def recall(self, agent_id: str, query: Optional[str], limit: int = 5) -> List[str]:
+        """
+        Summaries for agent_id most similar to query, best match first.
+
+        Falls back to the most recent summaries when there is no query yet or
+        nothing has been indexed for the agent.
+        """
+        if query and await asyncio.to_thread(self._count, agent_id):
+            try:
+                vector = (await self.embedder.embed([query]))[0]
+                hits = await asyncio.to_thread(self._search, agent_id, vector, limit)
+                return [record["summary"] for score, record in hits if score >= self.min_score]
+            except Exception as e:
+                logger.error(f"Summary recall failed: {e}")
+        return await database.get_recent_summaries(agent_id, limit=limit)
+
+
+# Global instance
+summary_memory = SummaryMemory()
@@ -0,0 +1,306 @@
+"""
+Small on-disk vector index with exact cosine-similarity search.
+Vectors are appended to a raw float32 file and their records to a JSON-lines
+file, so adding an entry never rewrites the index; removals are appended to a
+tombstone file and dropped for good by compact(). Writes hold a file lock
+and first read what other processes appended, so several server workers can
+share one index; searches pick up their entries too. Search uses NumPy when
+it is installed and a pure-Python dot product otherwise; both are fast
+enough for the tens of thousands of entries this is meant for.
+"""
+
+import json
+import math
+import operator
+import os
+import threading
+from array import array
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; fall back to pure Python scoring
+    np = None
+
+try:
+    import fcntl
+except ImportError:  # no cross-process lock (Windows); use a single server worker there
+    fcntl = None
+
+Vector = List[float]
+
+
+def _normalize(vector: Vector) -> Vector:
+    norm = math.sqrt(sum(v * v for v in vector))
+    return [v / norm for v in vector] if norm else list(vector)
+
+
+class VectorIndex:
+    """Vector store partitioned by one metadata field."""
+
+    def __init__(self, name: str, model: str, dimensions: int,
+                 directory: Optional[str] = None, partition_key: str = "agent_id"):
+        """
+        Initialize the index and load any saved entries.
+
+        Args:
+            name: File name prefix inside the index directory
+            model: Embedding model; a saved index built with another model is discarded
+            dimensions: Vector size
+            directory: Where index files live (VECTOR_INDEX_PATH, default ./.vector_index)
+            partition_key: Record field searches can be restricted to
+        """
+        self.name = name
+        self.model = model
+        self.dimensions = dimensions
+        self.directory = directory or os.getenv("VECTOR_INDEX_PATH", "./.vector_index")
+        self.partition_key = partition_key
+        self._lock = threading.Lock()
+        self._reset()
+        self._load()
+
+    def _reset(self):
+        self._records: List[Dict[str, Any]] = []
+        self._ids: Dict[str, int] = {}
+        self._partitions: Dict[Any, List[int]] = {}
+        self._deleted: Set[int] = set()
+        self._live_rows: Optional[List[int]] = None
+        self._data = array("f")
+        self._matrix = None
+        # How far the files have been read, and which generation of them (compact() replaces them)
+        self._file_id: Optional[int] = None
+        self._jsonl_offset = 0
+        self._deleted_offset = 0
+
+    def _path(self, suffix: str) -> str:
+        return os.path.join(self.directory, f"{self.name}.{suffix}")
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """Exclusive lock on the index files across processes."""
+        if fcntl is None:
+            yield
+            return
+        with open(self._path("lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _load(self):
+        os.makedirs(self.directory, exist_ok=True)
+        header = {"model": self.model, "dimensions": self.dimensions}
+        with self._file_lock():
+            try:
+                with open(self._path("json"), "r", encoding="utf-8") as f:
+                    saved = json.load(f)
+            except (OSError, ValueError):
+                saved = None
+            if saved != header:
+                # New index, or vectors from a different model: start over.
+                for suffix in ("f32", "jsonl", "deleted"):
+                    open(self._path(suffix), "wb").close()
+                with open(self._path("json"), "w", encoding="utf-8") as f:
+                    json.dump(header, f)
+            self._catch_up()
+
+    def _changed_on_disk(self) -> bool:
+        try:
+            st = os.stat(self._path("jsonl"))
+            deleted_size = os.path.getsize(self._path("deleted"))
+        except OSError:
+            return False
+        return st.st_ino != self._file_id or st.st_size != self._jsonl_offset or \
+            deleted_size != self._deleted_offset
+
+    def _catch_up(self):
+        """Read entries other processes appended since the last read; hold the file lock."""
+        file_id = os.stat(self._path("jsonl")).st_ino
+        if file_id != self._file_id:
+            # First load, or the files were compacted by another process
+            self._reset()
+            self._file_id = file_id
+        with open(self._path("jsonl"), "rb") as f:
+            f.seek(self._jsonl_offset)
+            tail = f.read()
+        records, sizes = [], []
+        for line in tail.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break  # partially written last line
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break
+            sizes.append(len(line))
+        row_bytes = self.dimensions * 4
+        with open(self._path("f32"), "rb") as f:
+            f.seek(len(self._data) * 4)
+            vectors = f.read(len(records) * row_bytes + 1)
+        # A crash between the two appends leaves them out of step; keep the common prefix
+        # and cut the files back to it, so later appends line up again.
+        count = min(len(records), len(vectors) // row_bytes)
+        if count < len(records) or len(vectors) > count * row_bytes or len(tail) > sum(sizes[:count]):
+            with open(self._path("jsonl"), "r+b") as f:
+                f.truncate(self._jsonl_offset + sum(sizes[:count]))
+            with open(self._path("f32"), "r+b") as f:
+                f.truncate((len(self._data) + count * self.dimensions) * 4)
+        self._data.frombytes(vectors[:count * row_bytes])
+        for record in records[:count]:
+            self._track(record)
+        self._jsonl_offset += sum(sizes[:count])
+        try:
+            with open(self._path("deleted"), "rb") as f:
+                f.seek(self._deleted_offset)
+                tail = f.read()
+        except OSError:
+            tail = b""
+        end = tail.rfind(b"\n") + 1
+        self._deleted_offset += end
+        self._forget([line.strip() for line in tail[:end].decode("utf-8").splitlines() if line.strip()])
+        if count:
+            self._live_rows = None
+            self._matrix = None
+
+    def _track(self, record: Dict[str, Any]):
+        row = len(self._records)
+        self._records.append(record)
+        self._ids[record["id"]] = row
+        self._partitions.setdefault(record.get(self.partition_key), []).append(row)
+
+    def _forget(self, ids: List[str]) -> int:
+        rows = {self._ids.pop(record_id) for record_id in ids if record_id in self._ids}
+        if not rows:
+            return 0
+        self._deleted |= rows
+        for partition in {self._records[row].get(self.partition_key) for row in rows}:
+            remaining = [row for row in self._partitions[partition] if row not in rows]
+            if remaining:
+                self._partitions[partition] = remaining
+            else:
+                del self._partitions[partition]
+        self._live_rows = None
+        return len(rows)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, record_id: str) -> bool:
+        return record_id in self._ids
+
+    def count(self, partition: Any = None) -> int:
+        if partition is None:
+            return len(self._ids)
+        return len(self._partitions.get(partition, []))
+
+    def ids(self) -> List[str]:
+        return list(self._ids)
+
+    def get(self, record_id: str) -> Optional[Tuple[Vector, Dict[str, Any]]]:
+        """The stored (normalized) vector and record for an id."""
+        row = self._ids.get(record_id)
+        if row is None:
+            return None
+        offset = row * self.dimensions
+        return self._data[offset:offset + self.dimensions].tolist(), self._records[row]
+
+    def add(self, items: List[Tuple[Vector, Dict[str, Any]]]):
+        """Append (vector, record) pairs; each record needs a unique "id"."""
+        with self._lock, self._file_lock():
+            self._catch_up()
+            items = [(vector, record) for vector, record in items if record["id"] not in self._ids]
+            if not items:
+                return
+            vectors = array("f")
+            for vector, _ in items:
+                if len(vector) != self.dimensions:
+                    raise ValueError(f"Expected {self.dimensions} dimensions, got {len(vector)}")
+                vectors.extend(_normalize(vector))
+            lines = "".join(json.dumps(record) + "\n" for _, record in items).encode("utf-8")
+            with open(self._path("f32"), "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self._path("jsonl"), "ab") as f:
+                f.write(lines)
+            self._jsonl_offset += len(lines)
+            self._data.extend(vectors)
+            for _, record in items:
+                self._track(record)
+            self._live_rows = None
+            self._matrix = None
+
+    def remove(self, ids: List[str]) -> int:
+        """Remove records by id; returns how many were present."""
+        with self._lock, self._file_lock():
+            self._catch_up()
+            ids = [record_id for record_id in ids if record_id in self._ids]
+            if not ids:
+                return 0
+            lines = "".join(f"{record_id}\n" for record_id in ids).encode("utf-8")
+            with open(self._path("deleted"), "ab") as f:
+                f.write(lines)
+            self._deleted_offset += len(lines)
+            return self._forget(ids)
+
+    def compact(self, min_deleted_ratio: float = 0.25):
+        """Rewrite the index files without removed records once enough have piled up."""
+        with self._lock, self._file_lock():
+            self._catch_up()
+            if not self._deleted or len(self._deleted) < min_deleted_ratio * len(self._records):
+                return
+            live = [row for row in range(len(self._records)) if row not in self._deleted]
+            data = array("f")
+            for row in live:
+                data.extend(self._data[row * self.dimensions:(row + 1) * self.dimensions])
+            records = [self._records[row] for row in live]
+            lines = "".join(json.dumps(record) + "\n" for record in records).encode("utf-8")
+            # Write new files next to the old ones, then swap them in.
+            with open(self._path("f32.tmp"), "wb") as f:
+                f.write(data.tobytes())
+            with open(self._path("jsonl.tmp"), "wb") as f:
+                f.write(lines)
+            os.replace(self._path("f32.tmp"), self._path("f32"))
+            os.replace(self._path("jsonl.tmp"), self._path("jsonl"))
+            open(self._path("deleted"), "wb").close()
+            self._reset()
+            self._file_id = os.stat(self._path("jsonl")).st_ino
+            self._jsonl_offset = len(lines)
+            self._data = data
+            for record in records:
+                self._track(record)
+
+    def search(self, vector: Vector, limit: int = 5, partition: Any = None) -> List[Tuple[float, Dict[str, Any]]]:
+        """Most similar records as (cosine similarity, record), best first."""
+        query = _normalize(vector)
+        with self._lock:
+            if self._changed_on_disk():
+                with self._file_lock():
+                    self._catch_up()
+            if partition is not None:
+                rows = self._partitions.get(partition, [])
+            elif self._deleted:
+                if self._live_rows is None:
+                    self._live_rows = sorted(self._ids.values())
+                rows = self._live_rows
+            else:
+                rows = None  # every row
+            if rows is not None and not rows:
+                return []
+            if np is not None:
+                if self._matrix is None:
+                    # Copy: a live buffer view would stop self._data from growing.
+                    self._matrix = np.frombuffer(self._data, dtype=np.float32).copy().reshape(-1, self.dimensions)
+                matrix = self._matrix if rows is None else self._matrix[rows]
+                scores = matrix @ np.asarray(query, dtype=np.float32)
+                top = np.argsort(-scores)[:limit] if len(scores) <= limit else \
+                    np.argpartition(-scores, limit)[:limit]
+                hits = [(float(scores[i]), rows[i] if rows is not None else int(i)) for i in top]
+            else:
+                dim = self.dimensions
+                data = self._data
+                hits = []
+                for row in (rows if rows is not None else range(len(self._records))):
+                    offset = row * dim
+                    hits.append((sum(map(operator.mul, query, data[offset:offset + dim])), row))
+            hits.sort(key=lambda hit: -hit[0])
+            return [(score, self._records[row]) for score, row in hits[:limit]]
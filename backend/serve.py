@@ -0,0 +1,47 @@
+"""
+Entry point for running the Agent Team API with uvicorn.
+Kept separate from main.py so worker processes import the app only once:
+each worker re-runs the launcher script before importing main:app.
+
+    python serve.py                          # development: one process, reload on changes
+    SERVER_MODE=production python serve.py   # SERVER_WORKERS processes, graceful drain
+"""
+
+import os
+
+from dotenv import load_dotenv
+
+
+def run_server():
+    """
+    Run the API with uvicorn.
+
+    SERVER_MODE=development (the default) runs one process that reloads on
+    code changes. SERVER_MODE=production runs SERVER_WORKERS processes (CPU
+    count by default) without reload; on SIGTERM each stops accepting
+    connections, gives in-flight requests up to SHUTDOWN_GRACE_SECONDS to
+    finish, then runs the app's lifespan shutdown, which flushes queued
+    database writes and closes the session store.
+    """
+    import uvicorn
+    load_dotenv()
+    host = os.getenv("HOST", "localhost")
+    port = int(os.getenv("PORT", 8000))
+    if os.getenv("SERVER_MODE", "development").lower() != "production":
+        uvicorn.run("main:app", host=host, port=port, reload=True)
+        return
+    workers = int(os.getenv("SERVER_WORKERS") or os.cpu_count() or 1)
+    # Worker processes read this to check their session store setup
+    os.environ["SERVER_WORKERS"] = str(workers)
+    uvicorn.run(
+        "main:app",
+        host=host,
+        port=port,
+        workers=workers,
+        timeout_graceful_shutdown=float(os.getenv("SHUTDOWN_GRACE_SECONDS", 30)),
+        log_level=os.getenv("LOG_LEVEL", "INFO").lower(),
+    )
+
+
+if __name__ == "__main__":
+    run_server()
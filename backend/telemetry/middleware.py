@@ -0,0 +1,32 @@
+"""
+ASGI middleware that times every HTTP request as a span.
+Requests are labelled by route template ("/api/messages/{id}") rather than raw
+path, and timed until the last body chunk is sent, so streamed responses
+are measured end to end.
+"""
+
+from telemetry.metrics import http_request_seconds
+from telemetry.tracing import span
+
+
+class RequestTimingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        with span("http.request", http_request_seconds, method=scope["method"], path=scope["path"]) as request_span:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = scope.get("route")
+                request_span.set(route=getattr(route, "path", "unmatched"), code=status["code"])
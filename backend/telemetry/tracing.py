@@ -0,0 +1,166 @@
+"""
+Lightweight spans around LLM, tool, database and HTTP calls.
+A span times a block, records it into a histogram and, when TRACE_EXPORT_PATH
+is set, is written as one JSON line to that file by a background thread so
+the hot path never waits on disk.
+"""
+
+import asyncio
+import contextvars
+import functools
+import inspect
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from telemetry.metrics import Histogram
+
+class Span:
+    """One timed operation, linked to its parent through trace_id/parent_id."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "duration", "status", "attributes")
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.start = time.time()
+        self.duration = 0.0
+        self.status = "success"
+        self.attributes = attributes
+
+    def set(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "trace_id": self.trace_id, "span_id": self.span_id,
+                "parent_id": self.parent_id, "start": self.start,
+                "duration_ms": round(self.duration * 1000, 3), "status": self.status,
+                "attributes": self.attributes}
+
+
+class TraceExporter:
+    """Appends finished spans to a JSON-lines file from a daemon thread."""
+
+    def __init__(self, path: Optional[str] = None, max_queue: int = 10000):
+        """
+        Args:
+            path: Output file (TRACE_EXPORT_PATH); exporting is off when unset
+            max_queue: Spans buffered before new ones are dropped
+        """
+        self.path = path if path is not None else os.getenv("TRACE_EXPORT_PATH", "")
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def export(self, span: Span):
+        if not self.enabled:
+            return
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                    self._thread.start()
+        try:
+            self._queue.put_nowait(span.as_dict())
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    f.flush()
+                    return
+                f.write(json.dumps(item, default=str) + "\n")
+                # Flush once the backlog is written, not after every span
+                if self._queue.empty():
+                    f.flush()
+
+    def shutdown(self, timeout: float = 5):
+        """Write out queued spans and stop the thread."""
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+
+# Global instance
+trace_exporter = TraceExporter()
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def detach_span():
+    """Start new root spans from here on in this context, e.g. in a long-lived
+    background task that was created while a request span was active."""
+    _current_span.set(None)
+
+
+@contextmanager
+def span(name: str, histogram: Optional[Histogram] = None, **labels: Any) -> Iterator[Span]:
+    """
+    Time a block as a span.
+
+    Args:
+        name: Span name, e.g. "llm.chat_completion"
+        histogram: Histogram observed with the duration; labels not given
+            here are filled from span attributes, and "status" from the outcome
+        labels: Span attributes (and histogram labels)
+    """
+    current = Span(name, _current_span.get(), dict(labels))
+    token = _current_span.set(current)
+    started = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.status = ("cancelled" if isinstance(e, (asyncio.CancelledError, GeneratorExit, KeyboardInterrupt))
+                          else "error")
+        if current.status == "error":
+            current.attributes["error"] = str(e)[:200]
+        raise
+    finally:
+        current.duration = time.perf_counter() - started
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # Finished in another context (e.g. an async generator closed elsewhere)
+            pass
+        if histogram is not None:
+            values = {**current.attributes, "status": current.status}
+            histogram.observe(current.duration, **{k: values.get(k, "") for k in histogram.labels})
+        trace_exporter.export(current)
+
+
+def traced(name: str, histogram: Optional[Histogram] = None, **labels: Any) -> Callable:
+    """Decorator form of span() for sync and async functions."""
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, histogram, **labels):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, histogram, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,47 @@
+"""
+Shared test setup: run the backend against throwaway local state.
+Modules read their configuration from the environment at import time, so it
+is set here before any test imports them.
+"""
+
+import os
+import sys
+import tempfile
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+_state = tempfile.mkdtemp(prefix="agent-team-tests-")
+os.makedirs(os.path.join(_state, "workspace"), exist_ok=True)
+for key, value in {
+    "DB_BACKEND": "memory",
+    "OPENAI_API_KEY": "test",
+    "OPENAI_BASE_URL": "http://127.0.0.1:9/v1",
+    "EMBEDDING_PROVIDER": "hash",
+    "WORKSPACE_PATH": os.path.join(_state, "workspace"),
+    "WORKSPACE_INDEX_PATH": os.path.join(_state, "workspace_index.json"),
+    "VECTOR_INDEX_PATH": os.path.join(_state, "vector_index"),
+    "SESSION_STORE": "memory",
+    "AGENTS_PRELOAD": "none",
+    "LOG_LEVEL": "WARNING",
+}.items():
+    os.environ[key] = value
+
+import asyncio  # noqa: E402
+
+import pytest  # noqa: E402
+
+from db.database import database  # noqa: E402
+
+
+@pytest.fixture
+def run():
+    """Run a coroutine on a fresh event loop, then close the shared database on that loop."""
+    def run(coro):
+        async def main():
+            try:
+                return await coro
+            finally:
+                await database.close()
+        return asyncio.run(main())
+    return run
@@ -0,0 +1,56 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from tools.change_set import ChangeSet
+from tools.file_tools import write_file
+from tools.tool_box import ToolBox
+from tools.workspace_events import change_thread
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    monkeypatch.setenv("WORKSPACE_PATH", str(tmp_path))
+    (tmp_path / "shared.txt").write_text("one\n")
+    return tmp_path
+
+
+async def write_as(thread_id, path, content):
+    """Write through the tool pipeline as an agent working on thread_id does."""
+    token = change_thread.set(thread_id)
+    try:
+        arguments = json.dumps({"path": path, "content": content})
+        return await ToolBox(["file"]).run_tool_calls([("write_file", arguments)])
+    finally:
+        change_thread.reset(token)
+
+
+def test_diffs_since_review(workspace):
+    with ChangeSet() as changes:
+        write_file("shared.txt", "two\n")
+        write_file("new.txt", "hello\n")
+        assert set(changes.diffs()) == {"shared.txt", "new.txt"}
+        assert "-one\n+two\n" in changes.diffs()["shared.txt"]
+        assert changes.diffs()["new.txt"].startswith("--- /dev/null\n")
+        changes.mark_reviewed()
+        assert changes.diffs(since_review=True) == {}
+        write_file("shared.txt", "three\n")
+        assert set(changes.diffs(since_review=True)) == {"shared.txt"}
+        # Back to the original contents: nothing left to review
+        write_file("shared.txt", "one\n")
+        assert set(changes.diffs()) == {"new.txt"}
+
+
+def test_scoped_change_sets_see_only_their_threads_writes(workspace):
+    async def run():
+        with ChangeSet(thread_id="t1") as first, ChangeSet(thread_id="t2") as second, ChangeSet() as everything:
+            await asyncio.gather(write_as("t1", "a.txt", "from t1\n"), write_as("t2", "b.txt", "from t2\n"))
+            # A write made outside any agent thread, e.g. by another request handler
+            writer = threading.Thread(target=write_file, args=("shared.txt", "other\n"))
+            writer.start()
+            writer.join()
+            return set(first.diffs()), set(second.diffs()), set(everything.diffs())
+
+    assert asyncio.run(run()) == ({"a.txt"}, {"b.txt"}, {"a.txt", "b.txt", "shared.txt"})
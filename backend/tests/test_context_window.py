@@ -0,0 +1,105 @@
+from agents.context_window import ContextWindow
+
+
+def tool_call(call_id):
+    return {"id": call_id, "type": "function", "function": {"name": "read_file", "arguments": "{}"}}
+
+
+def roles(messages):
+    return [m["role"] for m in messages]
+
+
+def assert_tool_calls_answered(messages):
+    """Every tool result follows its call, and every call has all its results."""
+    open_calls = set()
+    for message in messages:
+        if message["role"] == "tool":
+            assert message["tool_call_id"] in open_calls
+            open_calls.discard(message["tool_call_id"])
+        else:
+            assert not open_calls
+            open_calls = {c["id"] for c in message.get("tool_calls") or ()}
+    assert not open_calls
+
+
+def test_under_budget_is_unchanged():
+    window = ContextWindow([{"role": "system", "content": "sys"}],
+                           [{"role": "user", "content": "hi"}], budget=1000)
+    assert roles(window.fit()) == ["system", "user"]
+
+
+def test_old_tool_output_is_truncated_before_dropping():
+    history = [
+        {"role": "user", "content": "read both"},
+        {"role": "assistant", "content": None, "tool_calls": [tool_call("a")]},
+        {"role": "tool", "tool_call_id": "a", "content": "x" * 4000},
+        {"role": "assistant", "content": None, "tool_calls": [tool_call("b")]},
+        {"role": "tool", "tool_call_id": "b", "content": "y" * 400},
+    ]
+    window = ContextWindow([{"role": "system", "content": "sys"}], history,
+                           budget=400, tool_output_tokens=20)
+    messages = window.fit()
+    assert len(messages) == 6
+    assert "truncated" in messages[3]["content"]
+    assert window.truncated_calls == ["a"]
+    assert not window.has_tool_output("a") and window.has_tool_output("b")
+
+
+def test_tool_call_and_results_are_dropped_together():
+    history = [
+        {"role": "user", "content": "u" * 400},
+        {"role": "assistant", "content": None, "tool_calls": [tool_call("a"), tool_call("b")]},
+        {"role": "tool", "tool_call_id": "a", "content": "a" * 400},
+        {"role": "tool", "tool_call_id": "b", "content": "b" * 400},
+        {"role": "user", "content": "next question"},
+    ]
+    window = ContextWindow([{"role": "system", "content": "sys"}], history,
+                           budget=60, tool_output_tokens=10)
+    messages = window.fit()
+    assert roles(messages) == ["system", "user"]
+    assert messages[-1]["content"] == "next question"
+    assert window.total_tokens <= 60
+
+
+def test_large_last_tool_result_is_truncated_not_orphaned():
+    history = [
+        {"role": "user", "content": "read a and b"},
+        {"role": "assistant", "content": None, "tool_calls": [tool_call("a"), tool_call("b")]},
+        {"role": "tool", "tool_call_id": "a", "content": "small"},
+        {"role": "tool", "tool_call_id": "b", "content": "z" * 20000},
+    ]
+    window = ContextWindow([{"role": "system", "content": "sys"}], history, budget=300)
+    messages = window.fit()
+    assert roles(messages) == ["system", "user", "assistant", "tool", "tool"]
+    assert_tool_calls_answered(messages[1:])
+    assert "truncated" in messages[-1]["content"]
+    assert window.total_tokens <= 300
+
+
+def test_current_question_is_kept_when_its_tool_calls_overflow():
+    history = [
+        {"role": "user", "content": "old question"},
+        {"role": "assistant", "content": "old answer"},
+        {"role": "user", "content": "please fix bug in foo.py"},
+        {"role": "assistant", "content": None, "tool_calls": [tool_call("a")]},
+        {"role": "tool", "tool_call_id": "a", "content": "a" * 3000},
+        {"role": "assistant", "content": None, "tool_calls": [tool_call("b")]},
+        {"role": "tool", "tool_call_id": "b", "content": "b" * 3000},
+    ]
+    window = ContextWindow([{"role": "system", "content": "sys"}], history, budget=400)
+    messages = window.fit()
+    assert roles(messages) == ["system", "user", "assistant", "tool"]
+    assert messages[1]["content"] == "please fix bug in foo.py"
+    assert messages[-1]["tool_call_id"] == "b"
+    assert window.total_tokens <= 400
+
+
+def test_token_total_tracks_messages():
+    window = ContextWindow([{"role": "system", "content": "sys"}],
+                           [{"role": "user", "content": "w" * 4000},
+                            {"role": "assistant", "content": "ok"},
+                            {"role": "user", "content": "next"}], budget=50)
+    window.fit()
+    assert roles(window.messages) == ["system", "user"]
+    recount = ContextWindow([], list(window.messages))
+    assert recount.total_tokens == window.total_tokens
@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+
+from agents.developer_agent import DeveloperAgent
+from db.database import database
+
+
+class FakeLLM:
+    """Summarizes by echoing the transcript, and records each one."""
+
+    def __init__(self):
+        self.transcripts = []
+
+    async def chat_completion(self, **kwargs):
+        transcript = kwargs["messages"][-1]["content"]
+        self.transcripts.append(transcript)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f"summary of {transcript}"))])
+
+
+async def exchange(question, answer):
+    await database.save_message("t1", "user", "Developer", question, "user")
+    await database.save_message("t1", "Developer", "user", answer, "assistant")
+
+
+def test_summarized_messages_are_not_summarized_again(run):
+    agent = DeveloperAgent()
+    agent.llm = FakeLLM()
+
+    async def main():
+        await exchange("first question", "first answer")
+        await agent.sessions.get("t1")
+        await agent.log_conversation("t1")
+        # The session was reset; the thread continues on a later request
+        await exchange("second question", "second answer")
+        session = await agent.sessions.get("t1")
+        history = session.messages.history()
+        await agent.log_conversation("t1")
+        return history
+
+    history = run(main())
+    assert [m["content"] for m in history] == ["second question", "second answer"]
+    first, second = agent.llm.transcripts
+    assert "first question" in first
+    assert "first question" not in second and "second question" in second
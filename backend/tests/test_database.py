@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+
+from db.backends import SQLiteBackend, SupabaseBackend
+from db.database import Database
+from db.write_queue import WriteBehindQueue
+
+
+@pytest.fixture
+def db():
+    return Database(SQLiteBackend(":memory:"))
+
+
+def test_writes_are_batched_and_read_back(db):
+    async def main():
+        ids = [await db.save_message("t1", "user", "Developer", f"m{i}", "user", {"i": i}) for i in range(10)]
+        await db.save_message("t2", "user", "Developer", "other", "user")
+        # Reads flush the queue first
+        rows = await db.get_messages("t1", limit=20)
+        stats = (db.writer.rows_written, db.writer.batches_written)
+        await db.close()
+        return ids, rows, stats
+
+    ids, rows, (rows_written, batches_written) = asyncio.run(main())
+    assert [row["id"] for row in rows] == ids[::-1]
+    assert rows[0]["metadata"] == {"i": 9}
+    assert (rows_written, batches_written) == (11, 1)
+
+
+def test_failed_batch_is_counted_and_later_writes_land(db):
+    async def main():
+        await db.writer.put("no_such_table", {"id": "x"})
+        await db.writer.flush()
+        await db.save_message("t1", "user", "Developer", "after", "user")
+        rows = await db.get_messages("t1")
+        failed = db.writer.failed_rows
+        await db.close()
+        return rows, failed
+
+    rows, failed = asyncio.run(main())
+    assert failed == 1
+    assert [row["content"] for row in rows] == ["after"]
+
+
+def test_full_queue_drops_queued_actions(db):
+    async def main():
+        db._writer = WriteBehindQueue(db.backend, max_size=1)
+        first = db.queue_action("a", "read_file", None, None, "success")
+        second = db.queue_action("a", "read_file", None, None, "success")
+        dropped = db.writer.dropped_rows
+        await db.close()
+        return first, second, dropped
+
+    first, second, dropped = asyncio.run(main())
+    assert first is not None and second is None and dropped == 1
+
+
+def test_action_stats_group_ledger_rows(db):
+    async def main():
+        for duration in (10, 20, 30, 40):
+            await db.log_action("a", "read_file", {}, {}, "success", agent_name="Developer",
+                                kind="tool", duration_ms=duration, input_chars=100)
+        await db.log_action("a", "read_file", {}, {"error": "missing"}, "error", agent_name="Developer",
+                            kind="tool", duration_ms=50)
+        await db.log_action("a", "gpt-4o", {}, {}, "success", agent_name="Developer", kind="llm",
+                            duration_ms=900, prompt_tokens=120, completion_tokens=30)
+        # Rows without a duration (plain log_action) are not timed, so not counted
+        await db.log_action("a", "read_file", {}, {}, "success")
+        by_tool = await db.get_action_stats("tool")
+        by_agent = await db.get_action_stats("agent", agent_name="Developer")
+        await db.close()
+        return by_tool, by_agent
+
+    by_tool, by_agent = asyncio.run(main())
+    assert [(s["kind"], s["name"]) for s in by_tool] == [("llm", "gpt-4o"), ("tool", "read_file")]
+    llm, tool = by_tool
+    assert (llm["prompt_tokens"], llm["completion_tokens"]) == (120, 30)
+    assert (tool["count"], tool["errors"], tool["p50_ms"], tool["p95_ms"], tool["max_ms"]) == (5, 1, 30, 50, 50)
+    assert tool["avg_input_chars"] == 80
+    assert {(s["agent"], s["kind"]) for s in by_agent} == {("Developer", "llm"), ("Developer", "tool")}
+
+
+class RecordingClient:
+    """Stands in for the supabase client: records each bulk statement."""
+
+    def __init__(self):
+        self.statements = []
+
+    def table(self, table):
+        return RecordingQuery(self, table)
+
+
+class RecordingQuery:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+
+    def insert(self, rows):
+        self.client.statements.append(("insert", self.table, rows))
+        return self
+
+    def upsert(self, rows):
+        self.client.statements.append(("upsert", self.table, rows))
+        return self
+
+    def execute(self):
+        return self
+
+
+def test_supabase_bulk_writes_share_one_column_list():
+    backend = SupabaseBackend.__new__(SupabaseBackend)
+    backend.client = RecordingClient()
+    plain = {"id": "1", "agent_id": "a", "tool_name": "read_file", "status": "success"}
+    ledger = {**plain, "id": "2", "agent_name": "Developer", "duration_ms": 12}
+    backend._insert("actions", [plain, ledger, {**plain, "id": "3"}])
+    backend._upsert("agents", [{"id": "a", "name": "Developer"}, {"id": "b", "name": "Critic", "role": "review"}])
+
+    for _, _, rows in backend.client.statements:
+        assert len({tuple(row) for row in rows}) == 1
+    assert [(kind, [row["id"] for row in rows]) for kind, _, rows in backend.client.statements] == [
+        ("insert", ["1", "3"]), ("insert", ["2"]), ("upsert", ["a"]), ("upsert", ["b"])]
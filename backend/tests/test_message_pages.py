@@ -0,0 +1,131 @@
+import datetime
+import json
+import uuid
+
+import httpx
+import pytest
+
+import db.database
+from db.database import database
+from db.message_pages import MESSAGE_COLUMNS, decode_cursor, encode_cursor, message_page_cache
+from main import app
+
+THREAD = "thread-1"
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    message_page_cache.clear()
+    yield
+    message_page_cache.clear()
+
+
+@pytest.fixture
+def no_overlap(monkeypatch):
+    monkeypatch.setattr(db.database, "MESSAGES_POLL_OVERLAP_SECONDS", 0)
+
+
+async def save(count, thread_id=THREAD):
+    return [await database.save_message(thread_id, "user", "Developer", f"message {i}", "user")
+            for i in range(count)]
+
+
+async def page(**kwargs):
+    return await database.get_message_page(kwargs.pop("thread_id", THREAD), kwargs.pop("limit", 2),
+                                           MESSAGE_COLUMNS, **kwargs)
+
+
+def test_cursor_round_trip():
+    row = {"id": str(uuid.uuid4()), "created_at": "2026-10-17T09:30:00.123456+00:00"}
+    assert decode_cursor(encode_cursor(row)) == (row["created_at"], row["id"])
+    for bad in ("not-a-cursor", encode_cursor({"id": "1; DROP TABLE messages", "created_at": row["created_at"]})):
+        with pytest.raises(ValueError):
+            decode_cursor(bad)
+
+
+def test_before_pages_walk_history_newest_first(run, no_overlap):
+    async def main():
+        ids = await save(5)
+        await save(2, thread_id="other")
+        seen, before = [], None
+        while True:
+            result = await page(before=before)
+            seen.extend(row["id"] for row in result.rows)
+            if not result.has_more:
+                assert result.next_cursor is None
+                return ids, seen
+            before = result.next_cursor
+
+    ids, seen = run(main())
+    assert seen == ids[::-1]
+
+
+def test_after_polls_return_only_new_messages(run, no_overlap):
+    async def main():
+        await save(2)
+        first = await page()
+        empty = await page(after=first.latest_cursor)
+        new_ids = await save(3)
+        polled = await page(after=first.latest_cursor)
+        rest = await page(after=polled.next_cursor)
+        return first, empty, new_ids, polled, rest
+
+    first, empty, new_ids, polled, rest = run(main())
+    assert empty.rows == [] and empty.next_cursor == first.latest_cursor
+    assert [row["id"] for row in polled.rows] == new_ids[:2] and polled.has_more
+    assert [row["id"] for row in rest.rows] == new_ids[2:] and not rest.has_more
+
+
+def test_poll_returns_late_writes_behind_the_cursor(run):
+    async def main():
+        await save(1)
+        first = await page()
+        # Another worker queued a message just before this one but flushed it later
+        created_at = datetime.datetime.fromisoformat(decode_cursor(first.latest_cursor)[0])
+        late = {"id": str(uuid.uuid4()), "thread_id": THREAD, "sender": "user", "recipient": "Developer",
+                "content": "late", "role": "user", "metadata": json.dumps({}),
+                "created_at": (created_at - datetime.timedelta(seconds=1)).isoformat()}
+        await database.backend.insert_many("messages", [late])
+        message_page_cache.invalidate(THREAD)
+        polled = await page(after=first.latest_cursor)
+        return late, first, polled
+
+    late, first, polled = run(main())
+    assert [row["id"] for row in polled.rows] == [late["id"]]
+    # The late message is re-sent, but polling does not move backwards
+    assert polled.next_cursor == first.latest_cursor
+
+
+def test_pages_are_cached_until_a_message_is_saved(run, no_overlap):
+    async def main():
+        await save(1)
+        first = await page()
+        cached = await page()
+        await save(1)
+        return first, cached, await page()
+
+    first, cached, after_save = run(main())
+    assert cached is first
+    assert after_save is not first and len(after_save.rows) == 2
+
+
+def test_http_etag_and_not_modified(run, no_overlap):
+    async def main():
+        await save(3)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            params = {"thread_id": THREAD, "limit": 2, "fields": "content"}
+            response = await client.get("/api/messages", params=params)
+            not_modified = await client.get("/api/messages", params=params,
+                                            headers={"If-None-Match": response.headers["etag"]})
+            older = await client.get("/api/messages", params={**params, "before": response.headers["x-next-cursor"]})
+            bad = await client.get("/api/messages", params={**params, "after": "garbage"})
+        return response, not_modified, older, bad
+
+    response, not_modified, older, bad = run(main())
+    assert response.status_code == 200
+    assert [set(row) for row in response.json()] == [{"id", "content", "created_at"}] * 2
+    assert response.headers["x-has-more"] == "true"
+    assert not_modified.status_code == 304 and not_modified.content == b""
+    assert [row["content"] for row in older.json()] == ["message 0"]
+    assert bad.status_code == 400
@@ -0,0 +1,68 @@
+import threading
+
+import pytest
+
+from memory.embeddings import HashEmbedder
+from memory.rag_pipeline import RagPipeline
+from memory.vector_index import VectorIndex
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    root = tmp_path / "ws"
+    root.mkdir()
+    monkeypatch.setenv("WORKSPACE_PATH", str(root))
+    (root / "cache.py").write_text("def evict_lru(entries):\n    return entries.popitem(last=False)\n")
+    (root / "notes.md").write_text("# Deployment\n\nRun the server with uvicorn behind nginx.\n")
+    return root
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    embedder = HashEmbedder(dimensions=64)
+    index = VectorIndex("chunks", embedder.model, embedder.dimensions,
+                        directory=str(tmp_path / "index"), partition_key="project_id")
+    return RagPipeline(embedder=embedder, index=index)
+
+
+def test_ingest_is_incremental(workspace, pipeline, run):
+    first = run(pipeline.ingest())
+    assert (first["files_ingested"], first["files_unchanged"]) == (2, 0)
+    again = run(pipeline.ingest())
+    assert (again["files_ingested"], again["files_unchanged"], again["chunks_embedded"]) == (0, 2, 0)
+
+    (workspace / "notes.md").write_text("# Deployment\n\nRun the server with gunicorn.\n")
+    (workspace / "cache.py").unlink()
+    changed = run(pipeline.ingest())
+    assert (changed["files_ingested"], changed["files_removed"]) == (1, 1)
+    assert pipeline.stats()["files"] == 1
+
+
+def test_search_returns_matching_chunks(workspace, pipeline, run):
+    run(pipeline.ingest())
+    hits = run(pipeline.search("evict_lru entries popitem", limit=1))
+    assert hits[0][1]["path"] == "cache.py"
+    assert hits[0][1]["start_line"] == 1
+
+
+def test_index_and_manifest_io_run_off_the_event_loop(workspace, pipeline, run, monkeypatch):
+    threads = []
+    for name in ("add", "remove", "search", "compact"):
+        original = getattr(VectorIndex, name)
+
+        def record(self, *args, _original=original, **kwargs):
+            threads.append(threading.current_thread())
+            return _original(self, *args, **kwargs)
+        monkeypatch.setattr(VectorIndex, name, record)
+    original_save = RagPipeline._save_manifest
+
+    def save(self):
+        threads.append(threading.current_thread())
+        return original_save(self)
+    monkeypatch.setattr(RagPipeline, "_save_manifest", save)
+
+    run(pipeline.ingest())
+    (workspace / "notes.md").unlink()
+    run(pipeline.ingest())
+    run(pipeline.search("deployment"))
+    assert threads and threading.main_thread() not in threads
@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+import pytest
+
+import main
+from agents.developer_agent import DeveloperAgent
+from agents.response_cache import response_cache
+from main import MessageRequest, stream_agent_events
+
+
+class FakeLLM:
+    """Answers every completion with one text chunk and counts the calls."""
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.calls = 0
+
+    async def stream_chat_completion(self, **kwargs):
+        self.calls += 1
+        delta = SimpleNamespace(content=self.answer, tool_calls=None)
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    agent = DeveloperAgent()
+    agent.llm = FakeLLM("Use functools.lru_cache.")
+
+    async def get_agent(name):
+        return agent
+
+    monkeypatch.setattr(main, "get_agent", get_agent)
+    monkeypatch.setattr(response_cache, "enabled", True)
+    response_cache.clear()
+    yield agent
+    response_cache.clear()
+
+
+def test_answers_streamed_to_a_client_are_cached(agent, run):
+    async def stream(thread_id):
+        events = []
+        async for event in stream_agent_events(MessageRequest(content="How do I memoize a function?",
+                                                              agent_name="Developer", thread_id=thread_id)):
+            events.append(event)
+        return events
+
+    async def main():
+        first = await stream("t1")
+        # The consumer stopped after the final event, and the agent stream was closed
+        session = agent.sessions.peek("t1")
+        locked = session.lock.locked()
+        second = await stream("t2")
+        return first, locked, second
+
+    first, locked, second = run(main())
+    assert [e["type"] for e in first] == ["start", "token", "message"]
+    assert not locked
+    assert response_cache.stats()["entries"] == 1
+    assert second[-1]["message"]["content"] == "Use functools.lru_cache."
+    assert agent.llm.calls == 1
@@ -0,0 +1,69 @@
+import pytest
+
+from tools import file_reader, search_tools
+from tools.file_cache import file_cache
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    monkeypatch.setenv("WORKSPACE_PATH", str(tmp_path))
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "app.py").write_text("import os\n\ndef main():\n    return os.getcwd()\n")
+    (tmp_path / "src" / "util.py").write_text("def helper():\n    pass\n")
+    (tmp_path / "notes.txt").write_text("nothing here\n")
+    (tmp_path / "build").mkdir()
+    (tmp_path / "build" / "out.py").write_text("def main():\n    pass\n")
+    (tmp_path / ".gitignore").write_text("build/\n")
+    return tmp_path
+
+
+def test_listing_skips_gitignored_paths(workspace):
+    paths = [e["path"] for e in search_tools.list_workspace()["entries"]]
+    assert paths == [".gitignore", "notes.txt", "src", "src/app.py", "src/util.py"]
+    ignored = [e["path"] for e in search_tools.list_workspace(include_ignored=True)["entries"]]
+    assert "build/out.py" in ignored
+
+
+def test_listing_pages_with_offset_and_limit(workspace):
+    first = search_tools.list_workspace(limit=2)
+    assert [e["path"] for e in first["entries"]] == [".gitignore", "notes.txt"]
+    assert first["next_offset"] == 2
+    second = search_tools.list_workspace(offset=first["next_offset"], limit=10)
+    assert [e["path"] for e in second["entries"]] == ["src", "src/app.py", "src/util.py"]
+    assert second["next_offset"] is None
+
+
+def test_listing_filters_by_pattern_and_depth(workspace):
+    assert [e["path"] for e in search_tools.list_workspace(pattern="*.py")["entries"]] == ["src/app.py", "src/util.py"]
+    assert [e["path"] for e in search_tools.list_workspace(max_depth=1)["entries"]] == [".gitignore", "notes.txt", "src"]
+
+
+def test_search_returns_line_numbered_matches(workspace):
+    result = search_tools.search_workspace("def main")
+    assert result["matches"] == [{"path": "src/app.py", "line": 3, "text": "def main():"}]
+    assert result["truncated"] is False
+
+
+def test_search_caps_results(workspace):
+    result = search_tools.search_workspace("def", max_results=1)
+    assert len(result["matches"]) == 1
+    assert result["truncated"] is True
+
+
+def test_search_reads_files_too_large_for_the_cache(workspace, monkeypatch):
+    monkeypatch.setattr(file_cache, "max_file_bytes", 1024)
+    monkeypatch.setattr(file_reader, "MMAP_THRESHOLD", 2048)
+    (workspace / "big.txt").write_text("filler line\n" * 1000 + "needle\n")
+    result = search_tools.search_workspace("needle", pattern="*.txt")
+    assert result["matches"] == [{"path": "big.txt", "line": 1001, "text": "needle"}]
+    assert result["files_searched"] == 2
+
+
+def test_search_skips_binary_and_oversized_files(workspace, monkeypatch):
+    (workspace / "blob.bin").write_bytes(b"needle\0\0\0")
+    (workspace / "huge.txt").write_text("needle\n" * 100)
+    monkeypatch.setattr(search_tools, "SEARCH_MAX_FILE_BYTES", 100)
+    result = search_tools.search_workspace("needle")
+    assert result["matches"] == []
+    # .gitignore, notes.txt, src/app.py and src/util.py; not the binary or the oversized file
+    assert result["files_searched"] == 4
@@ -0,0 +1,101 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from agents.session_manager import SessionManager
+from agents.session_store import SQLiteSessionStore
+from tools.workspace_events import workspace_events
+
+
+async def build_context(pending_message):
+    return [{"role": "system", "content": "You are a test agent."}]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "sessions.db")
+
+
+def test_workers_continue_each_others_threads(path):
+    async def main():
+        # Two workers: separate stores and session managers over one database file
+        store_a, store_b = SQLiteSessionStore(path), SQLiteSessionStore(path)
+        worker_a = SessionManager(build_context, name="Developer", store=store_a)
+        worker_b = SessionManager(build_context, name="Developer", store=store_b)
+        try:
+            session = await worker_a.get("t1")
+            session.messages.append({"role": "user", "content": "first"})
+            await worker_a.save(session)
+
+            other = await worker_b.get("t1")
+            seen_by_b = other.messages.history()
+            other.messages.append({"role": "user", "content": "second"})
+            await worker_b.save(other)
+
+            current = await worker_a.is_current(session)
+            reloaded = await worker_a.get("t1")
+            return session, seen_by_b, other, current, reloaded
+        finally:
+            await store_a.close()
+            await store_b.close()
+
+    session, seen_by_b, other, current, reloaded = asyncio.run(main())
+    assert seen_by_b == [{"role": "user", "content": "first"}]
+    assert (session.store_version, other.store_version) == (1, 2)
+    assert not current
+    assert reloaded is not session and reloaded.store_version == 2
+    assert [m["content"] for m in reloaded.messages.history()] == ["first", "second"]
+
+
+def test_reset_is_seen_by_other_workers(path):
+    async def main():
+        store_a, store_b = SQLiteSessionStore(path), SQLiteSessionStore(path)
+        worker_a = SessionManager(build_context, name="Developer", store=store_a)
+        worker_b = SessionManager(build_context, name="Developer", store=store_b)
+        try:
+            session = await worker_a.get("t1")
+            session.messages.append({"role": "user", "content": "first"})
+            await worker_a.save(session)
+            copy_b = await worker_b.get("t1")
+            await worker_a.reset("t1", "2026-10-17T09:00:00+00:00")
+            return copy_b, await worker_b.get("t1")
+        finally:
+            await store_a.close()
+            await store_b.close()
+
+    copy_b, reloaded = asyncio.run(main())
+    assert copy_b.messages.history() == [{"role": "user", "content": "first"}]
+    assert reloaded is not copy_b and reloaded.messages.history() == []
+    assert reloaded.summarized_through == "2026-10-17T09:00:00+00:00"
+
+
+def test_sync_replays_workspace_changes_from_other_workers(path, tmp_path):
+    seen = []
+    workspace_events.subscribe(seen.append)
+
+    async def main():
+        store = SQLiteSessionStore(path)
+        store.start()
+        try:
+            # This worker's own change is logged but not replayed to it
+            workspace_events.publish(str(tmp_path / "mine.py"))
+            await store.sync("Developer", "t1")
+            # Another worker logs a change
+            with sqlite3.connect(path) as conn:
+                conn.execute("INSERT INTO workspace_changes (origin, path) VALUES (?, ?)",
+                             ("other-worker", str(tmp_path / "theirs.py")))
+            version_before = workspace_events.version
+            await store.sync("Developer", "t1")
+            logged = await store._run(lambda: store.conn.execute(
+                "SELECT origin, path FROM workspace_changes ORDER BY seq").fetchall())
+            return version_before, logged
+        finally:
+            await store.close()
+            workspace_events.unsubscribe(seen.append)
+
+    version_before, logged = asyncio.run(main())
+    assert seen == [str(tmp_path / "mine.py"), str(tmp_path / "theirs.py")]
+    assert workspace_events.version == version_before + 1
+    # The replayed change is not logged again by this worker
+    assert [origin for origin, _ in logged][1:] == ["other-worker"]
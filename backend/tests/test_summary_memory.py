@@ -0,0 +1,47 @@
+import asyncio
+import threading
+
+import pytest
+
+from memory.embeddings import HashEmbedder
+from memory.summary_memory import SummaryMemory
+from memory.vector_index import VectorIndex
+
+
+@pytest.fixture
+def memory(tmp_path):
+    embedder = HashEmbedder(dimensions=64)
+    index = VectorIndex("summaries", embedder.model, embedder.dimensions, directory=str(tmp_path))
+    return SummaryMemory(embedder=embedder, index=index, min_score=0.1)
+
+
+def test_recall_ranks_by_similarity_within_the_agent(memory):
+    async def run():
+        refs = await memory.add_many([
+            ("s1", "dev", "refactored the session manager eviction"),
+            ("s2", "dev", "wrote a README for the frontend"),
+            ("s3", "critic", "reviewed the session manager eviction"),
+        ])
+        assert refs == ["memory_summaries:s1", "memory_summaries:s2", "memory_summaries:s3"]
+        return await memory.recall("dev", "session manager eviction", limit=1)
+
+    assert asyncio.run(run()) == ["refactored the session manager eviction"]
+
+
+def test_index_calls_run_off_the_event_loop(memory, monkeypatch):
+    threads = []
+    for name in ("add", "search", "count"):
+        original = getattr(VectorIndex, name)
+
+        def record(self, *args, _original=original, **kwargs):
+            threads.append(threading.current_thread())
+            return _original(self, *args, **kwargs)
+        monkeypatch.setattr(VectorIndex, name, record)
+
+    async def run():
+        await memory.add_many([("s1", "dev", "hello world")])
+        await memory.recall("dev", "hello")
+
+    asyncio.run(run())
+    assert len(threads) == 3
+    assert threading.main_thread() not in threads
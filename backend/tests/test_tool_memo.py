@@ -0,0 +1,66 @@
+import asyncio
+import json
+
+import pytest
+
+from tools.tool_box import ToolBox
+from tools.tool_memo import ToolMemo, workspace_version
+from tools.workspace_events import workspace_events
+from tools.workspace_index import workspace_index
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    monkeypatch.setenv("WORKSPACE_PATH", str(tmp_path))
+    (tmp_path / "app.py").write_text("print('v1')\n")
+    return tmp_path
+
+
+def read(path="app.py"):
+    return ("read_file", json.dumps({"path": path, "line_numbers": False}))
+
+
+def run_calls(memo, *calls):
+    return asyncio.run(ToolBox(["file"]).run_tool_calls(list(calls), memo=memo))
+
+
+def test_idempotent_results_are_reused_until_a_mutating_tool_runs(workspace):
+    memo = ToolMemo()
+    first, = run_calls(memo, read())
+    again, = run_calls(memo, read())
+    assert again is first and memo.hits == 1
+
+    write = ("write_file", json.dumps({"path": "app.py", "content": "print('v2')\n"}))
+    run_calls(memo, write)
+    assert memo.peek(ToolMemo.key_for_call(*read())) is None
+    after, = run_calls(memo, read())
+    assert "v2" in after
+
+
+def test_changes_outside_the_session_make_results_stale(workspace):
+    memo = ToolMemo()
+    run_calls(memo, read())
+
+    # Another session's write publishes an event; this memo is not cleared but goes stale
+    (workspace / "app.py").write_text("print('v3')\n")
+    workspace_events.publish(str(workspace / "app.py"))
+    result, = run_calls(memo, read())
+    assert "v3" in result and memo.misses == 2
+
+    # Edits found by the workspace index's scan count as changes too
+    workspace_index.generation += 1
+    key = ToolMemo.key_for_call(*read())
+    assert memo.peek(key).version != workspace_version()
+    assert memo.get(key) is None
+
+
+def test_errors_are_not_memoized_and_the_memo_is_bounded(workspace):
+    memo = ToolMemo(max_entries=2)
+    missing, = run_calls(memo, read("missing.py"))
+    assert "error" in missing and memo.peek(ToolMemo.key_for_call(*read("missing.py"))) is None
+
+    for name in ("a.py", "b.py", "c.py"):
+        (workspace / name).write_text(name)
+        run_calls(memo, read(name))
+    assert memo.peek(ToolMemo.key_for_call(*read("a.py"))) is None
+    assert memo.peek(ToolMemo.key_for_call(*read("c.py"))) is not None
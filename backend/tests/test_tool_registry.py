@@ -0,0 +1,41 @@
+import asyncio
+import copy
+import json
+
+import httpx
+import openai
+import pytest
+
+from tools.tool_registry import ToolPayload, registry, to_openai_tool
+
+
+def test_payload_is_read_only_and_shared():
+    first = registry.get_payload(["file"])
+    assert registry.get_payload(["file"]) is first
+    with pytest.raises(TypeError):
+        first.tools[0]["function"]["description"] = "changed"
+    with pytest.raises(TypeError):
+        first.schemas[0]["parameters"].pop("required")
+    assert isinstance(first.schemas[0]["parameters"]["required"], tuple)
+    assert copy.deepcopy(first.tools) == first.tools
+    assert first.hash == ToolPayload([registry._schemas[schema["name"]] for schema in first.schemas]).hash
+
+
+def test_sdk_sends_the_frozen_tools_unchanged():
+    payload = registry.get_payload(["file"])
+    sent = {}
+
+    def handler(request):
+        sent.update(json.loads(request.content))
+        return httpx.Response(200, json={
+            "id": "1", "object": "chat.completion", "created": 0, "model": "m",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "ok"}}]})
+
+    async def main():
+        http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        client = openai.AsyncOpenAI(api_key="test", http_client=http_client)
+        await client.chat.completions.create(model="m", messages=[{"role": "user", "content": "hi"}],
+                                             tools=payload.tools)
+
+    asyncio.run(main())
+    assert sent["tools"] == [to_openai_tool(registry._schemas[schema["name"]]) for schema in payload.schemas]
@@ -0,0 +1,114 @@
+import os
+import time
+
+import pytest
+
+import tools.workspace_index
+from tools.workspace_events import workspace_events
+from tools.workspace_index import WorkspaceIndex
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    root = tmp_path / "ws"
+    root.mkdir()
+    monkeypatch.setenv("WORKSPACE_PATH", str(root))
+    (root / "models.py").write_text("class SessionManager:\n    def evict(self):\n        pass\n")
+    (root / "README.md").write_text("The session manager evicts idle sessions.\n")
+    return root
+
+
+@pytest.fixture
+def make_index(tmp_path):
+    indexes = []
+
+    def make(**kwargs):
+        kwargs.setdefault("scan_interval", 3600)
+        index = WorkspaceIndex(index_path=str(tmp_path / "index.json"), **kwargs)
+        indexes.append(index)
+        return index
+
+    yield make
+    for index in indexes:
+        index.stop()
+
+
+def test_initial_scan_finds_symbols_and_tokens(workspace, make_index):
+    index = make_index()
+    [symbol] = index.find_symbol("evict")
+    assert (symbol["path"], symbol["kind"], symbol["line"], symbol["parent"]) == \
+        ("models.py", "method", 2, "SessionManager")
+    assert index.files_with_tokens("sessionmanager evict") == (["models.py"], 1)
+    assert [s["name"] for s in index.find_symbol("sess", prefix=True)] == ["SessionManager"]
+
+
+def test_published_change_updates_only_that_file(workspace, make_index):
+    index = make_index(save_delay=3600)
+    index.find_symbol("evict")
+    (workspace / "models.py").write_text("class SessionStore:\n    pass\n")
+    (workspace / "new.py").write_text("def evict_all():\n    pass\n")
+    workspace_events.publish(str(workspace / "models.py"))
+    workspace_events.publish(str(workspace / "new.py"))
+    assert index.find_symbol("SessionManager") == []
+    assert [s["path"] for s in index.find_symbol("SessionStore")] == ["models.py"]
+    assert [s["path"] for s in index.find_symbol("evict_all")] == ["new.py"]
+    # No full rescan was needed to see the edits
+    assert index.generation == 1
+
+    os.remove(workspace / "new.py")
+    workspace_events.publish(str(workspace / "new.py"))
+    assert index.find_symbol("evict_all") == []
+
+
+def test_saves_after_edits_are_debounced(workspace, make_index):
+    index = make_index(save_delay=0.3)
+    index.find_symbol("evict")
+    wait_until(lambda: index.saves == 1)
+    for i in range(5):
+        (workspace / f"m{i}.py").write_text(f"def f{i}():\n    pass\n")
+        workspace_events.publish(str(workspace / f"m{i}.py"))
+    wait_until(lambda: index.stats()["files"] == 7 and not index.stats()["unsaved"])
+    assert index.saves == 2
+
+
+def test_saved_index_is_reused_after_restart(workspace, make_index):
+    index = make_index()
+    index.find_symbol("evict")
+    index.stop()
+    reloaded = make_index()
+    reloaded.load()
+    assert reloaded.scan() == 0
+    (workspace / "README.md").write_text("changed outside the tools\n")
+    assert reloaded.scan() == 1
+    assert reloaded.files_with_tokens("outside") == (["README.md"], 1)
+
+
+def test_scan_keeps_files_created_while_it_walks(workspace, make_index, monkeypatch):
+    index = make_index()
+    index.find_symbol("evict")
+    (workspace / "old.py").write_text("def gone():\n    pass\n")
+    workspace_events.publish(str(workspace / "old.py"))
+    index.find_symbol("gone")
+    os.remove(workspace / "old.py")
+    walked = list(tools.workspace_index.walk_workspace())
+
+    def walk_workspace():
+        for item in walked:
+            yield item
+            if not (workspace / "new.py").exists():
+                # A tool writes a file in a directory the walk has already passed
+                (workspace / "new.py").write_text("def fresh():\n    pass\n")
+                workspace_events.publish(str(workspace / "new.py"))
+                index.find_symbol("fresh")
+
+    monkeypatch.setattr(tools.workspace_index, "walk_workspace", walk_workspace)
+    index.scan()
+    assert [s["path"] for s in index.find_symbol("fresh")] == ["new.py"]
+    assert index.find_symbol("gone") == []
@@ -0,0 +1,126 @@
+"""
+Records the files changed in the workspace while it is active and renders
+them as unified diffs, so reviewers are sent what changed rather than whole
+files.
+"""
+
+import difflib
+import os
+import threading
+from typing import Dict, Optional
+
+from tools.workspace_events import change_thread, workspace_events
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path, "rb") as f:
+            return f.read().decode("utf-8", errors="replace")
+    except FileNotFoundError:
+        return None
+
+
+def unified_diff(path: str, before: Optional[str], after: Optional[str], max_chars: int = 0) -> str:
+    """Unified diff of one file; a missing side is shown as /dev/null."""
+    lines = difflib.unified_diff(
+        (before or "").splitlines(keepends=True),
+        (after or "").splitlines(keepends=True),
+        fromfile=f"a/{path}" if before is not None else "/dev/null",
+        tofile=f"b/{path}" if after is not None else "/dev/null",
+    )
+    diff = "".join(line if line.endswith("\n") else line + "\n\\ No newline at end of file\n"
+                   for line in lines)
+    if max_chars and len(diff) > max_chars:
+        cut = diff.rfind("\n", 0, max_chars)
+        diff = diff[:cut + 1] + f"[diff truncated at {max_chars} characters; read the file for the rest]\n"
+    return diff
+
+
+class ChangeSet:
+    """
+    Files written through the workspace tools between start() and stop().
+
+    With a thread_id, only changes made by tool calls of that conversation
+    thread are recorded; otherwise every change in the process is.
+    """
+
+    def __init__(self, root: Optional[str] = None, thread_id: Optional[str] = None):
+        """
+        Args:
+            root: Directory paths are reported relative to (WORKSPACE_PATH)
+            thread_id: Record only changes made for this thread (workspace_events.change_thread)
+        """
+        self.root = os.path.abspath(root or os.getenv("WORKSPACE_PATH", "./workspace"))
+        self.thread_id = thread_id
+        self._lock = threading.Lock()
+        # Contents when first touched, and when last marked reviewed (None = did not exist)
+        self._original: Dict[str, Optional[str]] = {}
+        self._baseline: Dict[str, Optional[str]] = {}
+
+    def start(self):
+        workspace_events.subscribe_before(self._before_change)
+        workspace_events.subscribe(self._changed)
+
+    def stop(self):
+        workspace_events.unsubscribe_before(self._before_change)
+        workspace_events.unsubscribe(self._changed)
+
+    def __enter__(self) -> "ChangeSet":
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _ours(self) -> bool:
+        return self.thread_id is None or change_thread.get() == self.thread_id
+
+    def _before_change(self, path: str):
+        if not self._ours():
+            return
+        with self._lock:
+            if path in self._original:
+                return
+        before = _read(path)
+        with self._lock:
+            self._original.setdefault(path, before)
+            self._baseline.setdefault(path, before)
+
+    def _changed(self, path: str):
+        if not self._ours():
+            return
+        # Writers that do not announce changes beforehand have no known previous contents
+        with self._lock:
+            self._original.setdefault(path, None)
+            self._baseline.setdefault(path, None)
+
+    def _relative(self, path: str) -> str:
+        return os.path.relpath(path, self.root)
+
+    def diffs(self, since_review: bool = False, max_chars: int = 0) -> Dict[str, str]:
+        """
+        Unified diff per changed file (relative path -> diff), skipping files
+        whose contents ended up unchanged.
+
+        Args:
+            since_review: Diff against the contents at the last mark_reviewed()
+                instead of against the original contents
+            max_chars: Truncate each diff to about this many characters (0 = no limit)
+        """
+        with self._lock:
+            base = dict(self._baseline if since_review else self._original)
+        diffs = {}
+        for path, before in sorted(base.items()):
+            after = _read(path)
+            if after != before:
+                relative = self._relative(path)
+                diffs[relative] = unified_diff(relative, before, after, max_chars)
+        return diffs
+
+    def mark_reviewed(self):
+        """Make the current contents the baseline for diffs(since_review=True)."""
+        with self._lock:
+            paths = list(self._baseline)
+        current = {path: _read(path) for path in paths}
+        with self._lock:
+            self._baseline.update(current)
@@ -0,0 +1,129 @@
+"""
+Worker pools for running blocking tool functions off the event loop.
+IO-bound tools (file reads/writes) go to a thread pool; tools registered as
+CPU-bound go to a process pool. Each pool tracks queue depth and latency.
+"""
+
+import asyncio
+import contextvars
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+IO = "io"
+CPU = "cpu"
+
+
+def _timed_call(func: Callable, kwargs: Dict[str, Any]):
+    """Run func in a worker and report when it actually started."""
+    # Wall-clock time so it is comparable across processes.
+    return time.time(), func(**kwargs)
+
+
+class PoolStats:
+    """Queue-depth and latency counters for one worker pool."""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_run = 0.0
+        self.max_run = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        """Submitted calls still waiting for a free worker."""
+        return max(0, self.in_flight - self.workers)
+
+    def as_dict(self) -> Dict[str, Any]:
+        finished = self.completed + self.failed
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "max_in_flight": self.max_in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_wait_ms": round(self.total_wait / finished * 1000, 3) if finished else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+            "avg_run_ms": round(self.total_run / self.completed * 1000, 3) if self.completed else 0.0,
+            "max_run_ms": round(self.max_run * 1000, 3),
+        }
+
+
+class ToolExecutor:
+    """Dispatches synchronous tool functions to a thread or process pool."""
+
+    def __init__(self, io_workers: Optional[int] = None, cpu_workers: Optional[int] = None):
+        """
+        Initialize the executor. Pools are created on first use.
+
+        Args:
+            io_workers: Threads for IO-bound tools (TOOL_IO_WORKERS, default 16)
+            cpu_workers: Processes for CPU-bound tools (TOOL_CPU_WORKERS, default CPU count)
+        """
+        self.workers = {
+            IO: io_workers or int(os.getenv("TOOL_IO_WORKERS", 16)),
+            CPU: cpu_workers or int(os.getenv("TOOL_CPU_WORKERS", os.cpu_count() or 2)),
+        }
+        self._pools: Dict[str, Executor] = {}
+        self._stats = {kind: PoolStats(workers) for kind, workers in self.workers.items()}
+
+    def _pool(self, kind: str) -> Executor:
+        if kind not in self._pools:
+            if kind == CPU:
+                self._pools[kind] = ProcessPoolExecutor(max_workers=self.workers[CPU])
+            else:
+                self._pools[kind] = ThreadPoolExecutor(max_workers=self.workers[IO], thread_name_prefix="tool")
+        return self._pools[kind]
+
+    async def run(self, func: Callable, kwargs: Dict[str, Any], kind: str = IO) -> Any:
+        """Run a blocking tool function in the pool for its kind."""
+        kind = CPU if kind == CPU else IO
+        stats = self._stats[kind]
+        loop = asyncio.get_running_loop()
+        submitted = time.time()
+        stats.in_flight += 1
+        stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+        started = None
+        try:
+            if kind == CPU:
+                started, result = await loop.run_in_executor(self._pool(kind), _timed_call, func, kwargs)
+            else:
+                # Threads run the tool in the caller's context (e.g. workspace_events.change_thread)
+                context = contextvars.copy_context()
+                started, result = await loop.run_in_executor(self._pool(kind), context.run,
+                                                             _timed_call, func, kwargs)
+            stats.completed += 1
+            return result
+        except Exception:
+            stats.failed += 1
+            raise
+        finally:
+            stats.in_flight -= 1
+            finished = time.time()
+            wait = (started or finished) - submitted
+            stats.total_wait += wait
+            stats.max_wait = max(stats.max_wait, wait)
+            if started is not None:
+                run = finished - started
+                stats.total_run += run
+                stats.max_run = max(stats.max_run, run)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-pool queue depth and latency metrics."""
+        return {kind: stats.as_dict() for kind, stats in self._stats.items()}
+
+    def shutdown(self):
+        for pool in self._pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        self._pools.clear()
+
+
+# Global instance
+tool_executor = ToolExecutor()
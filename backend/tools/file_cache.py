@@ -0,0 +1,161 @@
+"""
+Process-wide cache of workspace file contents.
+Entries are keyed by absolute path and validated against the file's inode,
+mtime and size on every lookup, so edits made outside the tools are picked
+up. Derived data (line index, decoded text, hash) is computed once per version.
+"""
+
+import hashlib
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+def file_version(st: os.stat_result) -> tuple:
+    """Identity of a file's current contents: (inode, mtime, size)."""
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def build_line_index(data) -> array:
+    """Byte offset where each line starts (data is bytes or an mmap)."""
+    offsets = array("Q", [0])
+    find = data.find
+    pos = find(b"\n")
+    while pos != -1:
+        offsets.append(pos + 1)
+        pos = find(b"\n", pos + 1)
+    return offsets
+
+
+class CachedFile:
+    """Contents of one file version plus lazily derived data."""
+
+    __slots__ = ("path", "version", "data", "_offsets", "_text", "_sha256")
+
+    def __init__(self, path: str, version: tuple, data: bytes):
+        self.path = path
+        self.version = version
+        self.data = data
+        self._offsets: Optional[array] = None
+        self._text: Optional[str] = None
+        self._sha256: Optional[str] = None
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+    @property
+    def line_offsets(self) -> array:
+        if self._offsets is None:
+            self._offsets = build_line_index(self.data)
+        return self._offsets
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = self.data.decode("utf-8", errors="replace")
+        return self._text
+
+    @property
+    def sha256(self) -> str:
+        if self._sha256 is None:
+            self._sha256 = hashlib.sha256(self.data).hexdigest()
+        return self._sha256
+
+
+class FileCache:
+    """Size-bounded LRU of CachedFile entries."""
+
+    def __init__(self, max_bytes: Optional[int] = None, max_file_bytes: Optional[int] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_bytes: Total cached bytes before LRU eviction (FILE_CACHE_MAX_BYTES)
+            max_file_bytes: Larger files are never cached (FILE_CACHE_MAX_FILE_BYTES)
+        """
+        self.max_bytes = max_bytes or int(os.getenv("FILE_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+        self.max_file_bytes = max_file_bytes or int(os.getenv("FILE_CACHE_MAX_FILE_BYTES", 1024 * 1024))
+        self._entries: "OrderedDict[str, CachedFile]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, path: str) -> Optional[CachedFile]:
+        """
+        Return the current contents of a file, reading it on a miss.
+
+        Returns None when the file is too large to cache; callers should
+        read it directly (e.g. memory-mapped) instead.
+        """
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        version = file_version(st)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        if st.st_size > self.max_file_bytes:
+            return None
+        with open(path, "rb") as f:
+            data = f.read()
+            # Re-stat the open file so the version matches what was read.
+            version = file_version(os.fstat(f.fileno()))
+        return self._store(CachedFile(path, version, data))
+
+    def put(self, path: str, data: bytes) -> Optional[CachedFile]:
+        """Write-through: record contents just written to path."""
+        path = os.path.abspath(path)
+        if len(data) > self.max_file_bytes:
+            self.invalidate(path)
+            return None
+        return self._store(CachedFile(path, file_version(os.stat(path)), data))
+
+    def invalidate(self, path: str):
+        path = os.path.abspath(path)
+        with self._lock:
+            entry = self._entries.pop(path, None)
+            if entry is not None:
+                self.total_bytes -= entry.size
+
+    def _store(self, entry: CachedFile) -> CachedFile:
+        with self._lock:
+            old = self._entries.pop(entry.path, None)
+            if old is not None:
+                self.total_bytes -= old.size
+            self._entries[entry.path] = entry
+            self.total_bytes += entry.size
+            while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self.total_bytes -= evicted.size
+                self.evictions += 1
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Global instance
+file_cache = FileCache()
@@ -0,0 +1,123 @@
+"""
+Ranged file reading for the file tools.
+Small files come from the shared file cache; large files are memory-mapped
+instead of read whole. A newline-offset index (cached per file version)
+lets a read jump straight to any line.
+"""
+
+import mmap
+import os
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Optional, Tuple, Union
+
+from tools.file_cache import CachedFile, build_line_index, file_cache, file_version
+
+# Files at least this large are memory-mapped rather than read into memory.
+MMAP_THRESHOLD = int(os.getenv("READ_FILE_MMAP_THRESHOLD", 1024 * 1024))
+# Number of line indexes kept in memory.
+LINE_INDEX_CACHE_SIZE = int(os.getenv("LINE_INDEX_CACHE_SIZE", 256))
+
+_index_cache: "OrderedDict[tuple, array]" = OrderedDict()
+_index_lock = threading.Lock()
+
+
+def _cached_line_index(path: str, version: tuple, data: Union[bytes, mmap.mmap]) -> array:
+    key = (path, version)
+    with _index_lock:
+        offsets = _index_cache.get(key)
+        if offsets is not None:
+            _index_cache.move_to_end(key)
+            return offsets
+    offsets = build_line_index(data)
+    with _index_lock:
+        _index_cache[key] = offsets
+        while len(_index_cache) > LINE_INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return offsets
+
+
+class FileReader:
+    """Reads line or byte ranges from a file, mmap-backed when it is large."""
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        self._file = None
+        self._offsets: Optional[array] = None
+        self._entry: Optional[CachedFile] = file_cache.get(self.path)
+        if self._entry is not None:
+            self.data: Union[bytes, mmap.mmap] = self._entry.data
+            self.size = self._entry.size
+            self.version = self._entry.version
+            return
+        # Too large for the cache: read directly, memory-mapped if large enough.
+        self._file = open(self.path, "rb")
+        st = os.fstat(self._file.fileno())
+        self.size = st.st_size
+        self.version = file_version(st)
+        if self.size >= MMAP_THRESHOLD:
+            self.data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.data = self._file.read()
+
+    def __enter__(self) -> "FileReader":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        if self._file is not None:
+            self._file.close()
+
+    @property
+    def offsets(self) -> array:
+        if self._offsets is None:
+            if self._entry is not None:
+                self._offsets = self._entry.line_offsets
+            else:
+                self._offsets = _cached_line_index(self.path, self.version, self.data)
+        return self._offsets
+
+    @property
+    def line_count(self) -> int:
+        if self.size == 0:
+            return 0
+        # A trailing newline starts an empty "line" that we don't count.
+        return len(self.offsets) - (1 if self.offsets[-1] == self.size else 0)
+
+    def _decode(self, start: int, end: int) -> str:
+        if self._entry is not None and start == 0 and end == self.size:
+            return self._entry.text
+        return self.data[start:end].decode("utf-8", errors="replace")
+
+    def lines(self, start: int, end: int) -> Tuple[int, str]:
+        """Text of lines start..end (1-based, inclusive) and the first line number."""
+        count = self.line_count
+        start = max(1, start)
+        end = min(count, end)
+        if start > end:
+            return start, ""
+        end_byte = self.offsets[end] if end < len(self.offsets) else self.size
+        return start, self._decode(self.offsets[start - 1], end_byte)
+
+    def byte_range(self, start: int, end: int) -> Tuple[int, str]:
+        """Text of bytes start..end (end exclusive) and the line number it starts on."""
+        start = max(0, start)
+        end = min(self.size, end)
+        if start >= end:
+            return 1, ""
+        return bisect_right(self.offsets, start), self._decode(start, end)
+
+
+def number_lines(text: str, first_line: int) -> str:
+    """Prefix each line with its line number, e.g. "  12| code"."""
+    lines = text.splitlines()
+    if not lines:
+        return ""
+    width = len(str(first_line + len(lines) - 1))
+    return "\n".join(f"{n:>{width}}| {line}" for n, line in enumerate(lines, first_line))
@@ -1,31 +1,80 @@
 import os
+from typing import Optional
+
+from tools.file_cache import file_cache
+from tools.file_reader import FileReader, number_lines
+from tools.workspace_events import workspace_events
 
 """
 File manipulation tools for agents.
 Provides safe file operations within the workspace.
 """
 
-def read_file(path: str) -> str:
-    """Read the contents of a file."""
-    path = f"./workspace/{path}"
-    with open(path, "r") as f:
-        return f.read()
+# Largest amount of text a single read_file call returns.
+READ_FILE_MAX_BYTES = int(os.getenv("READ_FILE_MAX_BYTES", 100_000))
+
+
+def _workspace_path(path: str) -> str:
+    return os.path.join(os.getenv("WORKSPACE_PATH", "./workspace"), path)
+
+
+def read_file(path: str, start_line: Optional[int] = None, end_line: Optional[int] = None,
+              head: Optional[int] = None, tail: Optional[int] = None,
+              start_byte: Optional[int] = None, end_byte: Optional[int] = None,
+              line_numbers: bool = True) -> str:
+    """Read a file, or part of it. Lines are prefixed with their line number ("12| ...").
+    Use start_line/end_line (1-based, inclusive), head/tail (first/last N lines) or
+    start_byte/end_byte to read part of a large file. Large results are cut short with a note.
+    Pass line_numbers=false for the raw text, e.g. before rewriting the file."""
+    with FileReader(_workspace_path(path)) as reader:
+        if start_byte is not None or end_byte is not None:
+            start_b = start_byte or 0
+            end_b = reader.size if end_byte is None else min(end_byte, reader.size)
+            first_line, text = reader.byte_range(start_b, end_b)
+            selection = f"bytes {start_b}-{end_b}"
+        else:
+            total = reader.line_count
+            if head is not None:
+                start, end = 1, head
+            elif tail is not None:
+                start, end = total - tail + 1, total
+            else:
+                start, end = start_line or 1, end_line or total
+            first_line, text = reader.lines(start, end)
+            selection = f"lines {first_line}-{min(end, total)} of {total}"
+        truncated = len(text) > READ_FILE_MAX_BYTES
+        if truncated:
+            # Cut at a line boundary so line numbers stay accurate.
+            cut = text.rfind("\n", 0, READ_FILE_MAX_BYTES)
+            text = text[:cut + 1 if cut != -1 else READ_FILE_MAX_BYTES]
+        result = number_lines(text, first_line) if line_numbers else text
+        if truncated:
+            shown = text.count("\n")
+            result += (f"\n[truncated: showed {shown} lines from {selection} ({reader.size} bytes in file); "
+                       f"use start_line/end_line to read further]")
+        return result
 
 def write_file(path: str, content: str) -> str:
     """Write content to a file. The path is appended to the path of the workspace."""
-    path = f"./workspace/{path}"
-    with open(path, "w") as f:
-        f.write(content)
+    path = _workspace_path(path)
+    data = content.encode("utf-8")
+    workspace_events.before_change(path)
+    with open(path, "wb") as f:
+        f.write(data)
+    # Write through so the next read of this file is served from memory
+    file_cache.put(path, data)
+    workspace_events.publish(path)
     return "File written successfully."
 
 def make_directory(path: str) -> str:
     """Create a directory at the given path."""
-    full_path = f"./workspace/{path}"
+    full_path = _workspace_path(path)
     os.makedirs(full_path, exist_ok=True)
+    workspace_events.publish(full_path)
     return "Directory created successfully."
 
 def list_directory(path: str) -> list[str]:
     """List files and directories in the given path."""
-    full_path = f"./workspace/{path}"
+    full_path = _workspace_path(path)
     return os.listdir(full_path)
 
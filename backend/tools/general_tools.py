@@ -1,5 +1,3 @@
 def sayHello() -> str:
     """Say hello the proper way."""
     return "Hello, world!"
-
-# a tool to get line numbers so critic and agent can communicate better?
\ No newline at end of file
@@ -0,0 +1,26 @@
+"""
+Retrieval tools backed by the RAG ingestion pipeline.
+"""
+
+from typing import Any, Dict
+
+from memory.rag_pipeline import rag_pipeline
+
+
+async def search_documents(query: str, limit: int = 5) -> Dict[str, Any]:
+    """Semantic search over the workspace: returns the code/text chunks most relevant to query
+    (a description of what you are looking for), with file paths and line ranges.
+    Use it when you don't know the names to look for; the index is refreshed before searching."""
+    await rag_pipeline.refresh()
+    hits = await rag_pipeline.search(query, limit=limit)
+    return {"results": [
+        {
+            "path": record["path"],
+            "start_line": record["start_line"],
+            "end_line": record["end_line"],
+            "symbol": record["symbol"],
+            "score": round(score, 4),
+            "text": record["text"],
+        }
+        for score, record in hits
+    ]}
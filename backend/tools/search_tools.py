@@ -0,0 +1,210 @@
+"""
+Workspace discovery tools: recursive listing and content search.
+Both walk the tree with os.scandir, honour .gitignore files, and return
+paths relative to the workspace so results can be passed to read_file.
+"""
+
+import fnmatch
+import os
+import re
+import threading
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from tools.file_reader import FileReader
+from tools.file_tools import _workspace_path
+
+# Never listed or searched, whatever .gitignore says.
+ALWAYS_IGNORED = {".git"}
+SEARCH_MAX_FILE_BYTES = int(os.getenv("SEARCH_MAX_FILE_BYTES", 2 * 1024 * 1024))
+SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", 8))
+
+_search_pool: Optional[ThreadPoolExecutor] = None
+_search_pool_lock = threading.Lock()
+
+
+def _get_search_pool() -> ThreadPoolExecutor:
+    # Tools run on several worker threads; create the pool only once.
+    global _search_pool
+    with _search_pool_lock:
+        if _search_pool is None:
+            _search_pool = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="search")
+        return _search_pool
+
+
+class _IgnoreRule:
+    """One .gitignore pattern, relative to the directory of its file."""
+
+    def __init__(self, base: str, pattern: str):
+        self.negate = pattern.startswith("!")
+        if self.negate:
+            pattern = pattern[1:]
+        self.dir_only = pattern.endswith("/")
+        pattern = pattern.strip("/") if self.dir_only else pattern
+        # Patterns with a slash (other than a trailing one) are anchored to base.
+        self.anchored = "/" in pattern
+        self.pattern = pattern.lstrip("/").replace("**/", "*")
+        self.base = base
+
+    def matches(self, rel_path: str, name: str, is_dir: bool) -> bool:
+        if self.dir_only and not is_dir:
+            return False
+        if self.anchored:
+            if self.base:
+                if not rel_path.startswith(self.base + "/"):
+                    return False
+                rel_path = rel_path[len(self.base) + 1:]
+            return fnmatch.fnmatchcase(rel_path, self.pattern)
+        return fnmatch.fnmatchcase(name, self.pattern)
+
+
+def _read_gitignore(directory: str, rel_dir: str) -> List[_IgnoreRule]:
+    try:
+        with open(os.path.join(directory, ".gitignore"), "r", encoding="utf-8", errors="replace") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return []
+    return [_IgnoreRule(rel_dir, line.strip()) for line in lines
+            if line.strip() and not line.lstrip().startswith("#")]
+
+
+def _is_ignored(rules: List[_IgnoreRule], rel_path: str, name: str, is_dir: bool) -> bool:
+    ignored = False
+    # Later rules win, so a "!" rule can re-include a path.
+    for rule in rules:
+        if rule.matches(rel_path, name, is_dir):
+            ignored = not rule.negate
+    return ignored
+
+
+def walk_workspace(path: str = "", max_depth: Optional[int] = None,
+                   include_ignored: bool = False) -> Iterator[Tuple[str, os.DirEntry]]:
+    """Yield (relative path, DirEntry) depth-first in sorted order."""
+    root = os.path.normpath(_workspace_path(""))
+    start = os.path.normpath(_workspace_path(path))
+    start_rel = os.path.relpath(start, root).replace(os.sep, "/")
+    start_rel = "" if start_rel == "." else start_rel
+
+    rules: List[_IgnoreRule] = []
+    if not include_ignored:
+        # Pick up .gitignore files from the workspace root down to the start directory.
+        parts = start_rel.split("/") if start_rel else []
+        for i in range(len(parts) + 1):
+            rel_dir = "/".join(parts[:i])
+            rules = rules + _read_gitignore(os.path.join(root, *parts[:i]), rel_dir)
+
+    stack: List[Tuple[str, str, int, List[_IgnoreRule]]] = [(start, start_rel, 0, rules)]
+    while stack:
+        directory, rel_dir, depth, dir_rules = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+        subdirs = []
+        for entry in entries:
+            if entry.name in ALWAYS_IGNORED:
+                continue
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if not include_ignored and _is_ignored(dir_rules, rel_path, entry.name, is_dir):
+                continue
+            yield rel_path, entry
+            if is_dir and (max_depth is None or depth + 1 < max_depth):
+                subdirs.append((entry.path, rel_path))
+        for sub_path, sub_rel in reversed(subdirs):
+            sub_rules = dir_rules if include_ignored else dir_rules + _read_gitignore(sub_path, sub_rel)
+            stack.append((sub_path, sub_rel, depth + 1, sub_rules))
+
+
+def list_workspace(path: str = "", pattern: Optional[str] = None, max_depth: Optional[int] = None,
+                   include_ignored: bool = False, offset: int = 0, limit: int = 200) -> Dict[str, Any]:
+    """Recursively list files and directories under a workspace path, skipping .gitignore'd paths.
+    pattern filters by glob on the relative path (e.g. "*.py", "src/*"); max_depth=1 lists one level.
+    Results are paginated: pass the returned next_offset as offset to get the next page."""
+    entries = []
+    next_offset = None
+    index = 0
+    for rel_path, entry in walk_workspace(path, max_depth, include_ignored):
+        if pattern and not (fnmatch.fnmatch(rel_path, pattern) or fnmatch.fnmatch(entry.name, pattern)):
+            continue
+        if index >= offset + limit:
+            next_offset = index
+            break
+        if index >= offset:
+            st = entry.stat(follow_symlinks=False)
+            entries.append({
+                "path": rel_path,
+                "type": "dir" if entry.is_dir(follow_symlinks=False) else "file",
+                "size": st.st_size,
+                "mtime": int(st.st_mtime),
+            })
+        index += 1
+    return {"entries": entries, "offset": offset, "next_offset": next_offset}
+
+
+def _search_file(full_path: str, rel_path: str, regex: "re.Pattern[bytes]",
+                 max_matches: int) -> Optional[List[Dict[str, Any]]]:
+    """Matches in one file, or None if it could not be searched (unreadable or binary)."""
+    try:
+        # Cached when small enough, otherwise read directly (memory-mapped when large)
+        reader = FileReader(full_path)
+    except (OSError, ValueError):
+        return None
+    with reader:
+        data = reader.data
+        if b"\0" in data[:8192]:
+            return None
+        matches = []
+        last_line = 0
+        for match in regex.finditer(data):
+            offsets = reader.offsets
+            line = bisect_right(offsets, match.start())
+            if line == last_line:
+                continue  # one result per line
+            last_line = line
+            end = offsets[line] if line < len(offsets) else reader.size
+            text = data[offsets[line - 1]:end].decode("utf-8", errors="replace").rstrip("\r\n")
+            matches.append({"path": rel_path, "line": line, "text": text[:300]})
+            if len(matches) >= max_matches:
+                break
+    return matches
+
+
+def search_workspace(query: str, regex: bool = False, pattern: Optional[str] = None,
+                     case_sensitive: bool = False, path: str = "", max_results: int = 100) -> Dict[str, Any]:
+    """Search file contents in the workspace for a literal string (or a regex when regex=true).
+    Returns line-numbered matches, capped at max_results; pattern limits files by glob (e.g. "*.py")."""
+    flags = re.MULTILINE if case_sensitive else re.MULTILINE | re.IGNORECASE
+    compiled = re.compile(query.encode("utf-8") if regex else re.escape(query.encode("utf-8")), flags)
+
+    files = []
+    for rel_path, entry in walk_workspace(path):
+        if pattern and not (fnmatch.fnmatch(rel_path, pattern) or fnmatch.fnmatch(entry.name, pattern)):
+            continue
+        if entry.is_file(follow_symlinks=False) and entry.stat().st_size <= SEARCH_MAX_FILE_BYTES:
+            files.append((entry.path, rel_path))
+
+    pool = _get_search_pool()
+    futures = [pool.submit(_search_file, full, rel, compiled, max_results) for full, rel in files]
+
+    matches: List[Dict[str, Any]] = []
+    files_searched = 0
+    truncated = False
+    # Collect in file order so results are stable between calls.
+    for future in futures:
+        if len(matches) >= max_results:
+            truncated = True
+            if future.cancel():
+                continue
+        result = future.result()
+        if result is None:
+            continue
+        files_searched += 1
+        if len(matches) < max_results:
+            matches.extend(result)
+    if len(matches) > max_results:
+        truncated = True
+        matches = matches[:max_results]
+    return {"matches": matches, "files_searched": files_searched, "truncated": truncated}
@@ -1,16 +1,37 @@
+import asyncio
 import inspect
+import json
+import os
+import time
+from typing import Optional
 
 # from tools.tool_registry import tool_registry
 from tools.tool_registry import registry
+from tools.executor import tool_executor
+from tools.tool_memo import ToolMemo, workspace_version
+from telemetry.metrics import tool_call_seconds
+from telemetry.tracing import span
 
 
 class ToolBox:
     """Scoped tool access per agent."""
     def __init__(self, categories: list[str]):
         self.categories = categories
-        self.tools = {}
-        for cat in categories:
-            self.tools.update(registry.get_tools_by_category(cat))
+        self._tools = {}
+        self._version = -1
+        # Limits for tool calls issued in a single assistant turn
+        self.max_concurrency = int(os.getenv("TOOL_MAX_CONCURRENCY", 8))
+        self.timeout = float(os.getenv("TOOL_TIMEOUT_SECONDS", 30))
+
+    @property
+    def tools(self):
+        # Rebuilt only when a tool has been registered since the last lookup
+        if self._version != registry.version:
+            self._tools = {}
+            for cat in self.categories:
+                self._tools.update(registry.get_tools_by_category(cat))
+            self._version = registry.version
+        return self._tools
 
     def get_tool(self, name: str):
         return self.tools[name] if name in self.tools else None
@@ -19,19 +40,92 @@ class ToolBox:
         return list(self.tools.keys())
 
     def get_openai_schemas(self):
-        schemas = []
-        for cat in self.categories:
-            schemas.extend(registry.get_schemas_by_category(cat))
-        return schemas
+        return registry.get_payload(self.categories).schemas
+
+    def get_openai_tools(self):
+        """Schemas in the chat completions `tools` format (supports parallel calls)."""
+        return registry.get_payload(self.categories).tools
+
+    def get_schema_hash(self) -> str:
+        """Stable hash of this toolbox's tool schemas."""
+        return registry.get_payload(self.categories).hash
+
+    def get_timeout(self, name: str) -> float:
+        if name in self.tools:
+            return registry.get_metadata(name)["timeout"] or self.timeout
+        return self.timeout
 
     async def run_tool(self, name: str, **kwargs):
         tool = self.get_tool(name)
         if not tool:
             return {"error": f"Unknown tool: {name}"}
+        with span("tool.run", tool_call_seconds, tool=name) as s:
+            result = await self._call(name, tool, kwargs)
+            if isinstance(result, dict) and "error" in result:
+                s.status = "error"
+            return result
+
+    async def _call(self, name: str, tool, kwargs: dict):
         try:
-            result = tool(**kwargs)
+            if inspect.iscoroutinefunction(tool):
+                return await tool(**kwargs)
+            # Blocking tools run in a worker pool so they don't stall the event loop
+            result = await tool_executor.run(tool, kwargs, kind=registry.get_metadata(name)["kind"])
             if inspect.iscoroutine(result):
                 result = await result
             return result
         except Exception as e:
             return {"error": str(e)}
+
+    async def run_tool_calls(self, calls: list[tuple[str, str]], on_done=None,
+                             memo: Optional[ToolMemo] = None) -> list:
+        """
+        Run the tool calls of one assistant turn concurrently.
+
+        Args:
+            calls: (tool name, JSON-encoded arguments) pairs
+            on_done: Optional on_done(name, arguments, seconds, result) called as each call finishes
+            memo: Session memo; idempotent tools are served from it and
+                mutating tools clear it
+
+        Returns:
+            One result per call, in the same order (memoized results are the
+            memo's own objects)
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def call(name: str, arguments: str):
+            try:
+                args = json.loads(arguments or "{}")
+            except Exception:
+                return {"error": f"Could not parse arguments for {name}: {arguments}"}
+            metadata = registry.get_metadata(name) if memo is not None and name in self.tools else None
+            key = None
+            if metadata is not None and metadata["mutating"]:
+                memo.clear()
+            elif metadata is not None and metadata["idempotent"]:
+                key = memo.key(name, args)
+                entry = memo.get(key)
+                if entry is not None:
+                    return entry.result
+                version = workspace_version()
+            async with semaphore:
+                timeout = self.get_timeout(name)
+                try:
+                    result = await asyncio.wait_for(self.run_tool(name, **args), timeout)
+                except asyncio.TimeoutError:
+                    return {"error": f"Tool {name} timed out after {timeout}s"}
+            if key is not None and not (isinstance(result, dict) and "error" in result):
+                memo.put(key, version, result)
+            elif metadata is not None and metadata["mutating"]:
+                memo.clear()
+            return result
+
+        async def run_one(name: str, arguments: str):
+            started = time.perf_counter()
+            result = await call(name, arguments)
+            if on_done is not None:
+                on_done(name, arguments, time.perf_counter() - started, result)
+            return result
+
+        return await asyncio.gather(*(run_one(name, arguments) for name, arguments in calls))
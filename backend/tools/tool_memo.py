@@ -0,0 +1,92 @@
+"""
+Per-session memo of idempotent tool results.
+A result is reused for the same tool and arguments as long as the workspace
+has not changed since it was produced; running a mutating tool clears the memo.
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from tools.workspace_events import workspace_events
+from tools.workspace_index import workspace_index
+
+MemoKey = Tuple[str, str]
+
+
+def workspace_version() -> Tuple[int, int]:
+    """Changes made through the tools, and changes found by the index's scans."""
+    return (workspace_events.version, workspace_index.generation)
+
+
+class MemoEntry:
+    __slots__ = ("version", "result", "call_id")
+
+    def __init__(self, version: Tuple[int, int], result: Any):
+        self.version = version
+        self.result = result
+        # Tool call whose message holds this result in the conversation
+        self.call_id: Optional[str] = None
+
+
+class ToolMemo:
+    """Memoized results for one session, LRU-bounded."""
+
+    def __init__(self, max_entries: Optional[int] = None):
+        """
+        Args:
+            max_entries: Results kept (TOOL_MEMO_MAX_ENTRIES, default 64)
+        """
+        self.max_entries = max_entries or int(os.getenv("TOOL_MEMO_MAX_ENTRIES", 64))
+        self._entries: "OrderedDict[MemoKey, MemoEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(name: str, args: Dict[str, Any]) -> MemoKey:
+        return (name, json.dumps(args, sort_keys=True, default=str))
+
+    @classmethod
+    def key_for_call(cls, name: str, arguments: str) -> Optional[MemoKey]:
+        """Key for a raw tool call (JSON-encoded arguments), or None if they do not parse."""
+        try:
+            args = json.loads(arguments or "{}")
+        except ValueError:
+            return None
+        return cls.key(name, args) if isinstance(args, dict) else None
+
+    def get(self, key: MemoKey) -> Optional[MemoEntry]:
+        """The entry for key if it is still current."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != workspace_version():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def peek(self, key: MemoKey) -> Optional[MemoEntry]:
+        with self._lock:
+            return self._entries.get(key)
+
+    def put(self, key: MemoKey, version: Tuple[int, int], result: Any):
+        """
+        Store a result.
+
+        Args:
+            version: workspace_version() from before the tool ran, so a change
+                made while it ran makes the entry stale
+        """
+        with self._lock:
+            self._entries[key] = MemoEntry(version, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -1,9 +1,13 @@
+import hashlib
 import inspect
-from pathlib import Path
+import json
 from types import UnionType
-from typing import Any, Callable, Dict, List, get_type_hints, Literal, get_origin, get_args, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, get_type_hints, Literal, get_origin, get_args, Union
 import tools.file_tools
 import tools.general_tools
+import tools.rag_tools
+import tools.search_tools
+import tools.workspace_index
 
 # from openai.types.responses import FunctionToolParam
 
@@ -67,13 +71,15 @@ def generate_function_schema(func: Callable[..., Any]) -> dict[str, Any]:
 
         schema_entry = _get_strict_json_schema_type(ann)
 
-        required.append(name)
+        # Parameters with a default value are optional for the model
+        if param.default is inspect._empty:
+            required.append(name)
         params[name] = schema_entry
 
     return {
         "type": "function",
         "name": func.__name__,
-        "description": func.__doc__ or "",
+        "description": inspect.getdoc(func) or "",
         "parameters": {
             "type": "object",
             "properties": params,
@@ -83,6 +89,62 @@ def generate_function_schema(func: Callable[..., Any]) -> dict[str, Any]:
         # "strict": True
     }
 
+def to_openai_tool(schema: dict) -> dict:
+    """Wrap a function schema in the chat completions `tools` format."""
+    return {
+        "type": "function",
+        "function": {
+            "name": schema["name"],
+            "description": schema["description"],
+            "parameters": schema["parameters"],
+        },
+    }
+
+
+class FrozenDict(dict):
+    """A dict that refuses changes. Still a dict, so json and the OpenAI SDK take it as is."""
+    __slots__ = ()
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("Tool schemas are shared between requests and read-only")
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _read_only
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return FrozenDict, (dict(self),)
+
+
+def freeze(value: Any) -> Any:
+    """Read-only copy of a JSON-like value: dicts become FrozenDicts and lists tuples."""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class ToolPayload:
+    """Precomputed tool schemas for a set of categories.
+
+    Built once per registry version and shared by every request, so the
+    schemas and tools are frozen: a caller that edits them gets a TypeError
+    instead of changing what every other request sends.
+    """
+    __slots__ = ("schemas", "tools", "hash")
+
+    def __init__(self, schemas: List[dict]):
+        self.schemas = freeze(schemas)
+        self.tools = freeze([to_openai_tool(schema) for schema in schemas])
+        serialized = json.dumps(self.tools, separators=(",", ":"), sort_keys=True)
+        self.hash = hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
 # === Tool Registry ===
 class ToolRegistry:
     """Global registry for all tools with schema and category metadata."""
@@ -90,29 +152,67 @@ class ToolRegistry:
         self._tools: Dict[str, Callable] = {}
         self._schemas: Dict[str, dict] = {}
         self._metadata: Dict[str, Dict[str, Any]] = {}
-
-    def register(self, name: str, func: Callable, categories: List[str]):
-        """Register a callable as a tool with schema and metadata."""
+        # category -> {tool name -> func}, kept in registration order
+        self._categories: Dict[str, Dict[str, Callable]] = {}
+        # Bumped on every register; cached payloads from older versions are stale
+        self.version = 0
+        self._payloads: Dict[tuple, ToolPayload] = {}
+
+    def register(self, name: str, func: Callable, categories: List[str],
+                 kind: str = "io", timeout: Optional[float] = None,
+                 idempotent: bool = False, mutating: bool = False):
+        """
+        Register a callable as a tool with schema and metadata.
+
+        Args:
+            name: Tool name exposed to the model
+            func: Tool function (sync or async)
+            categories: Categories used to scope tools per agent
+            kind: "io" for blocking IO (thread pool) or "cpu" for CPU-heavy work (process pool)
+            timeout: Per-call timeout in seconds; ToolBox default when None
+            idempotent: Same arguments give the same result while the workspace is
+                unchanged, so results can be memoized per session
+            mutating: Changes the workspace; clears memoized results when run
+        """
+        if idempotent and mutating:
+            raise ValueError(f"Tool {name} cannot be both idempotent and mutating")
+        schema = generate_function_schema(func)
+        if name in self._metadata:
+            for category in self._metadata[name]["categories"]:
+                self._categories[category].pop(name, None)
         self._tools[name] = func
-        self._schemas[name] = generate_function_schema(func)
-        self._metadata[name] = {"categories": categories or []}
+        self._schemas[name] = schema
+        self._metadata[name] = {"categories": categories or [], "kind": kind, "timeout": timeout,
+                                "idempotent": idempotent, "mutating": mutating}
+        for category in categories or []:
+            self._categories.setdefault(category, {})[name] = func
+        self.version += 1
+        self._payloads.clear()
 
     def get_tool(self, name: str) -> Callable:
         return self._tools[name]
 
+    def get_metadata(self, name: str) -> Dict[str, Any]:
+        return self._metadata[name]
+
     def get_tools_by_category(self, category: str) -> Dict[str, Callable]:
-        return {
-            name: func for name, func in self._tools.items()
-            if category in self._metadata[name]["categories"]
-        }
+        return dict(self._categories.get(category, {}))
 
-    def get_schemas_by_category(self, category: str) -> List[dict]:
+    def get_schemas_by_category(self, category: str) -> Tuple[dict, ...]:
         """Return JSON schemas for a given category — used by agents for OpenAI function calls."""
-        return [
-            self._schemas[name]
-            for name, meta in self._metadata.items()
-            if category in meta["categories"]
-        ]
+        return self.get_payload([category]).schemas
+
+    def get_payload(self, categories: List[str]) -> ToolPayload:
+        """Cached, read-only schemas, tools list and schema hash for a set of categories."""
+        key = tuple(categories)
+        payload = self._payloads.get(key)
+        if payload is None:
+            names: Dict[str, None] = {}
+            for category in categories:
+                names.update(dict.fromkeys(self._categories.get(category, {})))
+            payload = ToolPayload([self._schemas[name] for name in names])
+            self._payloads[key] = payload
+        return payload
 
     def get_all_schemas(self) -> List[dict]:
         return list(self._schemas.values())
@@ -121,18 +221,28 @@ class ToolRegistry:
 # Singleton instance (import this anywhere)
 registry = ToolRegistry()
 
-def register_tool(name: str, func: Callable, categories: List[str]):
-    registry.register(name, func, categories)
+def register_tool(name: str, func: Callable, categories: List[str],
+                  kind: str = "io", timeout: Optional[float] = None,
+                  idempotent: bool = False, mutating: bool = False):
+    registry.register(name, func, categories, kind=kind, timeout=timeout,
+                      idempotent=idempotent, mutating=mutating)
 
 # Register all the tools here.
 # file tools
-register_tool("read_file", tools.file_tools.read_file, ["file"])
-register_tool("write_file", tools.file_tools.write_file, ["file"])
-register_tool("make_directory", tools.file_tools.make_directory, ["file"])
-register_tool("list_directory", tools.file_tools.list_directory, ["file"])
+register_tool("read_file", tools.file_tools.read_file, ["file"], idempotent=True)
+register_tool("write_file", tools.file_tools.write_file, ["file"], mutating=True)
+register_tool("make_directory", tools.file_tools.make_directory, ["file"], mutating=True)
+register_tool("list_directory", tools.file_tools.list_directory, ["file"], idempotent=True)
+register_tool("list_workspace", tools.search_tools.list_workspace, ["file"], idempotent=True)
+register_tool("search_workspace", tools.search_tools.search_workspace, ["file"], idempotent=True)
+register_tool("find_symbol", tools.workspace_index.find_symbol, ["file"], idempotent=True)
+register_tool("find_files_with", tools.workspace_index.find_files_with, ["file"], idempotent=True)
+
+# retrieval tools (first call may ingest the whole workspace)
+register_tool("search_documents", tools.rag_tools.search_documents, ["rag"], timeout=300, idempotent=True)
 
 #general tools
-register_tool("sayHello", tools.general_tools.sayHello, ["general"])
+register_tool("sayHello", tools.general_tools.sayHello, ["general"], idempotent=True)
 
 # class ToolBox:
 #     _tools: list[dict[str, Any]]
@@ -0,0 +1,84 @@
+"""
+Change notifications for workspace files.
+Tools that modify the workspace publish the path they changed so indexes and
+caches can update incrementally instead of rescanning the whole tree.
+change_thread names the conversation thread a change is made for; agents set
+it around their tool calls and the tool executor carries it into worker
+threads, so subscribers can tell whose change an event is.
+"""
+
+import contextvars
+import logging
+import os
+import threading
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# thread_id of the conversation whose tool calls are running (None outside agents)
+change_thread: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("change_thread", default=None)
+
+
+class WorkspaceEvents:
+    """Minimal publish/subscribe hub for file change events."""
+
+    def __init__(self):
+        self._subscribers: List[Callable[[str], None]] = []
+        self._before: List[Callable[[str], None]] = []
+        self._lock = threading.Lock()
+        # Number of changes published so far; cheap "has anything changed" check
+        self.version = 0
+
+    def subscribe(self, callback: Callable[[str], None]):
+        """Call callback(absolute_path) after every published change.
+
+        Callbacks run on the publishing thread, so they should only record the
+        change and return.
+        """
+        with self._lock:
+            if callback not in self._subscribers:
+                self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[str], None]):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def subscribe_before(self, callback: Callable[[str], None]):
+        """Call callback(absolute_path) just before a tool modifies a file,
+        e.g. to keep its previous contents."""
+        with self._lock:
+            if callback not in self._before:
+                self._before.append(callback)
+
+    def unsubscribe_before(self, callback: Callable[[str], None]):
+        with self._lock:
+            if callback in self._before:
+                self._before.remove(callback)
+
+    def before_change(self, path: str):
+        if not self._before:
+            return
+        path = os.path.abspath(path)
+        with self._lock:
+            subscribers = list(self._before)
+        for callback in subscribers:
+            try:
+                callback(path)
+            except Exception as e:
+                logger.warning(f"Workspace event subscriber failed for {path}: {e}")
+
+    def publish(self, path: str):
+        path = os.path.abspath(path)
+        with self._lock:
+            self.version += 1
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(path)
+            except Exception as e:
+                logger.warning(f"Workspace event subscriber failed for {path}: {e}")
+
+
+# Global instance
+workspace_events = WorkspaceEvents()
@@ -0,0 +1,405 @@
+"""
+Persistent, incrementally updated index of the workspace.
+Keeps an inverted index of identifier tokens per file and a symbol table of
+Python definitions (built with ast) so "where is X defined / used" is a dict
+lookup instead of a file-by-file read. The index is saved to disk and brought
+up to date on startup by comparing each file's mtime and size; writes made
+through the file tools are picked up immediately via workspace_events, and a
+background thread rescans periodically for changes made outside the tools.
+Saving rewrites the whole file, so saves after edits are debounced: a burst
+of edits is written out once, WORKSPACE_INDEX_SAVE_DELAY after the first.
+"""
+
+import ast
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from tools.file_cache import file_cache
+from tools.file_tools import _workspace_path
+from tools.search_tools import walk_workspace
+from tools.workspace_events import workspace_events
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT = 1
+# Where the index is persisted; kept outside the workspace by default
+WORKSPACE_INDEX_PATH = os.getenv("WORKSPACE_INDEX_PATH", "./.workspace_index.json")
+# Seconds between background mtime scans
+WORKSPACE_INDEX_SCAN_INTERVAL = float(os.getenv("WORKSPACE_INDEX_SCAN_INTERVAL", 30))
+# Larger files are listed but not tokenized
+WORKSPACE_INDEX_MAX_FILE_BYTES = int(os.getenv("WORKSPACE_INDEX_MAX_FILE_BYTES", 1024 * 1024))
+# Seconds after an edit before the index is saved (edits in between share the save)
+WORKSPACE_INDEX_SAVE_DELAY = float(os.getenv("WORKSPACE_INDEX_SAVE_DELAY", 10))
+# How long a lookup waits for the first scan before answering from a partial index
+WORKSPACE_INDEX_READY_TIMEOUT = float(os.getenv("WORKSPACE_INDEX_READY_TIMEOUT", 5))
+
+_TOKEN_RE = re.compile(rb"[A-Za-z_][A-Za-z0-9_]+")
+
+
+def tokenize(data: bytes) -> Set[str]:
+    """Distinct lower-cased identifier-like tokens (two or more characters)."""
+    return {token.decode("ascii").lower() for token in set(_TOKEN_RE.findall(data))}
+
+
+def python_symbols(text: str) -> List[Tuple[str, str, int, str]]:
+    """(name, kind, line, parent) for classes, functions and module-level names."""
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return []
+    symbols: List[Tuple[str, str, int, str]] = []
+
+    def visit(node: ast.AST, parent: str, in_class: bool):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, ast.ClassDef):
+                symbols.append((child.name, "class", child.lineno, parent))
+                visit(child, f"{parent}.{child.name}" if parent else child.name, True)
+            elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                symbols.append((child.name, "method" if in_class else "function", child.lineno, parent))
+                visit(child, f"{parent}.{child.name}" if parent else child.name, False)
+            elif isinstance(child, (ast.Assign, ast.AnnAssign)) and not parent:
+                targets = child.targets if isinstance(child, ast.Assign) else [child.target]
+                for target in targets:
+                    if isinstance(target, ast.Name):
+                        symbols.append((target.id, "variable", child.lineno, ""))
+            elif isinstance(child, (ast.If, ast.Try, ast.With, ast.AsyncWith)) and not parent:
+                # Module-level definitions guarded by if/try (e.g. optional imports)
+                visit(child, parent, in_class)
+
+    visit(tree, "", False)
+    return symbols
+
+
+class _FileEntry:
+    __slots__ = ("version", "tokens", "symbols")
+
+    def __init__(self, version: Tuple[int, int], tokens: List[str], symbols: List[Tuple[str, str, int, str]]):
+        self.version = version
+        self.tokens = tokens
+        self.symbols = symbols
+
+
+class WorkspaceIndex:
+    """Token and symbol index over the workspace, updated incrementally."""
+
+    def __init__(self, index_path: Optional[str] = None, scan_interval: Optional[float] = None,
+                 save_delay: Optional[float] = None):
+        """
+        Initialize the index. Nothing is read until start() or the first lookup.
+
+        Args:
+            index_path: JSON file the index is persisted to (WORKSPACE_INDEX_PATH)
+            scan_interval: Seconds between background mtime scans (WORKSPACE_INDEX_SCAN_INTERVAL)
+            save_delay: Seconds after an edit before saving (WORKSPACE_INDEX_SAVE_DELAY)
+        """
+        self.index_path = index_path or WORKSPACE_INDEX_PATH
+        self.scan_interval = scan_interval or WORKSPACE_INDEX_SCAN_INTERVAL
+        self.save_delay = save_delay if save_delay is not None else WORKSPACE_INDEX_SAVE_DELAY
+        self._files: Dict[str, _FileEntry] = {}
+        # token -> paths containing it
+        self._postings: Dict[str, Set[str]] = {}
+        # lower-cased symbol name -> [(name, kind, path, line, parent)]
+        self._symbols: Dict[str, List[Tuple[str, str, str, int, str]]] = {}
+        # Sorted symbol keys for prefix lookups, rebuilt lazily after changes
+        self._sorted_symbols: Optional[List[str]] = None
+        self._lock = threading.Lock()
+        self._dirty: Set[str] = set()
+        self._dirty_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._ready = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._unsaved = False
+        self.saves = 0
+        self.last_scan_seconds = 0.0
+        # Bumped by every full scan that finds changes, i.e. edits that were
+        # not announced through workspace_events (made outside the tools)
+        self.generation = 0
+
+    @property
+    def root(self) -> str:
+        return os.path.abspath(_workspace_path(""))
+
+    # --- lifecycle ---
+
+    def start(self):
+        """Load the saved index and keep it up to date from a background thread."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="workspace-index", daemon=True)
+        workspace_events.subscribe(self._on_change)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread and save the index."""
+        workspace_events.unsubscribe(self._on_change)
+        self._stopped.set()
+        self._wake.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=5)
+        self.save()
+
+    def _run(self):
+        self.load()
+        while not self._stopped.is_set():
+            try:
+                self.scan()
+            except Exception as e:
+                logger.error(f"Workspace index scan failed: {e}")
+            self._ready.set()
+            self.save()
+            deadline = time.monotonic() + self.scan_interval
+            save_at: Optional[float] = None
+            # Between full scans, only re-index files reported by workspace_events
+            while not self._stopped.is_set():
+                now = time.monotonic()
+                if save_at is not None and now >= save_at:
+                    self.save()
+                    save_at = None
+                remaining = deadline - now
+                if remaining <= 0:
+                    break  # the next scan saves anything pending
+                timeout = remaining if save_at is None else min(remaining, save_at - now)
+                if self._wake.wait(timeout=timeout):
+                    self._wake.clear()
+                    self._apply_dirty()
+                    if save_at is None:
+                        save_at = time.monotonic() + self.save_delay
+
+    def _ensure_ready(self):
+        if self._thread is None:
+            self.start()
+        self._ready.wait(timeout=WORKSPACE_INDEX_READY_TIMEOUT)
+        self._apply_dirty()
+
+    # --- persistence ---
+
+    def load(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        if saved.get("format") != INDEX_FORMAT or saved.get("root") != self.root:
+            return
+        for rel_path, item in saved.get("files", {}).items():
+            entry = _FileEntry(tuple(item["v"]), item["t"], [tuple(s) for s in item["s"]])
+            self._set_entry(rel_path, entry)
+        with self._lock:
+            self._unsaved = False
+
+    def save(self):
+        """Write the index to disk if it changed since the last save."""
+        with self._lock:
+            if not self._unsaved:
+                return
+            files = {rel_path: {"v": list(entry.version), "t": entry.tokens, "s": entry.symbols}
+                     for rel_path, entry in self._files.items()}
+            self._unsaved = False
+        data = {"format": INDEX_FORMAT, "root": self.root, "files": files}
+        # Per-process temp file, as several server workers may save at once
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp_path, self.index_path)
+            self.saves += 1
+        except OSError as e:
+            logger.error(f"Could not save workspace index to {self.index_path}: {e}")
+
+    # --- updates ---
+
+    def scan(self) -> int:
+        """Re-index files whose mtime or size changed and drop deleted ones.
+
+        Returns the number of files (re)indexed or removed.
+        """
+        started = time.perf_counter()
+        # Tool threads add entries while the walk runs; only paths indexed
+        # before it started can be stale
+        with self._lock:
+            indexed = set(self._files)
+        seen: Set[str] = set()
+        changed = 0
+        for rel_path, entry in walk_workspace():
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            seen.add(rel_path)
+            st = entry.stat(follow_symlinks=False)
+            current = self._files.get(rel_path)
+            if current is None or current.version != (st.st_mtime_ns, st.st_size):
+                self._index_file(rel_path, entry.path)
+                changed += 1
+        for rel_path in indexed - seen:
+            # Not seen by the walk, but it may have been created after the walk passed its directory
+            if os.path.exists(os.path.join(self.root, rel_path)):
+                continue
+            self._remove(rel_path)
+            changed += 1
+        self.last_scan_seconds = time.perf_counter() - started
+        if changed:
+            self.generation += 1
+        return changed
+
+    def _on_change(self, path: str):
+        rel_path = os.path.relpath(path, self.root)
+        if rel_path.startswith(".."):
+            return
+        with self._dirty_lock:
+            self._dirty.add(rel_path.replace(os.sep, "/"))
+        self._wake.set()
+
+    def _apply_dirty(self):
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, set()
+        for rel_path in dirty:
+            full_path = os.path.join(self.root, rel_path)
+            if os.path.isfile(full_path):
+                self._index_file(rel_path, full_path)
+            else:
+                self._remove(rel_path)
+
+    def _index_file(self, rel_path: str, full_path: str):
+        try:
+            st = os.stat(full_path)
+            tokens: Set[str] = set()
+            symbols: List[Tuple[str, str, int, str]] = []
+            if st.st_size <= WORKSPACE_INDEX_MAX_FILE_BYTES:
+                cached = file_cache.get(full_path)
+                if cached is not None:
+                    data = cached.data
+                else:
+                    with open(full_path, "rb") as f:
+                        data = f.read()
+                if b"\0" not in data[:8192]:
+                    tokens = tokenize(data)
+                    if rel_path.endswith(".py"):
+                        symbols = python_symbols(data.decode("utf-8", errors="replace"))
+        except OSError:
+            self._remove(rel_path)
+            return
+        self._set_entry(rel_path, _FileEntry((st.st_mtime_ns, st.st_size), sorted(tokens), symbols))
+
+    def _set_entry(self, rel_path: str, entry: _FileEntry):
+        with self._lock:
+            self._unlink(rel_path)
+            # Every posting set then holds the same string object for a path
+            rel_path = sys.intern(rel_path)
+            self._files[rel_path] = entry
+            for token in entry.tokens:
+                self._postings.setdefault(token, set()).add(rel_path)
+            for name, kind, line, parent in entry.symbols:
+                self._symbols.setdefault(name.lower(), []).append((name, kind, rel_path, line, parent))
+            self._sorted_symbols = None
+            self._unsaved = True
+
+    def _remove(self, rel_path: str):
+        with self._lock:
+            if self._unlink(rel_path):
+                self._sorted_symbols = None
+                self._unsaved = True
+
+    def _unlink(self, rel_path: str) -> bool:
+        """Remove a file's postings and symbols. Caller holds the lock."""
+        entry = self._files.pop(rel_path, None)
+        if entry is None:
+            return False
+        for token in entry.tokens:
+            paths = self._postings.get(token)
+            if paths is not None:
+                paths.discard(rel_path)
+                if not paths:
+                    del self._postings[token]
+        for name, *_ in entry.symbols:
+            key = name.lower()
+            remaining = [s for s in self._symbols.get(key, []) if s[2] != rel_path]
+            if remaining:
+                self._symbols[key] = remaining
+            else:
+                self._symbols.pop(key, None)
+        return True
+
+    # --- lookups ---
+
+    def find_symbol(self, name: str, kind: Optional[str] = None, prefix: bool = False,
+                    limit: int = 50) -> List[Dict[str, Any]]:
+        self._ensure_ready()
+        key = name.lower()
+        with self._lock:
+            if prefix:
+                if self._sorted_symbols is None:
+                    self._sorted_symbols = sorted(self._symbols)
+                keys = []
+                i = bisect_left(self._sorted_symbols, key)
+                while i < len(self._sorted_symbols) and self._sorted_symbols[i].startswith(key):
+                    keys.append(self._sorted_symbols[i])
+                    i += 1
+            else:
+                keys = [key]
+            results = []
+            for k in keys:
+                for sym_name, sym_kind, path, line, parent in self._symbols.get(k, []):
+                    if kind and sym_kind != kind:
+                        continue
+                    results.append({"name": sym_name, "kind": sym_kind, "path": path,
+                                    "line": line, "parent": parent})
+        # Exact-case matches first, then by path for stable output
+        results.sort(key=lambda r: (r["name"] != name, r["path"], r["line"]))
+        return results[:limit]
+
+    def files_with_tokens(self, query: str, limit: int = 50) -> Tuple[List[str], int]:
+        """Paths containing every token in query, and the total number of matches."""
+        self._ensure_ready()
+        tokens = tokenize(query.encode("utf-8", errors="ignore"))
+        if not tokens:
+            return [], 0
+        with self._lock:
+            postings = sorted((self._postings.get(token, set()) for token in tokens), key=len)
+            matches = set(postings[0])
+            for paths in postings[1:]:
+                matches &= paths
+                if not matches:
+                    break
+        return sorted(matches)[:limit], len(matches)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "files": len(self._files),
+                "tokens": len(self._postings),
+                "symbols": sum(len(v) for v in self._symbols.values()),
+                "ready": self._ready.is_set(),
+                "generation": self.generation,
+                "last_scan_ms": round(self.last_scan_seconds * 1000, 3),
+                "saves": self.saves,
+                "unsaved": self._unsaved,
+                "index_path": self.index_path,
+            }
+
+
+# Global instance
+workspace_index = WorkspaceIndex()
+
+
+def find_symbol(name: str, kind: Optional[str] = None, prefix: bool = False, limit: int = 50) -> Dict[str, Any]:
+    """Find where a Python class, function, method or module-level variable is defined in the workspace.
+    Matching is case-insensitive; prefix=true matches names starting with name.
+    kind filters by "class", "function", "method" or "variable". Returns paths and line numbers."""
+    return {"symbols": workspace_index.find_symbol(name, kind=kind, prefix=prefix, limit=limit)}
+
+
+def find_files_with(query: str, limit: int = 50) -> Dict[str, Any]:
+    """List workspace files that contain every identifier/word in query (e.g. "SessionManager evict"),
+    using the workspace index. Faster than search_workspace; follow up with read_file or search_workspace for lines."""
+    paths, total = workspace_index.files_with_tokens(query, limit=limit)
+    return {"paths": paths, "total": total, "truncated": total > len(paths)}